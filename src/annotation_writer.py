@@ -0,0 +1,85 @@
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+import image_encoding
+from image_encoding import ImageFormat
+from typing import Dict, List, Tuple
+from type_defs import Int3, StrDict
+
+# Class ID used for annotation colours not found in the class table
+unknown_class_id: int = 255
+
+class AnnotationClassTable:
+    """
+    Table mapping the simulator annotation colours to 8-bit class IDs.
+
+    Class IDs are assigned in alphabetical order of the class names, so the same
+    simulator annotation configuration always produces the same IDs.
+    """
+    def __init__(self, annotations: Dict[str, Int3]):
+        """Initialize the class table from the simulator annotation configuration (class name to RGB colour)."""
+        if len(annotations) >= unknown_class_id:
+            raise ValueError(f'Too many annotation classes ({len(annotations)}), 8-bit class IDs support up to {unknown_class_id}.')
+        self._classes: List[Tuple[str, Int3]] = [(name, tuple(int(c) for c in colour))
+                                                 for name, colour in sorted(annotations.items())]
+
+    @property
+    def class_colours(self) -> List[Int3]:
+        """Get the RGB colour of every class, indexed by class ID."""
+        return [colour for _, colour in self._classes]
+
+    def to_metadata(self) -> StrDict:
+        """Return the class table as a dictionary, to be stored in the session metadata."""
+        return {
+            'unknown_class_id': unknown_class_id,
+            'classes': [{'id': class_id, 'name': name, 'colour': colour}
+                        for class_id, (name, colour) in enumerate(self._classes)]
+        }
+
+def colours_to_class_ids(annotation: np.ndarray, class_colours: List[Int3]) -> np.ndarray:
+    """
+    Convert an RGB(A) annotation image into a single channel 8-bit class ID image.
+
+    Colours are packed into 24-bit integers and looked up in the sorted class colours
+    with a vectorised binary search, unknown colours are mapped to the unknown class ID.
+    """
+    rgb = annotation[..., :3].astype(np.uint32)
+    packed = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    colours = np.asarray(class_colours, dtype=np.uint32).reshape(-1, 3)
+    class_keys = (colours[:, 0] << 16) | (colours[:, 1] << 8) | colours[:, 2]
+    order = np.argsort(class_keys)
+    sorted_keys = class_keys[order]
+    if sorted_keys.size == 0:
+        return np.full(packed.shape, unknown_class_id, dtype=np.uint8)
+    index = np.minimum(np.searchsorted(sorted_keys, packed), sorted_keys.size - 1)
+    return np.where(sorted_keys[index] == packed, order[index], unknown_class_id).astype(np.uint8)
+
+# --- Annotation Formats ---
+class ClassPngFormat(ImageFormat):
+    """Annotation as a single channel 8-bit PNG of class IDs, with a selectable zlib "compress_level"."""
+    name = 'class_png'
+    extension = 'png'
+    supported_image_types = ('annotation',)
+    requires_annotation_classes = True
+
+    def encode(self, array: np.ndarray, options: StrDict) -> bytes:
+        """Convert the annotation colours to class IDs and encode them as 8-bit PNG."""
+        options = dict(options)
+        class_ids = colours_to_class_ids(array, options.pop('class_colours'))
+        return image_encoding.get_format('png').encode(class_ids, options)
+
+class PalettePngFormat(ClassPngFormat):
+    """Annotation as a palette PNG of class IDs, using the class colours as palette (viewable as is)."""
+    name = 'palette_png'
+
+    def encode(self, array: np.ndarray, options: StrDict) -> bytes:
+        """Convert the annotation colours to class IDs and encode them as palette PNG."""
+        options = dict(options)
+        class_colours = options.pop('class_colours')
+        image = Image.fromarray(colours_to_class_ids(array, class_colours))
+        palette = [channel for colour in class_colours for channel in colour]
+        image.putpalette(palette + [0] * (768 - len(palette)))
+        buffer = BytesIO()
+        image.save(buffer, format='PNG', **options)
+        return buffer.getvalue()
@@ -0,0 +1,123 @@
+import os
+import numpy as np
+from beamngpy import BeamNGpy
+
+import capture_session, logging_mgr, scenario_mgr, session_config, utils
+from session_config import SessionConfig
+from typing import List, Tuple
+from type_defs import StrDict
+
+logger = logging_mgr.get_logger(__name__)
+
+def find_session_config_files(paths: List[str]) -> List[str]:
+    """
+    Return the session configuration files found in the given paths, in order.
+
+    Each path can be a session configuration file or a directory, whose JSON files are taken in name order.
+    """
+    config_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            config_files += [utils.join_paths(path, file_name) for file_name in sorted(os.listdir(path))
+                             if file_name.lower().endswith('.json')]
+        elif os.path.isfile(path):
+            config_files.append(path)
+        else:
+            raise ValueError(f'Session configuration path "{path}" not found.')
+    return config_files
+
+def load_batch_session_configs(paths: List[str]) -> List[Tuple[str, SessionConfig]]:
+    """
+    Load and validate the session configurations of a batch, as (name, session configuration) pairs.
+
+    The name of each session is the name of its configuration file, without extension.
+    Raises ValueError if no configuration is found or any configuration is invalid.
+    """
+    batch_sessions = []
+    for config_file in find_session_config_files(paths):
+        session = session_config.create_session_config_from_file(config_file)
+        try:
+            session.validate()
+        except ValueError as e:
+            raise ValueError(f'Session configuration file "{config_file}" error: {e}')
+        session_name = os.path.splitext(os.path.basename(config_file))[0]
+        batch_sessions.append((session_name, session))
+    if not batch_sessions:
+        raise ValueError(f'No session configuration files found in {paths}.')
+    logger.info(f'Loaded {len(batch_sessions)} session configurations for the batch run.')
+    return batch_sessions
+
+def run_session_batch(bng: BeamNGpy,
+                      batch_sessions: List[Tuple[str, SessionConfig]],
+                      output_dir: str,
+                      random_seed: int) -> List[StrDict]:
+    """
+    Run a batch of capture sessions in order on the same simulator, and return the result of each one.
+
+    Consecutive sessions on the same map reuse the loaded map. Each session is saved in its own
+    subdirectory "session_XXX_<name>" (with its own log and journal) and uses the seed derived from
+    the random seed and its index in the batch (see "get_session_seeds"). A failed session is logged
+    and skipped, and "batch_summary.json" records the result of every session run so far. If the batch
+    is stopped (e.g. by the user), the sessions that never ran are recorded as 'not_run'.
+    """
+    results = []
+    session_seeds = get_session_seeds(random_seed, len(batch_sessions))
+    try:
+        for session_num, (session_name, session) in enumerate(batch_sessions):
+            results.append(run_batch_session(bng, session_num, session_name, session, output_dir, session_seeds[session_num]))
+            utils.save_json_file({'sessions': results}, output_dir, 'batch_summary.json')
+    finally:
+        if len(results) < len(batch_sessions):
+            results += get_not_run_results(batch_sessions, results, session_seeds)
+            utils.save_json_file({'sessions': results}, output_dir, 'batch_summary.json')
+    num_completed = sum(result['status'] == 'completed' for result in results)
+    logger.info(f'Batch run finished: {num_completed} of {len(batch_sessions)} sessions completed.')
+    return results
+
+def run_batch_session(bng: BeamNGpy,
+                      session_num: int,
+                      session_name: str,
+                      session: SessionConfig,
+                      output_dir: str,
+                      random_seed: int) -> StrDict:
+    """
+    Run a session of a batch in its own "session_XXX_<name>" subdirectory and return its result.
+
+    The messages logged during the session are written to the batch log and to the session log.
+    """
+    session_dir = utils.create_dir(output_dir, get_batch_session_dir_name(session_num, session_name))
+    logging_mgr.start_session_log(session_dir)
+    logger.info(f'Batch session {session_num}: "{session_name}".')
+    result = {'session_num': session_num, 'session': session_name, 'output_dir': session_dir, 'map': session.map, 'random_seed': random_seed}
+    try:
+        capture_session.run_capture_session(bng, session, session_dir, random_seed)
+        result['status'] = 'completed'
+    except Exception as e:
+        # Any error only stops this session (e.g. a simulator or file error), the batch goes on with the next one
+        logger.error(f'Batch session "{session_name}" stopped by an error: {e}')
+        result['status'] = 'failed'
+        result['error'] = str(e)
+        # The simulator state is unknown after a failed session, the next one loads its own scenario
+        scenario_mgr.clear_loaded_scenario()
+    finally:
+        logging_mgr.stop_session_log()
+    return result
+
+def get_not_run_results(batch_sessions: List[Tuple[str, SessionConfig]], results: List[StrDict], session_seeds: List[int]) -> List[StrDict]:
+    """Return the 'not_run' result of every session of a batch without a result, in batch order."""
+    session_nums = {result['session_num'] for result in results}
+    return [{'session_num': session_num, 'session': session_name, 'map': session.map,
+             'random_seed': session_seeds[session_num], 'status': 'not_run'}
+            for session_num, (session_name, session) in enumerate(batch_sessions) if session_num not in session_nums]
+
+def get_session_seeds(random_seed: int, num_sessions: int) -> List[int]:
+    """
+    Return the random seed of every session of a batch, each one from an independent seed stream of the batch seed.
+
+    Sequential and parallel batches use the same seeds, so a session gets the same seed however the batch is run.
+    """
+    return [int(seed_sequence.generate_state(1)[0]) for seed_sequence in np.random.SeedSequence(random_seed).spawn(num_sessions)]
+
+def get_batch_session_dir_name(session_num: int, session_name: str) -> str:
+    """Return the name of the output subdirectory of a batch session."""
+    return f'session_{session_num:03d}_{session_name}'
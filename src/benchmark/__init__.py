@@ -0,0 +1 @@
+"""Benchmarks of the capture throughput, run against an in-process fake simulator, and of the program startup time."""
@@ -0,0 +1,201 @@
+"""
+Throughput benchmark of the capture path, run against the fake simulator of "fake_beamngpy.py".
+
+Every combination of camera count, resolution, rendered image types and output format is captured
+by a real capture session ("capture_session.run_capture_session", as called by "main.py"), and its
+frames per second, CPU time and bytes written are reported. From the "src" folder, run:
+
+    python -m benchmark.capture_benchmark --cameras 1 2 --resolutions 640x480 1280x720 --formats png qoi
+
+Results are saved in "benchmark_results.json". Passing the results of a previous run with "--baseline"
+flags the cases whose frames per second dropped by more than "--max-regression" (exit code 1).
+"""
+import argparse, itertools, json, os, sys, tempfile, time
+from contextlib import contextmanager
+
+# Settings need the BeamNG.tech folder path, which is not used by the fake simulator
+os.environ.setdefault('BNG_HOME', tempfile.gettempdir())
+
+import capture_session, data_capture_mgr, image_encoding, logging_mgr, scenario_mgr, settings, simulation_mgr, utils
+from benchmark.fake_beamngpy import FakeAdvancedIMU, FakeBeamNGpy, FakeCamera, FakeVehicle
+from camera_sensor_config import CameraSensorConfig
+from session_config import SessionConfig
+from typing import Iterator, List, NamedTuple, Tuple
+from type_defs import StrDict
+
+logger = logging_mgr.get_logger(__name__)
+
+# Name of the results file, stored in the benchmark output directory
+benchmark_results_file_name: str = 'benchmark_results.json'
+
+class BenchmarkCase(NamedTuple):
+    """Camera setup captured by a benchmark case."""
+    num_cameras: int
+    resolution: Tuple[int, int]
+    image_types: Tuple[str, ...]
+    format_name: str
+
+    @property
+    def name(self) -> str:
+        """Get the name of the case, also used as its output directory name."""
+        width, height = self.resolution
+        return f'{self.num_cameras}cam_{width}x{height}_{"+".join(self.image_types)}_{self.format_name}'
+
+def get_benchmark_cases(camera_counts: List[int],
+                        resolutions: List[Tuple[int, int]],
+                        image_type_sets: List[Tuple[str, ...]],
+                        format_names: List[str]) -> List[BenchmarkCase]:
+    """Return every combination of the given camera counts, resolutions, image type sets and output formats."""
+    return [BenchmarkCase(*combination) for combination in itertools.product(camera_counts, resolutions, image_type_sets, format_names)]
+
+def create_benchmark_session(case: BenchmarkCase, num_frames: int, capture_freq_hz: float) -> SessionConfig:
+    """
+    Return the session configuration of a benchmark case.
+
+    Each rendered image type is saved in the case output format if it supports the image type,
+    otherwise in the default output format of the image type.
+    """
+    output_formats = {image_type: case.format_name for image_type in image_encoding.image_types
+                      if image_type in image_encoding.get_format(case.format_name).supported_image_types}
+    cameras = [CameraSensorConfig(name=f'camera_{camera_num}',
+                                  resolution=case.resolution,
+                                  is_render_colours='colour' in case.image_types,
+                                  is_render_annotations='annotation' in case.image_types,
+                                  is_render_depth='depth' in case.image_types,
+                                  output_formats=output_formats)
+               for camera_num in range(case.num_cameras)]
+    return SessionConfig(scenario='benchmark',
+                         duration_s=num_frames / capture_freq_hz,
+                         capture_freq_hz=capture_freq_hz,
+                         cameras=cameras,
+                         num_ai_traffic_vehicles=0)
+
+@contextmanager
+def use_fake_simulator() -> Iterator[None]:
+    """
+    Make the capture path create fake sensors and vehicles, restoring the real ones on exit.
+
+    The scenario setup is replaced by spawning a fake "ego" vehicle, everything else
+    (sensors, capture loop, pipeline and writers) runs the real code.
+    """
+    real_camera, real_imu = data_capture_mgr.Camera, data_capture_mgr.AdvancedIMU
+    real_set_up_session_scenario = scenario_mgr.set_up_session_scenario
+    data_capture_mgr.Camera, data_capture_mgr.AdvancedIMU = FakeCamera, FakeAdvancedIMU
+    scenario_mgr.set_up_session_scenario = lambda bng, session: (None, FakeVehicle(bng, session.vehicle.name))
+    try:
+        yield
+    finally:
+        data_capture_mgr.Camera, data_capture_mgr.AdvancedIMU = real_camera, real_imu
+        scenario_mgr.set_up_session_scenario = real_set_up_session_scenario
+
+def run_benchmark_case(case: BenchmarkCase,
+                       output_dir: str,
+                       num_frames: int,
+                       capture_freq_hz: float,
+                       step_cost_s: float) -> StrDict:
+    """Capture a benchmark case on a new fake simulator and return its measurements."""
+    case_dir = utils.create_dir(output_dir, case.name)
+    logging_mgr.configure_logging(case_dir)
+    bng = FakeBeamNGpy(step_cost_s)
+    simulation_mgr.set_deterministic_steps_per_second(bng, settings.simulation_steps_per_second)
+    session = create_benchmark_session(case, num_frames, capture_freq_hz)
+    with use_fake_simulator():
+        start_cpu_times = os.times()
+        start_time_s = time.perf_counter()
+        capture_session.run_capture_session(bng, session, case_dir, random_seed=0)
+        elapsed_s = time.perf_counter() - start_time_s
+        end_cpu_times = os.times()
+    # CPU time of the benchmark process and its finished child processes (e.g. image encoder processes)
+    cpu_s = sum(end - start for end, start in zip(end_cpu_times[:4], start_cpu_times[:4]))
+    result = {
+        'case': case.name,
+        'num_cameras': case.num_cameras,
+        'resolution': list(case.resolution),
+        'image_types': list(case.image_types),
+        'format': case.format_name,
+        'frames': num_frames,
+        'elapsed_s': elapsed_s,
+        'fps': num_frames / elapsed_s,
+        'cpu_s': cpu_s,
+        'cpu_percent': 100 * cpu_s / elapsed_s,
+        'bytes_written': _get_dir_size(case_dir)
+    }
+    logger.info(f'Benchmark case "{case.name}": {result["fps"]:.2f} fps, {result["cpu_percent"]:.0f}% CPU, '
+                f'{result["bytes_written"] / 1e6:.1f} MB written.')
+    return result
+
+def find_regressions(results: List[StrDict], baseline_results: List[StrDict], max_regression: float) -> List[str]:
+    """Return a description of every case whose frames per second dropped by more than the given fraction of the baseline."""
+    baseline_fps = {result['case']: result['fps'] for result in baseline_results}
+    regressions = []
+    for result in results:
+        if result['case'] in baseline_fps and result['fps'] < baseline_fps[result['case']] * (1 - max_regression):
+            regressions.append(f'{result["case"]}: {result["fps"]:.2f} fps (baseline {baseline_fps[result["case"]]:.2f} fps)')
+    return regressions
+
+def _get_dir_size(dir_path: str) -> int:
+    """Return the total size of the files in a directory and its subdirectories."""
+    return sum(os.path.getsize(os.path.join(root, file_name)) for root, _, file_names in os.walk(dir_path) for file_name in file_names)
+
+def _parse_resolution(resolution: str) -> Tuple[int, int]:
+    """Parse a "WIDTHxHEIGHT" resolution."""
+    width, height = resolution.lower().split('x')
+    return int(width), int(height)
+
+def _parse_image_types(image_types: str) -> Tuple[str, ...]:
+    """Parse a comma-separated set of image types."""
+    parsed = tuple(image_type.strip() for image_type in image_types.split(','))
+    for image_type in parsed:
+        if image_type not in image_encoding.image_types:
+            raise argparse.ArgumentTypeError(f'Unknown image type "{image_type}".')
+    return parsed
+
+def main() -> None:
+    """Run the benchmark cases given in the command line and print their results."""
+    parser = argparse.ArgumentParser(description='Benchmark the capture throughput against a fake simulator.')
+    parser.add_argument('--cameras', type=int, nargs='+', default=[1, 2], help='camera counts')
+    parser.add_argument('--resolutions', type=_parse_resolution, nargs='+', default=[(640, 480), (1280, 720)], help='camera resolutions (WIDTHxHEIGHT)')
+    parser.add_argument('--image-types', type=_parse_image_types, nargs='+', default=[('colour',), ('colour', 'annotation', 'depth')],
+                        help='sets of rendered image types (comma-separated)')
+    parser.add_argument('--formats', nargs='+', default=['png', 'npy'], choices=image_encoding.get_format_names(), help='output formats')
+    parser.add_argument('--frames', type=int, default=50, help='frames captured per case')
+    parser.add_argument('--capture-freq', type=float, default=20, help='capture frequency (Hz)')
+    parser.add_argument('--step-cost-ms', type=float, default=0.0, help='wall time of each simulation step (ms)')
+    parser.add_argument('--render-cost-ms', type=float, default=0.0, help='wall time of each camera render, per megapixel (ms)')
+    parser.add_argument('--camera-poll-mode', choices=['sync', 'ad_hoc'], default=settings.camera_poll_mode, help='camera poll mode')
+    parser.add_argument('--encoder-backend', choices=['thread', 'process'], default=settings.capture_encoder_backend, help='capture encoder backend')
+    parser.add_argument('--output-dir', default=None, help='output directory (default: a new directory in the output root path)')
+    parser.add_argument('--baseline', default=None, help='results file of a previous run, to check for regressions')
+    parser.add_argument('--max-regression', type=float, default=0.1, help='largest allowed drop of frames per second from the baseline (fraction)')
+    args = parser.parse_args()
+
+    # Only count the per-frame log messages, the benchmark measures the capture path, not the log
+    settings.log_hot_path_quiet = True
+    settings.camera_poll_mode = args.camera_poll_mode
+    settings.capture_encoder_backend = args.encoder_backend
+    FakeCamera.render_cost_s_per_megapixel = args.render_cost_ms / 1000
+    output_dir = args.output_dir or utils.create_output_dir(settings.output_root_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    for case in get_benchmark_cases(args.cameras, args.resolutions, args.image_types, args.formats):
+        results.append(run_benchmark_case(case, output_dir, args.frames, args.capture_freq, args.step_cost_ms / 1000))
+        utils.save_json_file({'results': results}, output_dir, benchmark_results_file_name)
+    logging_mgr.close_logging()
+
+    print(f'{"case":<60} {"fps":>8} {"cpu %":>7} {"MB written":>11}')
+    for result in results:
+        print(f'{result["case"]:<60} {result["fps"]:>8.2f} {result["cpu_percent"]:>7.0f} {result["bytes_written"] / 1e6:>11.1f}')
+    print(f'Results saved in "{utils.join_paths(output_dir, benchmark_results_file_name)}".')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline_results = json.load(file)['results']
+        regressions = find_regressions(results, baseline_results, args.max_regression)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import itertools, time
+import numpy as np
+
+import utils
+from typing import Dict, List
+from type_defs import Float3, Int2, Int3, StrDict
+
+# Annotation configuration of the fake simulator (class name to RGB colour)
+fake_annotation_colours: Dict[str, Int3] = {
+    'BUILDINGS': (70, 70, 70),
+    'CAR': (0, 0, 142),
+    'FENCE': (190, 153, 153),
+    'GROUND': (81, 0, 81),
+    'NATURE': (107, 142, 35),
+    'POLE': (153, 153, 153),
+    'ROAD': (128, 64, 128),
+    'SIDEWALK': (244, 35, 232),
+    'SKY': (70, 130, 180),
+    'TRAFFIC_SIGNS': (220, 220, 0)
+    }
+
+class FakeBeamNGpy:
+    """
+    In-process stand-in for BeamNGpy, used to benchmark the capture path without a simulator.
+
+    Only the calls made by a capture session are implemented. Stepping the simulation sleeps for
+    "step_cost_s" per step, and while the simulation is running (not paused), the simulation time
+    follows the wall clock, as in the realtime capture mode.
+    """
+    def __init__(self, step_cost_s: float = 0.0):
+        """Initialize the fake simulator, paused at simulation time 0."""
+        self.step_cost_s = step_cost_s
+        self.steps_per_second = 60
+        self.env = _FakeEnvironmentApi(self)
+        self.camera = _FakeCameraApi()
+        self.ui = _FakeUiApi()
+        self._simulation_time_s = 0.0
+        # Wall clock time when the simulation was resumed (None while paused)
+        self._resume_wall_time_s: float | None = None
+
+    @property
+    def simulation_time_s(self) -> float:
+        """Get the current simulation time."""
+        if self._resume_wall_time_s is None:
+            return self._simulation_time_s
+        return self._simulation_time_s + time.perf_counter() - self._resume_wall_time_s
+
+    def set_deterministic(self, steps_per_second: int) -> None:
+        self.steps_per_second = steps_per_second
+
+    def step(self, steps: int) -> None:
+        if self.step_cost_s > 0:
+            time.sleep(steps * self.step_cost_s)
+        self._simulation_time_s += steps / self.steps_per_second
+
+    def pause(self) -> None:
+        self._simulation_time_s = self.simulation_time_s
+        self._resume_wall_time_s = None
+
+    def resume(self) -> None:
+        if self._resume_wall_time_s is None:
+            self._resume_wall_time_s = time.perf_counter()
+
+    def close(self) -> None:
+        self.pause()
+
+class _FakeEnvironmentApi:
+    """Time of day calls of the fake simulator, advancing the time of day with the simulation time."""
+    def __init__(self, bng: FakeBeamNGpy):
+        self._bng = bng
+        self._time_of_day = 0.0
+        self._simulation_time_s = 0.0
+        self._play = False
+        self._day_length_s = 1800.0
+
+    def set_tod(self, tod=None, play=None, day_scale=None, night_scale=None, day_length=None, **kwargs) -> None:
+        self._time_of_day = self.get_tod()['time']
+        self._simulation_time_s = self._bng.simulation_time_s
+        if tod is not None:
+            self._time_of_day = utils.hhmmss_to_beamng_time(tod) if isinstance(tod, str) else float(tod)
+        if play is not None:
+            self._play = play
+        if day_length:
+            self._day_length_s = day_length
+
+    def get_tod(self) -> StrDict:
+        time_of_day = self._time_of_day
+        if self._play:
+            time_of_day = (time_of_day + (self._bng.simulation_time_s - self._simulation_time_s) / self._day_length_s) % 1.0
+        return {'time': time_of_day, 'timeStr': utils.beamng_time_to_hhmmss(time_of_day)}
+
+class _FakeCameraApi:
+    """Camera calls of the fake simulator."""
+    def get_annotations(self) -> Dict[str, Int3]:
+        return dict(fake_annotation_colours)
+
+class _FakeUiApi:
+    """UI calls of the fake simulator, messages are discarded."""
+    def display_message(self, message: str) -> None:
+        pass
+
+class FakeVehicle:
+    """Stand-in for a BeamNGpy vehicle, driving forward at a constant speed."""
+    def __init__(self, bng: FakeBeamNGpy, vid: str, speed_ms: float = 15.0):
+        self.vid = vid
+        self.sensors = _FakeVehicleSensors(bng, speed_ms)
+
+    def set_lights(self, **kwargs) -> None:
+        pass
+
+class _FakeVehicleSensors:
+    """Sensors of the fake vehicle, only the state sensor is available."""
+    def __init__(self, bng: FakeBeamNGpy, speed_ms: float):
+        self._bng = bng
+        self._speed_ms = speed_ms
+        self._state: StrDict = {}
+
+    def poll(self, *sensor_names: str) -> None:
+        simulation_time_s = self._bng.simulation_time_s
+        self._state = {
+            'time': simulation_time_s,
+            'pos': [self._speed_ms * simulation_time_s, 0.0, 0.0],
+            'vel': [self._speed_ms, 0.0, 0.0],
+            'dir': [1.0, 0.0, 0.0]
+        }
+
+    def __getitem__(self, sensor_name: str) -> StrDict:
+        return self._state
+
+class FakeAdvancedIMU:
+    """Stand-in for the BeamNGpy advanced IMU sensor, returning constant readings."""
+    def __init__(self, name: str, bng: FakeBeamNGpy, vehicle: FakeVehicle, **kwargs):
+        self.name = name
+
+    def poll(self) -> StrDict:
+        return {'accSmooth': [0.0, 0.0, 9.81], 'angAccel': [0.0, 0.0, 0.0], 'angVelSmooth': [0.0, 0.0, 0.0]}
+
+    def remove(self) -> None:
+        pass
+
+class FakeCamera:
+    """
+    Stand-in for the BeamNGpy camera sensor, returning synthetic raw buffers of its resolution.
+
+    Rendering sleeps for "render_cost_s_per_megapixel" per megapixel of the resolution. The camera cycles
+    through a few pregenerated frames, so the encoders do not compress the same image on every frame.
+    Buffers are returned as bytes copied from the frame, as received from the socket, or as views of the
+    frame when using shared memory.
+    """
+    # Render cost of every fake camera, set by the benchmark before creating the cameras
+    render_cost_s_per_megapixel: float = 0.0
+    # Number of different frames generated per camera
+    num_synthetic_frames: int = 4
+
+    def __init__(self,
+                 name: str,
+                 bng: FakeBeamNGpy,
+                 vehicle: FakeVehicle,
+                 pos: Float3 = None,
+                 dir: Float3 = None,
+                 up: Float3 = None,
+                 resolution: Int2 = (512, 512),
+                 field_of_view_y: float = 70,
+                 near_far_planes: tuple = (0.05, 100.0),
+                 is_using_shared_memory: bool = False,
+                 is_render_colours: bool = True,
+                 is_render_annotations: bool = True,
+                 is_render_depth: bool = True,
+                 **kwargs):
+        self.name = name
+        self.resolution = tuple(resolution)
+        self.near_far_planes = near_far_planes
+        self.is_using_shared_memory = is_using_shared_memory
+        self.is_render_colours = is_render_colours
+        self.is_render_annotations = is_render_annotations
+        self.is_render_depth = is_render_depth
+        width, height = int(resolution[0]), int(resolution[1])
+        self._render_cost_s = FakeCamera.render_cost_s_per_megapixel * width * height / 1e6
+        self._frames = itertools.cycle([_create_synthetic_frame(width, height, frame_num, self._get_render_flags())
+                                        for frame_num in range(FakeCamera.num_synthetic_frames)])
+        # Ready time of every pending ad-hoc render request, keyed by request ID
+        self._render_requests: Dict[int, float] = {}
+        self._next_request_id = 0
+
+    def poll_raw(self) -> StrDict:
+        if self._render_cost_s > 0:
+            time.sleep(self._render_cost_s)
+        return self._get_raw_buffers()
+
+    def send_ad_hoc_poll_request(self) -> int:
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        self._render_requests[request_id] = time.perf_counter() + self._render_cost_s
+        return request_id
+
+    def is_ad_hoc_poll_request_ready(self, request_id: int) -> bool:
+        return time.perf_counter() >= self._render_requests[request_id]
+
+    def send_recv_ge(self, request_type: str, requestId: int, **kwargs) -> StrDict:
+        del self._render_requests[requestId]
+        return {'data': self._get_raw_buffers()}
+
+    def remove(self) -> None:
+        pass
+
+    def _get_render_flags(self) -> List[str]:
+        """Return the image types rendered by the camera."""
+        flags = {'colour': self.is_render_colours, 'annotation': self.is_render_annotations, 'depth': self.is_render_depth}
+        return [image_type for image_type, is_rendered in flags.items() if is_rendered]
+
+    def _get_raw_buffers(self) -> StrDict:
+        """Return the raw buffers of the next synthetic frame."""
+        frame = next(self._frames)
+        if self.is_using_shared_memory:
+            return {image_type: memoryview(array).cast('B') for image_type, array in frame.items()}
+        return {image_type: array.tobytes() for image_type, array in frame.items()}
+
+def _create_synthetic_frame(width: int, height: int, frame_num: int, image_types: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Return a synthetic frame of the given image types, in the layout of the raw camera buffers.
+
+    Colour is a shifting gradient with some noise (RGBA), annotation horizontal bands of the class colours
+    (RGBA) and depth a vertical gradient between the near and far planes (float32 between 0 and 1).
+    """
+    rng = np.random.default_rng(frame_num)
+    rows = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+    columns = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :]
+    frame = {}
+    if 'colour' in image_types:
+        colour = np.empty((height, width, 4), dtype=np.uint8)
+        base = (rows * 160 + columns * 80 + frame_num * 8) % 256
+        noise = rng.integers(0, 16, size=(height, width), dtype=np.uint8)
+        for channel, weight in enumerate((1.0, 0.8, 0.6)):
+            colour[..., channel] = (base * weight).astype(np.uint8) + noise
+        colour[..., 3] = 255
+        frame['colour'] = colour
+    if 'annotation' in image_types:
+        class_colours = np.array(list(fake_annotation_colours.values()), dtype=np.uint8)
+        bands = ((rows * len(class_colours) + frame_num) % len(class_colours)).astype(np.intp)
+        annotation = np.empty((height, width, 4), dtype=np.uint8)
+        annotation[..., :3] = class_colours[np.broadcast_to(bands, (height, width))]
+        annotation[..., 3] = 255
+        frame['annotation'] = annotation
+    if 'depth' in image_types:
+        depth = np.broadcast_to(rows * 0.9 + 0.05 + columns * 0.01 * frame_num, (height, width))
+        frame['depth'] = np.ascontiguousarray(depth, dtype=np.float32)
+    return frame
@@ -0,0 +1,93 @@
+"""
+Startup benchmark, measuring the import time of the program modules.
+
+Each module is imported in a new Python interpreter (as done by the program, its batch workers and its encoder
+processes), several times, and the median import time is reported with the heavy packages it loaded. From the
+"src" folder, run:
+
+    python -m benchmark.startup_benchmark --modules settings process_encoder main cli
+
+Results are saved in "startup_results.json". Passing the results of a previous run with "--baseline" flags the
+modules whose median import time grew by more than "--max-regression" (exit code 1).
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile
+
+# Settings need the BeamNG.tech folder path, which is not used by the imports (also inherited by the measured interpreters)
+os.environ.setdefault('BNG_HOME', tempfile.gettempdir())
+
+import settings, utils
+from typing import List
+from type_defs import StrDict
+
+# Name of the results file, stored in the benchmark output directory
+startup_results_file_name: str = 'startup_results.json'
+# Packages reported when loaded by a module import, as they dominate the startup time
+heavy_packages: List[str] = ['beamngpy', 'scipy', 'pandas', 'matplotlib', 'seaborn', 'PIL', 'numpy', 'tkinter']
+# Code run by each new interpreter, printing the import time and the loaded heavy packages as JSON
+_import_timing_code: str = '''
+import json, sys, time
+start_s = time.perf_counter()
+import {module_name}
+elapsed_s = time.perf_counter() - start_s
+print(json.dumps({{'import_s': elapsed_s, 'packages': [name for name in {heavy_packages!r} if name in sys.modules]}}))
+'''
+
+def measure_import(module_name: str, num_repeats: int) -> StrDict:
+    """Import a module in new interpreters and return its median and minimum import times and loaded heavy packages."""
+    code = _import_timing_code.format(module_name=module_name, heavy_packages=heavy_packages)
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    import_times_s = []
+    packages = []
+    for _ in range(num_repeats):
+        output = subprocess.run([sys.executable, '-c', code], cwd=src_dir, capture_output=True, text=True, check=True).stdout
+        measurement = json.loads(output.strip().splitlines()[-1])
+        import_times_s.append(measurement['import_s'])
+        packages = measurement['packages']
+    return {
+        'module': module_name,
+        'median_ms': statistics.median(import_times_s) * 1000,
+        'min_ms': min(import_times_s) * 1000,
+        'packages': packages
+    }
+
+def find_regressions(results: List[StrDict], baseline_results: List[StrDict], max_regression: float) -> List[str]:
+    """Return a description of every module whose median import time grew by more than the given fraction of the baseline."""
+    baseline_ms = {result['module']: result['median_ms'] for result in baseline_results}
+    regressions = []
+    for result in results:
+        if result['module'] in baseline_ms and result['median_ms'] > baseline_ms[result['module']] * (1 + max_regression):
+            regressions.append(f'{result["module"]}: {result["median_ms"]:.0f} ms (baseline {baseline_ms[result["module"]]:.0f} ms)')
+    return regressions
+
+def main() -> None:
+    """Measure the import time of the modules given in the command line and print the results."""
+    parser = argparse.ArgumentParser(description='Benchmark the import time of the program modules.')
+    parser.add_argument('--modules', nargs='+', default=['settings', 'process_encoder', 'capture_pipeline', 'main', 'cli'], help='modules to import')
+    parser.add_argument('--repeats', type=int, default=5, help='imports per module, each in a new interpreter')
+    parser.add_argument('--output-dir', default=None, help='output directory (default: a new directory in the output root path)')
+    parser.add_argument('--baseline', default=None, help='results file of a previous run, to check for regressions')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='largest allowed growth of the import time from the baseline (fraction)')
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or utils.create_output_dir(settings.output_root_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = [measure_import(module_name, args.repeats) for module_name in args.modules]
+    utils.save_json_file({'python': sys.version, 'results': results}, output_dir, startup_results_file_name)
+
+    print(f'{"module":<20} {"median ms":>10} {"min ms":>8}  heavy packages loaded')
+    for result in results:
+        print(f'{result["module"]:<20} {result["median_ms"]:>10.0f} {result["min_ms"]:>8.0f}  {", ".join(result["packages"])}')
+    print(f'Results saved in "{utils.join_paths(output_dir, startup_results_file_name)}".')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline_results = json.load(file)['results']
+        regressions = find_regressions(results, baseline_results, args.max_regression)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
-from type_defs import Float3, Int2, StrDict, TypedDict
-import utils
+from typing import Dict, Tuple, TypedDict
+from type_defs import Float3, Int2, StrDict
+import image_encoding, utils
 
 class CameraSensorConfigDict(TypedDict):
     name: str
@@ -10,6 +11,9 @@ class CameraSensorConfigDict(TypedDict):
     is_render_depth: bool
     fov_y: int
     near_far_planes: tuple
+    is_using_shared_memory: bool
+    output_formats: Dict[str, str]
+    output_format_options: Dict[str, StrDict]
 
 class CameraSensorConfig:
     """Configuration class for a camera sensor."""
@@ -23,7 +27,10 @@ class CameraSensorConfig:
                  is_render_annotations: bool = None,
                  is_render_depth: bool = None,
                  fov_y: int = None,
-                 near_far_planes: tuple = None):
+                 near_far_planes: tuple = None,
+                 is_using_shared_memory: bool = None,
+                 output_formats: Dict[str, str] = None,
+                 output_format_options: Dict[str, StrDict] = None):
         """Initialize a new camera sensor configuration with the provided parameters."""
         import settings
         self._name = name if name is not None else settings.default_camera_name
@@ -36,6 +43,9 @@ class CameraSensorConfig:
         self._is_render_depth = is_render_depth if is_render_depth is not None else settings.default_camera_render_flags['depth']
         self._fov_y = fov_y if fov_y is not None else settings.default_camera_fov_y
         self._near_far_planes = near_far_planes if near_far_planes is not None else settings.default_camera_near_far_planes
+        self._is_using_shared_memory = is_using_shared_memory if is_using_shared_memory is not None else settings.default_camera_use_shared_memory
+        self._output_formats = output_formats if output_formats is not None else dict(settings.default_camera_output_formats)
+        self._output_format_options = output_format_options if output_format_options is not None else {}
 
     @property
     def name(self) -> str:
@@ -137,6 +147,52 @@ class CameraSensorConfig:
         """Set the near and far planes of the camera sensor."""
         self._near_far_planes = near_far_planes
 
+    @property
+    def is_using_shared_memory(self) -> bool:
+        """Get the shared memory flag of the camera sensor (images received through shared memory instead of the socket)."""
+        return self._is_using_shared_memory
+
+    @is_using_shared_memory.setter
+    def is_using_shared_memory(self, is_using_shared_memory: bool) -> None:
+        """Set the shared memory flag of the camera sensor (images received through shared memory instead of the socket)."""
+        self._is_using_shared_memory = is_using_shared_memory
+
+    @property
+    def output_formats(self) -> Dict[str, str]:
+        """Get the output format name for each image type of the camera sensor."""
+        return self._output_formats
+
+    @output_formats.setter
+    def output_formats(self, output_formats: Dict[str, str]) -> None:
+        """Set the output format name for each image type of the camera sensor."""
+        self._output_formats = output_formats
+
+    @property
+    def output_format_options(self) -> Dict[str, StrDict]:
+        """Get the encoder options of the camera sensor, keyed by format name (override the settings defaults)."""
+        return self._output_format_options
+
+    @output_format_options.setter
+    def output_format_options(self, output_format_options: Dict[str, StrDict]) -> None:
+        """Set the encoder options of the camera sensor, keyed by format name (override the settings defaults)."""
+        self._output_format_options = output_format_options
+
+    def get_output_format(self, image_type: str) -> Tuple[str, StrDict]:
+        """
+        Return the output format name and encoder options for the given image type.
+
+        Image types without a configured format use the settings default, and the
+        camera options for the format are merged over the settings default options.
+        Formats converting to metric depth also receive the camera near/far planes.
+        """
+        import settings
+        format_name = self._output_formats.get(image_type, settings.default_camera_output_formats[image_type])
+        options = dict(settings.default_output_format_options.get(format_name, {}))
+        options.update(self._output_format_options.get(format_name, {}))
+        if image_encoding.get_format(format_name).requires_near_far_planes:
+            options['near_far_planes'] = tuple(self._near_far_planes)
+        return format_name, options
+
     def to_dict(self) -> CameraSensorConfigDict:
         """Convert this camera sensor configuration to a dictionary."""
         return {
@@ -149,21 +205,30 @@ class CameraSensorConfig:
             'is_render_annotations': self._is_render_annotations,
             'is_render_depth': self._is_render_depth,
             'fov_y': self._fov_y,
-            'near_far_planes': self._near_far_planes
+            'near_far_planes': self._near_far_planes,
+            'is_using_shared_memory': self._is_using_shared_memory,
+            'output_formats': self._output_formats,
+            'output_format_options': self._output_format_options
         }
 
     def from_dict(self, config_dict: CameraSensorConfigDict) -> None:
         """Load a camera sensor configuration from a dictionary."""
+        import settings
         self._name = config_dict['name']
-        self._position = config_dict['position']
-        self._direction = config_dict['direction']
-        self._up_vector = config_dict['up_vector']
-        self._resolution = config_dict['resolution']
+        # JSON files store vectors as lists, convert them back to tuples
+        self._position = tuple(config_dict['position'])
+        self._direction = tuple(config_dict['direction'])
+        self._up_vector = tuple(config_dict['up_vector'])
+        self._resolution = tuple(config_dict['resolution'])
         self._is_render_colours = config_dict['is_render_colours']
         self._is_render_annotations = config_dict['is_render_annotations']
         self._is_render_depth = config_dict['is_render_depth']
         self._fov_y = config_dict['fov_y']
-        self._near_far_planes = config_dict['near_far_planes']
+        self._near_far_planes = tuple(config_dict['near_far_planes'])
+        # Shared memory and output formats are optional, to keep loading configurations saved before they were added
+        self._is_using_shared_memory = config_dict.get('is_using_shared_memory', settings.default_camera_use_shared_memory)
+        self._output_formats = config_dict.get('output_formats', dict(settings.default_camera_output_formats))
+        self._output_format_options = config_dict.get('output_format_options', {})
 
     def extract_camera_metadata(self) -> StrDict:
         """
@@ -179,7 +244,8 @@ class CameraSensorConfig:
             'up_vector': self.up_vector,
             'resolution': self.resolution,
             'fov_y': self.fov_y,
-            'near_far_planes': self.near_far_planes
+            'near_far_planes': self.near_far_planes,
+            'output_formats': {image_type: self.get_output_format(image_type)[0] for image_type in image_encoding.image_types}
         }
         return camera_metadata
     
@@ -212,7 +278,19 @@ class CameraSensorConfig:
             raise ValueError("Render annotations flag error: must be a boolean.")
         if not isinstance(self.is_render_depth, bool):
             raise ValueError("Render depth flag error: must be a boolean.")
+        if not isinstance(self.is_using_shared_memory, bool):
+            raise ValueError("Shared memory flag error: must be a boolean.")
         # Check that the near plane is less than the far plane
         near, far = self.near_far_planes
         if far <= near:
             raise ValueError("Camera near/far planes error: far plane value must be greater than near plane.")
+        # Check that every output format exists, is available and supports its image type
+        if not isinstance(self.output_formats, dict):
+            raise ValueError("Camera output formats error: must be a dictionary of image type to format name.")
+        if not isinstance(self.output_format_options, dict) or not all(isinstance(options, dict) for options in self.output_format_options.values()):
+            raise ValueError("Camera output format options error: must be a dictionary of format name to options dictionary.")
+        for image_type, format_name in self.output_formats.items():
+            if image_type not in image_encoding.image_types:
+                raise ValueError(f"Camera output formats error: unknown image type '{image_type}', must be one of {list(image_encoding.image_types)}.")
+            if format_name not in image_encoding.get_format_names(image_type):
+                raise ValueError(f"Camera output formats error: format '{format_name}' is not available for '{image_type}' images. Available formats: {image_encoding.get_format_names(image_type)}.")
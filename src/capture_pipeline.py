@@ -0,0 +1,388 @@
+import collections, queue, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from beamngpy.sensors import Camera
+
+import data_capture_mgr, depth_writer, frame_array_store, image_encoding, logging_mgr, output_sinks, perf_timing, process_encoder
+from annotation_writer import AnnotationClassTable
+from camera_sensor_config import CameraSensorConfig
+from frame_array_store import FrameArrayStore
+from typing import Any, Dict, List, NamedTuple, Tuple
+from type_defs import StrDict
+
+logger = logging_mgr.get_logger(__name__)
+
+class FrameImage(NamedTuple):
+    """Image polled from a camera sensor, waiting to be encoded."""
+    frame_num: int
+    camera_name: str
+    image_type: str
+    image: Any
+    format_name: str
+    format_options: StrDict
+
+class EncodedImage(NamedTuple):
+    """Encoded image data, waiting to be written to local storage (data is None if encoding failed)."""
+    frame_num: int
+    camera_name: str
+    image_type: str
+    extension: str
+    data: bytes | None
+
+class FrameSealed(NamedTuple):
+    """Marker sent to the write stage once every image of a frame has been polled."""
+    frame_num: int
+
+# Sentinel used to signal the encode and write stages to finish
+_STOP = None
+
+class CapturePipeline:
+    """
+    Capture engine that lives for the whole capture session.
+
+    Camera data goes through three stages connected by bounded queues:
+    - Poll: all cameras are polled in parallel for the current frame. In the 'ad_hoc' camera poll mode
+      (see "camera_poll_mode"), a render request is sent to every camera first, and their images
+      are collected as each one is ready, so the simulator renders all cameras concurrently.
+    - Encode: polled images are encoded by a pool of worker threads, either in-thread
+      or by handing them over to a pool of worker processes (see "capture_encoder_backend").
+    - Write: encoded images are written to the output sink (see "output_sink") by a writer thread.
+      Frames are committed to the sink in order, once all their images have been written.
+
+    A frame with an image that could not be polled, encoded or written is incomplete: it is still committed
+    to the sink, but the last committed frame (the session progress recorded in the journal) stops before
+    the first incomplete frame, so resuming the session captures it again.
+
+    Only the poll stage blocks the capture loop, so the simulation can advance
+    to the next frame while the previous ones are still being encoded and written.
+    Images in an array store format (the "memmap" format) skip the encode and
+    write stages, being copied by the poll stage straight into their frame slot.
+    """
+    def __init__(self,
+                 camera_list: List[Camera],
+                 camera_configs: List[CameraSensorConfig],
+                 output_dir: str,
+                 num_frames: int,
+                 annotation_classes: AnnotationClassTable = None,
+                 num_encode_workers: int = None,
+                 queue_size: int = None,
+                 resume_frame: int | None = None):
+        """
+        Initialize the capture pipeline and start its worker threads.
+
+        When resuming an interrupted session (resume frame given, 0 if no frame was committed), the existing
+        outputs are kept up to the frame before the resume frame and any later output is discarded.
+        """
+        import settings
+        self._camera_list = camera_list
+        self._output_dir = output_dir
+        self._output_sink = output_sinks.create_output_sink(output_dir)
+        if resume_frame is not None:
+            self._output_sink.resume(resume_frame)
+        # Frame completion tracking: images still to be written per frame (updated by the poll and write stages)
+        self._pending_images: Dict[int, int] = collections.defaultdict(int)
+        self._pending_images_lock = threading.Lock()
+        # Frames with an image that could not be polled, encoded or written (updated with the pending images)
+        self._incomplete_frames: set = set()
+        # Sealed frames not yet committed, in capture order (only used by the writer thread)
+        self._sealed_frames: collections.deque = collections.deque()
+        self._last_committed_frame = (resume_frame or 0) - 1
+        # First incomplete frame committed, the last committed frame does not move past it (None if every frame is complete)
+        self._first_incomplete_frame: int | None = None
+        # Output format and encoder options of every camera image type, resolved once for the session
+        self._output_formats: Dict[str, Dict[str, Tuple[str, StrDict]]] = {
+            config.name: {image_type: config.get_output_format(image_type) for image_type in image_encoding.image_types}
+            for config in camera_configs
+            }
+        # Formats converting annotation colours to class IDs also receive the class colours
+        for camera_formats in self._output_formats.values():
+            format_name, format_options = camera_formats['annotation']
+            if image_encoding.get_format(format_name).requires_annotation_classes:
+                if annotation_classes is None:
+                    raise ValueError(f'Annotation format "{format_name}" requires the annotation class table.')
+                format_options['class_colours'] = annotation_classes.class_colours
+        # Preallocated array stores of the camera image types using an array store format, keyed by (camera name, image type)
+        self._array_stores: Dict[Tuple[str, str], FrameArrayStore] = {}
+        for config in camera_configs:
+            # Image types not rendered by the camera get no store
+            rendered_image_types = {'colour': config.is_render_colours, 'annotation': config.is_render_annotations, 'depth': config.is_render_depth}
+            for image_type, (format_name, format_options) in self._output_formats[config.name].items():
+                if rendered_image_types[image_type] and image_encoding.get_format(format_name).is_array_store:
+                    self._array_stores[(config.name, image_type)] = frame_array_store.create_frame_array_store(output_dir,
+                                                                                                              config.name,
+                                                                                                              image_type,
+                                                                                                              num_frames,
+                                                                                                              config.resolution,
+                                                                                                              format_options,
+                                                                                                              resume_frame)
+        self._num_encode_workers = num_encode_workers if num_encode_workers is not None else settings.capture_num_encode_workers
+        # With the process backend, each encode thread dispatches to a worker process and waits for its result
+        self._process_encoder = None
+        if settings.capture_encoder_backend == 'process':
+            self._process_encoder = process_encoder.ProcessPoolEncoder(process_encoder.get_num_encode_processes())
+            self._num_encode_workers = self._process_encoder.num_processes
+        elif settings.capture_encoder_backend != 'thread':
+            logger.warning(f'Unknown capture encoder backend "{settings.capture_encoder_backend}", using "thread".')
+        # Render requests of the previous frame not ready in time, collected before sending the next ones ('ad_hoc' mode)
+        self._late_render_requests: Dict[str, Tuple[Camera, int]] = {}
+        self._camera_poll_mode = settings.camera_poll_mode
+        if self._camera_poll_mode not in ('sync', 'ad_hoc'):
+            logger.warning(f'Unknown camera poll mode "{self._camera_poll_mode}", using "sync".')
+            self._camera_poll_mode = 'sync'
+        queue_size = queue_size if queue_size is not None else settings.capture_queue_size
+        self._closed = False
+        # Bounded queues between stages, a full queue blocks the previous stage (back-pressure)
+        self._encode_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._write_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        # Poll stage: one persistent worker per camera
+        self._poll_executor = ThreadPoolExecutor(max_workers=max(1, len(camera_list)),
+                                                 thread_name_prefix='camera_poll')
+        # Encode stage: pool of persistent worker threads
+        self._encode_threads = [threading.Thread(target=self._encode_worker,
+                                                 name=f'camera_encode_{i}',
+                                                 daemon=True)
+                                for i in range(max(1, self._num_encode_workers))]
+        # Write stage: single writer thread to keep disk access sequential
+        self._write_thread = threading.Thread(target=self._write_worker,
+                                              name='camera_write',
+                                              daemon=True)
+        for thread in self._encode_threads:
+            thread.start()
+        self._write_thread.start()
+        backend = 'process' if self._process_encoder else 'thread'
+        logger.info(f'Capture pipeline started with {len(camera_list)} cameras and {len(self._encode_threads)} encode workers ({backend} backend).')
+
+    def capture_frame(self, frame_num: int) -> None:
+        """
+        Poll all cameras for the given frame and queue their images for encoding.
+
+        Returns once every camera has been polled, encoding and writing continue in the background.
+        """
+        if self._closed:
+            raise RuntimeError('Capture pipeline is closed.')
+        if self._camera_poll_mode == 'ad_hoc':
+            futures = self._collect_camera_renders(frame_num)
+        else:
+            futures = [self._poll_executor.submit(self._poll_camera, camera, frame_num)
+                       for camera in self._camera_list]
+        wait(futures)
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f'Error polling camera data for frame {frame_num}: {e}')
+                self._mark_frame_incomplete(frame_num)
+        # Every image of the frame has been queued, let the write stage know it can commit it once written
+        self._write_queue.put(FrameSealed(frame_num))
+
+    @property
+    def last_committed_frame(self) -> int:
+        """Get the number of the last frame fully written to the output sink, before any incomplete frame (-1 if none)."""
+        return self._last_committed_frame
+
+    @property
+    def first_incomplete_frame(self) -> int | None:
+        """Get the number of the first committed frame missing images (None if every committed frame is complete)."""
+        return self._first_incomplete_frame
+
+    def close(self) -> None:
+        """Flush all queued images to local storage and stop the worker threads."""
+        if self._closed:
+            return
+        self._closed = True
+        # Wait for any pending polls, then stop the encode workers
+        self._poll_executor.shutdown(wait=True)
+        for _ in self._encode_threads:
+            self._encode_queue.put(_STOP)
+        for thread in self._encode_threads:
+            thread.join()
+        if self._process_encoder:
+            self._process_encoder.close()
+        # Once every image is encoded, stop the writer
+        self._write_queue.put(_STOP)
+        self._write_thread.join()
+        for array_store in self._array_stores.values():
+            array_store.close()
+        if self._array_stores:
+            frame_array_store.save_array_store_index(self._output_dir, self._array_stores)
+        logger.info('Capture pipeline flushed and closed.')
+
+    def _poll_camera(self, camera: Camera, frame_num: int) -> None:
+        """
+        Poll a camera sensor and queue its images for the encode stage.
+
+        Images of cameras using shared memory are views of the shared memory, which is overwritten
+        by the next poll: they are copied straight into their array store, or copied once before
+        being queued for encoding.
+        """
+        images = data_capture_mgr.poll_camera_images(camera)
+        self._queue_camera_images(camera, frame_num, images, getattr(camera, 'is_using_shared_memory', False))
+
+    def _collect_camera_renders(self, frame_num: int) -> List[Future]:
+        """
+        Send a render request to every camera, then collect their images as each request is ready.
+
+        The images of each camera are queued for the encode stage by the poll workers, while the next
+        cameras are collected. Returns the futures of the queued cameras. Cameras whose request fails
+        or is not ready before "camera_ad_hoc_timeout_s" are logged and skipped, marking the frame incomplete.
+        Requests not ready in time are collected (and discarded) before the requests of the next frame are sent.
+        """
+        import settings
+        self._drain_late_render_requests()
+        # Issue every request before collecting any, so the simulator renders all cameras concurrently
+        pending_requests: Dict[str, Tuple[Camera, int]] = {}
+        for camera in self._camera_list:
+            try:
+                pending_requests[camera.name] = (camera, data_capture_mgr.send_camera_render_request(camera))
+            except Exception as e:
+                logger.error(f'Error requesting camera "{camera.name}" render for frame {frame_num}: {e}')
+                self._mark_frame_incomplete(frame_num)
+        futures = []
+        deadline = time.monotonic() + settings.camera_ad_hoc_timeout_s
+        while pending_requests:
+            for camera_name, (camera, request_id) in list(pending_requests.items()):
+                try:
+                    if not data_capture_mgr.is_camera_render_ready(camera, request_id):
+                        continue
+                    images = data_capture_mgr.collect_camera_images(camera, request_id)
+                except Exception as e:
+                    logger.error(f'Error collecting camera "{camera_name}" render for frame {frame_num}: {e}')
+                    del pending_requests[camera_name]
+                    self._mark_frame_incomplete(frame_num)
+                    continue
+                del pending_requests[camera_name]
+                # Collected buffers are owned by this frame, no copy is needed before queueing them
+                futures.append(self._poll_executor.submit(self._queue_camera_images, camera, frame_num, images, False))
+            if pending_requests:
+                if time.monotonic() > deadline:
+                    logger.error(f'Camera render requests not ready in time for frame {frame_num}: {list(pending_requests)}.')
+                    self._late_render_requests = pending_requests
+                    self._mark_frame_incomplete(frame_num)
+                    break
+                time.sleep(settings.camera_ad_hoc_check_interval_s)
+        return futures
+
+    def _drain_late_render_requests(self) -> None:
+        """
+        Collect and discard the render requests of the previous frame that were not ready in time.
+
+        Waits up to "camera_ad_hoc_timeout_s" for them, so they do not pile up in the simulator request queue.
+        Requests still not ready are dropped with an error.
+        """
+        import settings
+        deadline = time.monotonic() + settings.camera_ad_hoc_timeout_s
+        while self._late_render_requests:
+            for camera_name, (camera, request_id) in list(self._late_render_requests.items()):
+                try:
+                    if not data_capture_mgr.is_camera_render_ready(camera, request_id):
+                        continue
+                    data_capture_mgr.collect_camera_images(camera, request_id)
+                    logger.info(f'Late camera "{camera_name}" render request {request_id} collected and discarded.')
+                except Exception as e:
+                    logger.error(f'Error collecting late camera "{camera_name}" render request {request_id}: {e}')
+                del self._late_render_requests[camera_name]
+            if self._late_render_requests:
+                if time.monotonic() > deadline:
+                    logger.error(f'Late camera render requests dropped: {list(self._late_render_requests)}.')
+                    self._late_render_requests = {}
+                    break
+                time.sleep(settings.camera_ad_hoc_check_interval_s)
+
+    def _queue_camera_images(self, camera: Camera, frame_num: int, images: Dict[str, Any], is_shared_memory_view: bool) -> None:
+        """Write the images of a camera into their array stores, or queue them for the encode stage."""
+        for image_type, image in images.items():
+            array_store = self._array_stores.get((camera.name, image_type))
+            if array_store:
+                with perf_timing.stage('array_store_write'):
+                    array_store.write(frame_num, image)
+                continue
+            if is_shared_memory_view:
+                with perf_timing.stage('convert'):
+                    image = image.copy()
+            format_name, format_options = self._output_formats[camera.name][image_type]
+            with self._pending_images_lock:
+                self._pending_images[frame_num] += 1
+            self._encode_queue.put(FrameImage(frame_num, camera.name, image_type, image, format_name, format_options))
+
+    def _encode_worker(self) -> None:
+        """Encode queued images until the stop sentinel is received."""
+        while True:
+            item = self._encode_queue.get()
+            if item is _STOP:
+                break
+            data = None
+            try:
+                data = self._encode(item.image, item.image_type, item.format_name, item.format_options)
+            except Exception as e:
+                logger.error(f'Error encoding {item.image_type} image for camera {item.camera_name}: {e}')
+            # Failed images are still sent to the write stage, which marks their frame incomplete
+            extension = image_encoding.get_format(item.format_name).extension
+            self._write_queue.put(EncodedImage(item.frame_num, item.camera_name, item.image_type, extension, data))
+
+    def _encode(self, image: Any, image_type: str, format_name: str, format_options: StrDict) -> bytes:
+        """Encode an image array in the given format, using the configured encoder backend."""
+        # Formats without metric depth support store depth as legacy 8-bit intensity images
+        if image_type == 'depth' and not image_encoding.get_format(format_name).requires_near_far_planes:
+            with perf_timing.stage('convert'):
+                image = depth_writer.depth_to_intensity(image)
+        with perf_timing.stage('encode'):
+            if self._process_encoder:
+                return self._process_encoder.encode(image, format_name, format_options)
+            return image_encoding.encode_image_array(image, format_name, format_options)
+
+    def _write_worker(self) -> None:
+        """Write encoded images to the output sink until the stop sentinel is received."""
+        while True:
+            item = self._write_queue.get()
+            if item is _STOP:
+                break
+            if isinstance(item, FrameSealed):
+                self._sealed_frames.append(item.frame_num)
+            else:
+                is_written = False
+                if item.data is not None:
+                    try:
+                        with perf_timing.stage('write'):
+                            self._output_sink.write(item.frame_num, item.camera_name, item.image_type, item.extension, item.data)
+                        is_written = True
+                    except Exception as e:
+                        logger.error(f'Error writing {item.image_type} image for camera {item.camera_name}: {e}')
+                with self._pending_images_lock:
+                    self._pending_images[item.frame_num] -= 1
+                    if not is_written:
+                        self._incomplete_frames.add(item.frame_num)
+            self._commit_written_frames()
+        try:
+            self._output_sink.close()
+        except Exception as e:
+            logger.error(f'Error closing output sink: {e}')
+
+    def _commit_written_frames(self) -> None:
+        """
+        Commit, in capture order, every sealed frame whose images have all been written (or failed).
+
+        The last committed frame only moves up to the frame before the first incomplete one.
+        """
+        while self._sealed_frames:
+            frame_num = self._sealed_frames[0]
+            with self._pending_images_lock:
+                if self._pending_images[frame_num] > 0:
+                    return
+                del self._pending_images[frame_num]
+                is_complete = frame_num not in self._incomplete_frames
+                self._incomplete_frames.discard(frame_num)
+            try:
+                self._output_sink.commit_frame(frame_num)
+            except Exception as e:
+                logger.error(f'Error committing frame {frame_num} to output sink: {e}')
+                is_complete = False
+            self._sealed_frames.popleft()
+            if not is_complete and self._first_incomplete_frame is None:
+                self._first_incomplete_frame = frame_num
+                logger.warning(f'Frame {frame_num} is missing images, the session progress stops before it so a resume captures it again.')
+            if self._first_incomplete_frame is None:
+                self._last_committed_frame = frame_num
+
+    def _mark_frame_incomplete(self, frame_num: int) -> None:
+        """Record that an image of the given frame could not be polled, encoded or written."""
+        with self._pending_images_lock:
+            self._incomplete_frames.add(frame_num)
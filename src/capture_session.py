@@ -0,0 +1,279 @@
+import time
+from beamngpy import BeamNGpy
+
+import capture_pipeline, data_capture_mgr, frame_pacer, logging_mgr, metadata_writer, perf_timing, sampling_profiler, scenario_mgr, session_journal, settings, simulation_mgr, time_of_day_model, vehicle_mgr, utils
+from annotation_writer import AnnotationClassTable
+from session_config import SessionConfig
+from session_journal import SessionJournal
+
+logger = logging_mgr.get_logger(__name__)
+
+def run_capture_session(bng: BeamNGpy,
+                        session: SessionConfig,
+                        output_dir: str,
+                        random_seed: int,
+                        journal: SessionJournal | None = None) -> None:
+    """
+    Run a capture session on a connected simulator, saving its data in the output directory.
+
+    Sets up the session scenario (reusing the loaded map if possible), captures every frame and
+    removes the session sensors, leaving the simulator paused and ready for the next session.
+    If the journal of an interrupted session is given, the session is resumed from its next frame.
+    Raises ValueError if the session parameters are invalid.
+    """
+    # Set random seed for reproducibility
+    utils.set_random_seed(random_seed)
+
+    # Set up the scenario and vehicle of the session, reusing the loaded map if possible,
+    # with the specified weather and number of AI traffic vehicles
+    scenario, ego = scenario_mgr.set_up_session_scenario(bng, session)
+
+    # Create all camera sensors configured for the capture session
+    camera_list = []
+    for camera_config in session.cameras:
+        # Create camera sensor and attach it to the vehicle
+        camera_sensor = data_capture_mgr.create_camera_sensor(bng,
+                                                              ego,
+                                                              camera_config)
+        # Add the camera sensor to the list
+        camera_list.append(camera_sensor)
+
+    # Log a warning if no camera sensors are created for the capture session
+    if not camera_list:
+        logger.warning('No camera sensors created for the capture session.')
+
+    # Create an IMU sensor and attach it to the vehicle
+    sensor_imu = data_capture_mgr.create_imu_sensor(bng,
+                                                    ego,
+                                                    'sensor_imu')
+
+    # Capture pipeline used to poll, encode and write camera data, started once the session is validated
+    camera_capture_pipeline = None
+    # Writer saving the frame metadata to local storage as each frame is captured
+    frame_metadata_writer = None
+    # First frame to capture (later than 0 when resuming) and last frame whose metadata has been written
+    start_frame = journal.last_committed_frame + 1 if journal else 0
+    last_written_frame = start_frame - 1
+    # Frame the outputs of a journaled session are resumed from (also when no frame was committed), None for a new session
+    resume_frame = start_frame if journal else None
+    # Round trips to the simulator saved by the frame snapshots, and UI progress messages skipped
+    snapshot_saved_round_trips = 0
+    num_skipped_messages = 0
+    # Pacer of the capture loop, only used if the capture frequency is not forced
+    capture_frame_pacer = None
+    # Recorder of the time spent in each stage of the capture loop (None if disabled)
+    perf_recorder = None
+    # Sampling profiler of the capture loop (None if disabled)
+    loop_profiler = None
+
+    try:
+        # If a starting waypoint was assigned, teleport vehicle to it
+        if (session.starting_waypoint):
+            scenario_mgr.teleport_vehicle_to_waypoint(bng,
+                                                      scenario,
+                                                      ego,
+                                                      session.starting_waypoint)
+
+        # Set up session parameters
+        session_length_s = session.duration_s
+        capture_freq_hz = session.capture_freq_hz
+
+        capture_period_s = 1 / capture_freq_hz
+        num_frames = int(session_length_s * capture_freq_hz)
+
+        logger.info(f'Starting capture session for {session_length_s} seconds with {capture_freq_hz} Hz capture frequency.')
+        logger.info(f'Capturing {num_frames} total frames.')
+
+        # Produce error if session length isn't larger than 0
+        if session_length_s <= 0:
+            raise ValueError('Session length must be a positive number.')
+    
+        # Produce error if capture frequency isn't larger than 0
+        if capture_freq_hz <= 0:
+            raise ValueError('Capture frequency must be a positive number.')
+    
+        # Produce error if capture frequency is larger than simulation steps per second
+        if capture_freq_hz > simulation_mgr.simulation_steps_per_second:
+            raise ValueError('Capture frequency cannot be larger than simulation steps per second.')
+    
+        # Produce error if the number of frames is not bigger than 0
+        if num_frames <= 0:
+            raise ValueError('Number of frames must be a positive number.')
+    
+        if journal:
+            # The journaled session must produce the same frames
+            if journal.num_frames != num_frames:
+                raise ValueError(f'Journaled session has {journal.num_frames} frames, but its configuration gives {num_frames}.')
+            logger.info(f'Resuming capture session from frame {start_frame}.')
+        else:
+            # Record the session in a journal before capturing any frame
+            journal = session_journal.create_session_journal(output_dir, session, random_seed, num_frames)
+
+        # Build the table used to store semantic annotations as class IDs
+        annotation_class_table = AnnotationClassTable(simulation_mgr.get_annotation_colours(bng))
+
+        # Extract and save general session metadata, including the annotation class table
+        session_metadata = session.extract_session_metadata()
+        session_metadata['annotation_classes'] = annotation_class_table.to_metadata()
+        data_capture_mgr.save_metadata(session_metadata, output_dir, 'session_metadata.json')
+
+        # Start the capture pipeline for the whole session
+        camera_capture_pipeline = capture_pipeline.CapturePipeline(camera_list,
+                                                                   session.cameras,
+                                                                   output_dir,
+                                                                   num_frames,
+                                                                   annotation_class_table,
+                                                                   resume_frame=resume_frame)
+
+        # Open the frame metadata writers, each frame is written once captured
+        frame_metadata_writer = metadata_writer.create_frame_metadata_writer(output_dir, num_frames, resume_frame)
+
+        # Initialize variables used for night-time checks, the time of day is predicted locally from the simulation time
+        headlights_on = False
+        session_time_of_day_model = time_of_day_model.create_time_of_day_model()
+        # Frames where the headlights must be switched, predicted on the first frame when the capture frequency is forced
+        headlight_toggle_frames = None
+        # Set the time of day settings for the session
+        simulation_mgr.set_time_of_day(bng,
+                                       time_of_day=session.time,
+                                       play=settings.play_time,
+                                       day_scale=settings.day_scale,
+                                       night_scale=settings.night_scale,
+                                       day_length=settings.day_length_s)
+
+        # Initialize minimum start delay
+        start_delay_s = 1
+        if (settings.default_start_delay_s > start_delay_s):
+            start_delay_s = settings.default_start_delay_s
+        # Skip initial seconds to allow the simulation to stabilize
+        simulation_mgr.step_simulation_seconds(bng, start_delay_s)
+
+        # When resuming, fast-forward the simulation to the time of the first frame to capture
+        if start_frame > 0:
+            simulation_mgr.step_simulation_seconds(bng, start_frame * capture_period_s)
+            logger.info(f'Simulation fast-forwarded to frame {start_frame}.')
+
+        # Check if the capture frequency should be forced
+        force_capture_freq_hz = settings.force_capture_freq_hz
+        # If capture frequency is lower than the minimum non-force capture frequency value, force it
+        if capture_freq_hz < settings.min_non_force_capture_freq_hz:
+            force_capture_freq_hz = True
+    
+        # If the capture frequency is not forced, resume simulation and pace the capture loop to the simulation time
+        if not force_capture_freq_hz:
+            capture_frame_pacer = frame_pacer.create_frame_pacer(capture_period_s,
+                                                                 lambda: data_capture_mgr.extract_vehicle_simulation_time(ego))
+            simulation_mgr.resume_simulation(bng)
+
+        # Time every stage of the capture loop, from here until the session finishes
+        perf_recorder = perf_timing.start_recording()
+        loop_profiler = sampling_profiler.start_profiling('capture_loop')
+
+        # Main capture loop and logic
+        for cur_frame_num in range(start_frame, num_frames):
+            frame_start_ns = time.perf_counter_ns()
+            # Fetch the time of day, vehicle state and IMU readings of the frame once, every check below reads them from the snapshot
+            with perf_timing.stage('snapshot'):
+                frame_snapshot = data_capture_mgr.take_frame_snapshot(bng, ego, sensor_imu, session_time_of_day_model)
+
+            # With a forced capture frequency every frame is a fixed period apart, so the headlight switches can be predicted once
+            if force_capture_freq_hz and headlight_toggle_frames is None:
+                headlight_toggle_frames = set(session_time_of_day_model.predict_headlight_toggle_frames(frame_snapshot.simulation_time,
+                                                                                                        capture_period_s,
+                                                                                                        cur_frame_num,
+                                                                                                        num_frames))
+                logger.info(f'Headlights predicted to switch on frames {sorted(headlight_toggle_frames)}.')
+
+            # Check time of day
+            if headlight_toggle_frames is not None:
+                is_night_time = headlights_on != (cur_frame_num in headlight_toggle_frames)
+            else:
+                is_night_time = session_time_of_day_model.is_night_time(frame_snapshot.time_of_day)
+            # If it's night, turn on the headlights
+            if is_night_time and not headlights_on:
+                vehicle_mgr.set_headlights(ego, settings.headlights_intensity)
+                headlights_on = True
+            # If it's day, turn off the headlights
+            elif not is_night_time and headlights_on:
+                vehicle_mgr.set_headlights(ego, 0)
+                headlights_on = False
+
+            # Poll all camera sensors, their data is encoded and saved in the background
+            with perf_timing.stage('camera_capture'):
+                camera_capture_pipeline.capture_frame(cur_frame_num)
+
+            # Combine and save the frame metadata from the snapshot
+            frame_metadata = {}
+            frame_metadata.update({'frame': cur_frame_num})
+            frame_metadata.update(frame_snapshot.to_metadata())
+            with perf_timing.stage('metadata_write'):
+                frame_metadata_writer.write(frame_metadata)
+            last_written_frame = cur_frame_num
+
+            # Periodically record the last frame whose images and metadata are all written
+            if (cur_frame_num + 1) % settings.session_journal_interval_frames == 0:
+                journal.update_progress(min(camera_capture_pipeline.last_committed_frame, last_written_frame))
+
+            # Show the progress in the simulator UI every few frames, each message is a round trip
+            if cur_frame_num % settings.frame_message_interval_frames == 0 or cur_frame_num == num_frames - 1:
+                simulation_mgr.display_message(bng, f'Frame {cur_frame_num} captured.')
+            else:
+                logging_mgr.log_frame_action(logger, f'Frame {cur_frame_num} captured.')
+                num_skipped_messages += 1
+
+            # Use the snapshot of the 'ego' vehicle state to check the current simulation time
+            current_sim_time_s = frame_snapshot.simulation_time
+            snapshot_saved_round_trips += frame_snapshot.saved_round_trips
+            logging_mgr.log_frame_action(logger, f'Frame {cur_frame_num} snapshot: {frame_snapshot.round_trips} round trips, {frame_snapshot.saved_round_trips} saved.')
+
+            # If not on the last captured frame, advance time by the capture period
+            if cur_frame_num < (num_frames - 1):
+                if force_capture_freq_hz:
+                    # If capture frequency is forced
+                    # Advance the simulation by the corresponding number of seconds for the capture period
+                    with perf_timing.stage('step'):
+                        simulation_mgr.step_simulation_seconds(bng, capture_period_s)
+                else:
+                    # If capture frequency is not forced
+                    # Sleep until the next frame is predicted to be due, checking the simulation time only a few times
+                    capture_frame_pacer.mark_frame(current_sim_time_s, frame_snapshot.wall_time)
+                    with perf_timing.stage('pacing_wait'):
+                        capture_frame_pacer.wait_for_next_frame(cur_frame_num)
+
+            # Record the time spent in the whole frame
+            if perf_recorder:
+                perf_recorder.record('frame', frame_start_ns, time.perf_counter_ns())
+                perf_recorder.count_frame()
+
+    finally:
+        # Stop profiling before flushing, so the profile only covers the capture loop
+        if loop_profiler:
+            loop_profiler.stop()
+            loop_profiler.save(output_dir, settings.profile_top_n)
+        # Flush any camera data still being encoded or written
+        if camera_capture_pipeline:
+            camera_capture_pipeline.close()
+        if frame_metadata_writer:
+            frame_metadata_writer.close()
+        # Record the final progress, so an interrupted session can be resumed from the next frame
+        if journal and camera_capture_pipeline:
+            last_committed_frame = min(camera_capture_pipeline.last_committed_frame, last_written_frame)
+            journal.update_progress(last_committed_frame, completed=last_committed_frame == journal.num_frames - 1)
+        # Remove the session sensors and pause the simulation, so the simulator can be reused by another session
+        num_captured_frames = last_written_frame - start_frame + 1
+        if num_captured_frames > 0:
+            logger.info(f'Frame snapshots saved {snapshot_saved_round_trips} round trips to the simulator '
+                        f'({snapshot_saved_round_trips / num_captured_frames:.1f} per frame).')
+            logger.info(f'{num_skipped_messages} frame progress messages not shown in the simulator UI '
+                        f'(shown every {settings.frame_message_interval_frames} frames).')
+        if capture_frame_pacer:
+            capture_frame_pacer.log_statistics()
+        # Save the time spent in each stage, once the pipeline has flushed every image
+        if perf_recorder:
+            perf_timing.stop_recording()
+            perf_recorder.save_report(output_dir, capture_freq_hz)
+        for sensor in camera_list + [sensor_imu]:
+            data_capture_mgr.remove_sensor(sensor)
+        simulation_mgr.pause_simulation(bng)
+        logging_mgr.log_frame_action_counts()
+        logger.info('Capture session finished.')
@@ -0,0 +1,80 @@
+"""
+Command line entry point, running capture sessions without GUI (the GUI modules are never imported).
+
+From the project root, run a session configuration file, a batch of them, or resume an interrupted session:
+
+    python src/cli.py session.json
+    python src/cli.py sessions_dir/ other_session.json --instances 2
+    python src/cli.py --resume path/to/session_output_dir
+    python src/cli.py --sweep sweep.json
+
+Any variable of settings.py can be overridden with "--set name=value" (values are parsed as JSON,
+or taken as strings otherwise). Errors are written to stderr and to the log, and end the program
+with a non-zero exit code.
+"""
+import argparse, json, os
+
+import settings, utils
+from typing import Any, List, Tuple
+
+def parse_setting_override(override: str) -> Tuple[str, Any]:
+    """Parse a "name=value" settings override, with the value as JSON (or as a string if it is not valid JSON)."""
+    name, separator, value = override.partition('=')
+    name = name.strip()
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f'Invalid settings override "{override}", expected "name=value".')
+    if not hasattr(settings, name):
+        raise argparse.ArgumentTypeError(f'Unknown setting "{name}".')
+    try:
+        return name, json.loads(value)
+    except json.JSONDecodeError:
+        return name, value
+
+def apply_arguments(args: argparse.Namespace) -> None:
+    """Set the settings used by the program from the command line arguments."""
+    for name, value in args.overrides:
+        setattr(settings, name, value)
+    if args.output_root is not None:
+        settings.output_root_path = args.output_root
+    if args.port is not None:
+        settings.beamng_port = args.port
+    if args.instances is not None:
+        settings.parallel_num_instances = args.instances
+    if args.seed is not None:
+        settings.random_seed = args.seed
+    if args.resume:
+        settings.resume_output_dir = args.resume
+    elif len(args.configs) == 1 and not args.sweep and os.path.isfile(args.configs[0]):
+        # A single configuration file runs a single session in the output directory
+        settings.session_config_path = args.configs[0]
+    else:
+        settings.batch_session_config_paths = args.configs
+        settings.session_sweep_path = args.sweep or ''
+
+def main_cli(argv: List[str] | None = None) -> None:
+    """Parse the command line and run the requested capture sessions."""
+    parser = argparse.ArgumentParser(description='Capture data from BeamNG.tech sessions without GUI.')
+    parser.add_argument('configs', nargs='*', help='session configuration files or directories (several run as a batch)')
+    parser.add_argument('--resume', metavar='OUTPUT_DIR', help='output directory of an interrupted session to resume')
+    parser.add_argument('--sweep', help='parameter sweep file, expanded into a batch of sessions (run after the given configurations)')
+    parser.add_argument('--output-root', help='directory where the output directory is created')
+    parser.add_argument('--port', type=int, help='port of the (first) simulator instance')
+    parser.add_argument('--instances', type=int, help='simulator instances running a batch in parallel')
+    parser.add_argument('--seed', type=int, help='random seed')
+    parser.add_argument('--set', dest='overrides', metavar='NAME=VALUE', type=parse_setting_override, action='append', default=[],
+                        help='override a variable of settings.py (value parsed as JSON)')
+    args = parser.parse_args(argv)
+    if bool(args.configs or args.sweep) == bool(args.resume):
+        parser.error('give either session configuration paths and/or --sweep, or --resume.')
+    apply_arguments(args)
+    # Imported here, so processes started with "spawn" importing this module again do not load the session modules
+    import main
+    main.main()
+
+if __name__ == '__main__':
+    try:
+        main_cli()
+    except Exception as e:
+        # Report unexpected errors in the log too (if set up), then exit with the traceback
+        utils.log_and_show_error(f'Unexpected error: {e}')
+        raise
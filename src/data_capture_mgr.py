@@ -1,12 +1,18 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+
+import numpy as np
 from beamngpy.sensors import Camera, AdvancedIMU
 from beamngpy import BeamNGpy
 from beamngpy.vehicle import Vehicle
 
-import logging_mgr, simulation_mgr, utils
+import logging_mgr, perf_timing, simulation_mgr, utils
 from camera_sensor_config import CameraSensorConfig
+from time_of_day_model import TimeOfDayModel
+from typing import Dict
 from type_defs import StrDict
 
+logger = logging_mgr.get_logger(__name__)
+
 def create_camera_sensor(bng: BeamNGpy,
                          vehicle: Vehicle,
                          camera: CameraSensorConfig) -> Camera:
@@ -20,6 +26,7 @@ def create_camera_sensor(bng: BeamNGpy,
                            resolution=camera.resolution,
                            field_of_view_y=camera.fov_y,
                            near_far_planes=camera.near_far_planes,
+                           is_using_shared_memory=camera.is_using_shared_memory,
                            is_render_colours=camera.is_render_colours,
                            is_render_annotations=camera.is_render_annotations,
                            is_render_depth=camera.is_render_depth)
@@ -39,74 +46,137 @@ def create_imu_sensor(bng: BeamNGpy,
                              is_send_immediately=True)
     return sensor_imu
 
-def save_camera_image_data(camera: Camera, output_dir: str, frame_num: int) -> None:
-    """Poll the camera sensor and save its image data to local storage."""
-    sensor_data = camera.poll()
-    logging_mgr.log_action(f'Camera "{camera.name}" data polled.')
-
-    try:
-        frame_str = f"{frame_num:05d}"
-        if getattr(camera, "is_render_colours", False):
-            color_image = sensor_data['colour'].convert('RGB')
-            color_path = utils.join_paths(output_dir, f'frame_{frame_str}_{camera.name}_color.png')
-            color_image.save(color_path)
-        if getattr(camera, "is_render_depth", False):
-            depth_image = sensor_data['depth']
-            depth_path = utils.join_paths(output_dir, f'frame_{frame_str}_{camera.name}_depth.png')
-            depth_image.save(depth_path)
-        if getattr(camera, "is_render_annotations", False):
-            semantic_image = sensor_data['annotation']
-            semantic_path = utils.join_paths(output_dir, f'frame_{frame_str}_{camera.name}_semantic.png')
-            semantic_image.save(semantic_path)
-    except Exception as e:
-        logging_mgr.log_error(f'Error saving image for camera {camera.name}: {e}')
-
-    logging_mgr.log_action(f'Camera "{camera.name}" data saved for frame {frame_num} in "{output_dir}".')
-
-def save_all_camera_image_data(camera_list, output_dir, frame_num):
-    """Extract and save all camera image data in parallel from a list of camera sensors."""
-    with ThreadPoolExecutor() as executor:
-        futures = []
-        for camera_sensor in camera_list:
-            futures.append(executor.submit(save_camera_image_data, camera_sensor, output_dir, frame_num))
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                logging_mgr.log_error(f'Error saving camera data: {e}')
+def remove_sensor(sensor: Camera | AdvancedIMU) -> None:
+    """Remove a camera or IMU sensor from the simulator."""
+    sensor.remove()
+    logger.info(f'Sensor "{sensor.name}" removed.')
+
+# File name suffix used for each camera image type
+image_file_suffixes: Dict[str, str] = {
+    'colour': 'color',
+    'depth': 'depth',
+    'annotation': 'semantic'
+    }
+
+def poll_camera_images(camera: Camera) -> Dict[str, np.ndarray]:
+    """
+    Poll the camera sensor and return its raw rendered buffers as pixel arrays, keyed by image type.
+
+    Colour images are returned as RGB (alpha channel dropped), annotation images as RGBA,
+    and depth as float32 values normalized between the near (0) and far (1) planes.
+
+    Arrays are views of the received buffers, without any copy. For cameras using shared memory,
+    they are views of the shared memory itself, only valid until the camera is polled again.
+    """
+    with perf_timing.stage(f'camera_poll.{camera.name}'):
+        raw_data = camera.poll_raw()
+    logging_mgr.log_frame_action(logger, f'Camera "{camera.name}" data polled.')
+    with perf_timing.stage('convert'):
+        return _decode_camera_buffers(camera, raw_data)
+
+def send_camera_render_request(camera: Camera) -> int:
+    """
+    Ask the simulator to render the camera sensor now, without waiting for the result.
+
+    Returns the ID of the render request, used to check if it is ready and to collect its images.
+    """
+    request_id = camera.send_ad_hoc_poll_request()
+    logging_mgr.log_frame_action(logger, f'Camera "{camera.name}" render request {request_id} sent.')
+    return request_id
+
+def is_camera_render_ready(camera: Camera, request_id: int) -> bool:
+    """Check if the given render request of the camera sensor has been processed by the simulator."""
+    return bool(camera.is_ad_hoc_poll_request_ready(request_id))
+
+def collect_camera_images(camera: Camera, request_id: int) -> Dict[str, np.ndarray]:
+    """
+    Collect the images of a processed camera render request, keyed by image type.
+
+    Images are returned in the same layout as "poll_camera_images". The raw buffers are collected
+    directly, skipping the image conversion of BeamNGpy, which would turn depth into 8-bit values.
+    """
+    with perf_timing.stage(f'camera_collect.{camera.name}'):
+        raw_data = camera.send_recv_ge('CollectAdHocPollRequestCamera', requestId=request_id)['data']
+    logging_mgr.log_frame_action(logger, f'Camera "{camera.name}" render request {request_id} collected.')
+    with perf_timing.stage('convert'):
+        return _decode_camera_buffers(camera, raw_data)
+
+def _decode_camera_buffers(camera: Camera, raw_data: StrDict) -> Dict[str, np.ndarray]:
+    """Return the raw rendered buffers of a camera sensor as pixel arrays, keyed by image type."""
+    width, height = int(camera.resolution[0]), int(camera.resolution[1])
+    images = {}
+    if getattr(camera, "is_render_colours", False):
+        images['colour'] = _decode_raw_buffer(raw_data.get('colour'), np.uint8, (height, width, 4))[..., :3]
+    if getattr(camera, "is_render_depth", False):
+        images['depth'] = _decode_raw_buffer(raw_data.get('depth'), np.float32, (height, width))
+    if getattr(camera, "is_render_annotations", False):
+        images['annotation'] = _decode_raw_buffer(raw_data.get('annotation'), np.uint8, (height, width, 4))
+    # Skip any buffer the simulator failed to render
+    for image_type in [image_type for image_type, image in images.items() if image is None]:
+        logger.warning(f'Camera "{camera.name}" returned no {image_type} data.')
+        del images[image_type]
+    return images
+
+def _decode_raw_buffer(raw_buffer: bytes | memoryview | str | None, dtype: type, shape: tuple) -> np.ndarray | None:
+    """Return a raw camera buffer as an array view of the given type and shape (None if empty)."""
+    if raw_buffer is None or len(raw_buffer) == 0:
+        return None
+    data = raw_buffer.encode() if isinstance(raw_buffer, str) else raw_buffer
+    return np.frombuffer(data, dtype=dtype).reshape(shape)
+
+def get_image_stack_file_name(camera_name: str, image_type: str) -> str:
+    """Return the output file name of the memory-mapped image stack of a camera and image type."""
+    return f'{camera_name}_{image_file_suffixes[image_type]}_stack.npy'
+
+def get_image_file_name(frame_num: int, camera_name: str, image_type: str, extension: str = 'png') -> str:
+    """Return the output file name for a camera image of the given frame and type."""
+    return f'frame_{frame_num:05d}_{camera_name}_{image_file_suffixes[image_type]}.{extension}'
 
 def extract_imu_data(imu: AdvancedIMU) -> StrDict:
     """Extract data from the IMU sensor into a dictionary."""
     imu_data = imu.poll()
-    logging_mgr.log_action(f'IMU "{imu.name}" data polled.')
+    logging_mgr.log_frame_action(logger, f'IMU "{imu.name}" data polled.')
+
+    imu_data_concise = _imu_data_to_metadata(imu_data)
 
-    imu_data_concise = {
+    logging_mgr.log_frame_action(logger, f'IMU "{imu.name}" metadata extracted.')
+
+    return imu_data_concise
+
+def _imu_data_to_metadata(imu_data: StrDict) -> StrDict:
+    """Return the IMU readings stored in the frame metadata."""
+    return {
         'acceleration': imu_data['accSmooth'],
         'angular_acceleration': imu_data['angAccel'],
         'angular_velocity': imu_data['angVelSmooth']
     }
 
-    logging_mgr.log_action(f'IMU "{imu.name}" metadata extracted.')
-
-    return imu_data_concise
-
 def extract_vehicle_metadata(vehicle: Vehicle) -> StrDict:
     """Extract metadata from the vehicle's sensors into a dictionary."""
     vehicle.sensors.poll()
-    logging_mgr.log_action(f'Vehicle "{vehicle.vid}" sensors polled.')
+    logging_mgr.log_frame_action(logger, f'Vehicle "{vehicle.vid}" sensors polled.')
 
     state_data = vehicle.sensors['state']
-    logging_mgr.log_action(f'Vehicle "{vehicle.vid}" state data extracted.')
+    logging_mgr.log_frame_action(logger, f'Vehicle "{vehicle.vid}" state data extracted.')
 
-    metadata = {
+    metadata = _vehicle_state_to_metadata(state_data)
+    logging_mgr.log_frame_action(logger, f'Vehicle "{vehicle.vid}" metadata extracted.')
+
+    return metadata
+
+def _vehicle_state_to_metadata(state_data) -> StrDict:
+    """Return the vehicle state readings stored in the frame metadata."""
+    return {
         'time': state_data['time'],
         'linear_velocity': state_data['vel'],
         'direction': state_data['dir'],
         'position': state_data['pos']
     }
-    logging_mgr.log_action(f'Vehicle "{vehicle.vid}" metadata extracted.')
 
-    return metadata
+def extract_vehicle_simulation_time(vehicle: Vehicle) -> float:
+    """Poll only the vehicle state sensor and return the current simulation time."""
+    vehicle.sensors.poll('state')
+    return vehicle.sensors['state']['time']
 
 def extract_vehicle_simulation_time_from_metadata(vehicle_metadata) -> float:
     """Extract the simulation time from the vehicle metadata."""
@@ -118,9 +188,91 @@ def extract_time_of_day_metadata(bng: BeamNGpy) -> StrDict:
     metadata = {
         'time_of_day': time_of_day['timeStr']
     }
-    logging_mgr.log_action('Time of day metadata extracted.')
+    logging_mgr.log_frame_action(logger, 'Time of day metadata extracted.')
     return metadata
 
+class FrameSnapshot:
+    """
+    Non-image simulator state of a capture frame, fetched once when the frame starts.
+
+    The time of day, the vehicle state and the IMU readings are each fetched with a single round
+    trip to the simulator. Every per-frame consumer (headlights, frame metadata, timing checks)
+    then reads them from the snapshot. The snapshot counts the simulator queries it replaced: the time of
+    day was queried twice per frame (headlights and frame metadata), and the vehicle state and IMU once each.
+    With a time of day model, the time of day is predicted from the vehicle simulation time,
+    and only queried from the simulator when the model must be resynced.
+    """
+    def __init__(self, bng: BeamNGpy, vehicle: Vehicle, imu: AdvancedIMU, time_of_day_model: TimeOfDayModel | None = None):
+        """Fetch the time of day, vehicle state and IMU readings of the current simulation step."""
+        # Only the state sensor is polled, other vehicle sensors are not used by the frame metadata
+        with perf_timing.stage('state_poll'):
+            vehicle.sensors.poll('state')
+        # Wall clock time matching the simulation time of the vehicle state, used to pace the frames
+        self._wall_time_s = time.perf_counter()
+        self._vehicle_metadata = _vehicle_state_to_metadata(vehicle.sensors['state'])
+        with perf_timing.stage('imu_poll'):
+            self._imu_metadata = _imu_data_to_metadata(imu.poll())
+        self._round_trips = 2
+        self._saved_round_trips = 0
+        self._is_metadata_read = False
+        simulation_time_s = self._vehicle_metadata['time']
+        if time_of_day_model and not time_of_day_model.needs_resync(simulation_time_s):
+            self._time_of_day = time_of_day_model.predict(simulation_time_s)
+            self._time_of_day_str = utils.beamng_time_to_hhmmss(self._time_of_day)
+            # The time of day query of the headlight check is replaced by the prediction
+            self._saved_round_trips += 1
+        else:
+            with perf_timing.stage('time_of_day_query'):
+                time_of_day = simulation_mgr.get_time_of_day(bng)
+            self._round_trips += 1
+            self._time_of_day = time_of_day['time']
+            self._time_of_day_str = time_of_day['timeStr']
+            if time_of_day_model:
+                time_of_day_model.resync(self._time_of_day, simulation_time_s)
+                # Keep the same time format in every frame, predicted or not
+                self._time_of_day_str = utils.beamng_time_to_hhmmss(self._time_of_day)
+        logging_mgr.log_frame_action(logger, f'Frame snapshot taken for vehicle "{vehicle.vid}" and IMU "{imu.name}".')
+
+    @property
+    def time_of_day(self) -> float:
+        """Get the time of day of the simulator (0.0 to 1.0)."""
+        return self._time_of_day
+
+    @property
+    def simulation_time(self) -> float:
+        """Get the simulation time of the vehicle state, in seconds."""
+        return self._vehicle_metadata['time']
+
+    @property
+    def wall_time(self) -> float:
+        """Get the wall clock time (time.perf_counter) when the vehicle state was polled, in seconds."""
+        return self._wall_time_s
+
+    @property
+    def round_trips(self) -> int:
+        """Get the number of round trips to the simulator made by the snapshot."""
+        return self._round_trips
+
+    @property
+    def saved_round_trips(self) -> int:
+        """Get the number of simulator queries replaced by the snapshot (predicted or reused time of day)."""
+        return self._saved_round_trips
+
+    def to_metadata(self) -> StrDict:
+        """Return the time of day, vehicle and IMU metadata of the frame."""
+        # The second time of day query of the frame is replaced, the vehicle state and IMU were polled once as before
+        if not self._is_metadata_read:
+            self._is_metadata_read = True
+            self._saved_round_trips += 1
+        metadata = {'time_of_day': self._time_of_day_str}
+        metadata.update(self._vehicle_metadata)
+        metadata.update(self._imu_metadata)
+        return metadata
+
+def take_frame_snapshot(bng: BeamNGpy, vehicle: Vehicle, imu: AdvancedIMU, time_of_day_model: TimeOfDayModel | None = None) -> FrameSnapshot:
+    """Fetch the non-image simulator state of the current frame."""
+    return FrameSnapshot(bng, vehicle, imu, time_of_day_model)
+
 def save_metadata(metadata: dict,
                   output_dir: str,
                   file_name = 'metadata.json') -> None:
@@ -128,4 +280,4 @@ def save_metadata(metadata: dict,
     utils.save_json_file(metadata,
                          output_dir,
                          file_name)
-    logging_mgr.log_action(f'Metadata saved in "{output_dir}".')
\ No newline at end of file
+    logger.info(f'Metadata saved in "{output_dir}".')
\ No newline at end of file
@@ -0,0 +1,70 @@
+import numpy as np
+
+import image_encoding
+from image_encoding import ImageFormat
+from type_defs import Float2, StrDict
+
+# --- Depth Conversions ---
+def depth_to_metres(depth: np.ndarray, near_far_planes: Float2) -> np.ndarray:
+    """
+    Convert a camera depth buffer into metric depth (float32 metres).
+
+    Float buffers are expected to be normalized between the near (0) and far (1) planes,
+    as returned by the simulator. 8-bit buffers are scaled from [0, 255] instead.
+    """
+    near, far = near_far_planes
+    if depth.dtype == np.uint8:
+        scale = np.float32((far - near) / 255)
+    else:
+        scale = np.float32(far - near)
+    return np.float32(near) + depth.astype(np.float32, copy=False) * scale
+
+def depth_to_millimetres(depth: np.ndarray, near_far_planes: Float2) -> np.ndarray:
+    """
+    Convert a camera depth buffer into metric depth as 16-bit millimetres.
+
+    Pixels at the far plane (no geometry hit) are stored as 0, and depths beyond
+    the 16-bit range (about 65.5 m) are saturated to 65535.
+    """
+    millimetres = depth_to_metres(depth, near_far_planes)
+    millimetres *= 1000
+    np.clip(millimetres, 0, np.iinfo(np.uint16).max, out=millimetres)
+    depth_mm = np.rint(millimetres).astype(np.uint16)
+    depth_mm[depth >= _far_plane_value(depth)] = 0
+    return depth_mm
+
+def depth_to_intensity(depth: np.ndarray) -> np.ndarray:
+    """Convert a normalized camera depth buffer into 8-bit intensity values (legacy depth images)."""
+    if depth.dtype == np.uint8:
+        return depth
+    return (np.clip(depth, 0.0, 1.0) * 255).astype(np.uint8)
+
+def _far_plane_value(depth: np.ndarray) -> float:
+    """Return the buffer value used for pixels at the far plane."""
+    return 255 if depth.dtype == np.uint8 else 1.0
+
+# --- Depth Formats ---
+class DepthPng16Format(ImageFormat):
+    """Metric depth as single channel 16-bit PNG in millimetres, with a selectable zlib "compress_level"."""
+    name = 'png16'
+    extension = 'png'
+    supported_image_types = ('depth',)
+    requires_near_far_planes = True
+
+    def encode(self, array: np.ndarray, options: StrDict) -> bytes:
+        """Convert the depth buffer to millimetres and encode it as 16-bit PNG."""
+        options = dict(options)
+        depth_mm = depth_to_millimetres(array, options.pop('near_far_planes'))
+        return image_encoding.get_format('png').encode(depth_mm, options)
+
+class DepthNpy16Format(ImageFormat):
+    """Metric depth as a float16 NumPy array (.npy) in metres."""
+    name = 'npy16'
+    extension = 'npy'
+    supported_image_types = ('depth',)
+    requires_near_far_planes = True
+
+    def encode(self, array: np.ndarray, options: StrDict) -> bytes:
+        """Convert the depth buffer to metres and serialize it as float16."""
+        depth_m = depth_to_metres(array, options['near_far_planes']).astype(np.float16)
+        return image_encoding.get_format('npy').encode(depth_m, {})
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+
+import depth_writer, utils
+from image_encoding import ImageFormat
+from typing import Dict, Tuple
+from type_defs import Float2, Int2, StrDict
+
+class FrameArrayStore:
+    """
+    Preallocated memory-mapped array holding one image per frame, for one camera and image type.
+
+    The store is a regular .npy file with shape (num_frames, *image_shape), so any frame can be
+    read with "np.load(path, mmap_mode='r')[frame]" without decoding. Writing a frame is a plain
+    copy into its slot, with no per-file overhead and no encoding.
+    """
+    def __init__(self, path: str, num_frames: int, image_shape: Tuple[int, ...], dtype: type, resume_frame: int | None = None):
+        """
+        Create the memory-mapped store file, preallocated for the given number of frames.
+
+        When resuming a session (resume frame given, 0 if no frame was committed), the existing store file
+        is reopened instead, keeping the frames before the resume frame.
+        """
+        self._path = path
+        shape = (num_frames, *image_shape)
+        if resume_frame is not None and os.path.isfile(path):
+            self._array = np.lib.format.open_memmap(path, mode='r+')
+            if self._array.shape != shape or self._array.dtype != np.dtype(dtype):
+                raise ValueError(f'Array store "{path}" does not match the session, expected {shape} {np.dtype(dtype)}.')
+            self._last_written_frame = resume_frame - 1
+        else:
+            self._array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+            self._last_written_frame = -1
+        self._shape = self._array.shape
+        self._dtype = self._array.dtype
+
+    @property
+    def path(self) -> str:
+        """Get the path of the store file."""
+        return self._path
+
+    def write(self, frame_num: int, image: np.ndarray) -> None:
+        """Copy an image into the slot of the given frame."""
+        self._array[frame_num] = image
+        self._last_written_frame = max(self._last_written_frame, frame_num)
+
+    def close(self) -> None:
+        """Flush the store to local storage and release the memory map."""
+        if self._array is not None:
+            self._array.flush()
+            self._array = None
+
+    def to_metadata(self) -> StrDict:
+        """Return the description of the store, to be saved in the array stores index."""
+        return {
+            'file': os.path.basename(self._path),
+            'shape': list(self._shape),
+            'dtype': self._dtype.str,
+            'last_written_frame': self._last_written_frame
+        }
+
+class DepthArrayStore(FrameArrayStore):
+    """Frame array store of metric depth images (float16 metres), converted with the camera near/far planes."""
+    def __init__(self, path: str, num_frames: int, resolution: Int2, near_far_planes: Float2, resume_frame: int | None = None):
+        """Create (or reopen, when resuming) the memory-mapped depth store file for the given number of frames."""
+        width, height = int(resolution[0]), int(resolution[1])
+        super().__init__(path, num_frames, (height, width), np.float16, resume_frame)
+        self._near_far_planes = near_far_planes
+
+    def write(self, frame_num: int, image: np.ndarray) -> None:
+        """Convert a camera depth buffer to metres and copy it into the slot of the given frame."""
+        super().write(frame_num, depth_writer.depth_to_metres(image, self._near_far_planes))
+
+class ArrayStoreFormat(ImageFormat):
+    """
+    Images stored in a memory-mapped frame array store (one .npy file per camera and image type).
+
+    Images in this format are not encoded, they are copied by the capture pipeline straight
+    into their frame slot. Depth is stored as metric depth (float16 metres).
+    """
+    name = 'memmap'
+    extension = 'npy'
+    requires_near_far_planes = True
+    is_array_store = True
+
+    def encode(self, array: np.ndarray, options: StrDict) -> bytes:
+        """Not supported, images in this format are written to a frame array store."""
+        raise TypeError(f'Images in the "{self.name}" format are stored in a memory-mapped array, not encoded.')
+
+def create_frame_array_store(output_dir: str,
+                             camera_name: str,
+                             image_type: str,
+                             num_frames: int,
+                             resolution: Int2,
+                             options: StrDict,
+                             resume_frame: int | None = None) -> FrameArrayStore:
+    """Create the frame array store of a camera image type, with the shape and type of its polled images."""
+    # Imported here, so the encoder processes loading the format registry do not import BeamNGpy
+    import data_capture_mgr
+    path = utils.join_paths(output_dir, data_capture_mgr.get_image_stack_file_name(camera_name, image_type))
+    width, height = int(resolution[0]), int(resolution[1])
+    if image_type == 'depth':
+        return DepthArrayStore(path, num_frames, resolution, options['near_far_planes'], resume_frame)
+    if image_type == 'colour':
+        return FrameArrayStore(path, num_frames, (height, width, 3), np.uint8, resume_frame)
+    return FrameArrayStore(path, num_frames, (height, width, 4), np.uint8, resume_frame)
+
+def save_array_store_index(output_dir: str, array_stores: Dict[Tuple[str, str], FrameArrayStore]) -> None:
+    """Save the description of every frame array store of the session in "array_stores.json"."""
+    index = [dict(camera=camera_name, image_type=image_type, **array_store.to_metadata())
+             for (camera_name, image_type), array_store in array_stores.items()]
+    utils.save_json_file({'array_stores': index}, output_dir, 'array_stores.json')
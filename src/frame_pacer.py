@@ -0,0 +1,121 @@
+import math, time
+
+import logging_mgr
+from typing import Callable, List
+
+logger = logging_mgr.get_logger(__name__)
+
+class FramePacer:
+    """
+    Pacer of the capture loop when the simulation runs in realtime (capture frequency not forced).
+
+    Instead of polling the simulation time every few milliseconds, the pacer estimates how many
+    simulation seconds pass per wall clock second (the sim-to-wall ratio, smoothed over the frames)
+    and sleeps until the wall clock time where the next frame is predicted to be due. The simulation
+    time is then queried to check the prediction, sleeping again for the predicted remaining time
+    if the frame is not due yet, so most frames only need one or two queries.
+    The jitter of every frame (simulation time reached minus the frame's due time) is recorded.
+    """
+    def __init__(self,
+                 capture_period_s: float,
+                 query_simulation_time: Callable[[], float],
+                 ratio_smoothing: float,
+                 min_sleep_s: float,
+                 max_queries_per_frame: int):
+        """Initialize the pacer, using the given function to query the current simulation time."""
+        if capture_period_s <= 0:
+            raise ValueError('Capture period must be a positive number.')
+        if not 0 < ratio_smoothing <= 1:
+            raise ValueError('Sim-to-wall ratio smoothing must be larger than 0 and at most 1.')
+        self._capture_period_s = capture_period_s
+        self._query_simulation_time = query_simulation_time
+        self._ratio_smoothing = ratio_smoothing
+        self._min_sleep_s = min_sleep_s
+        self._max_queries_per_frame = max(1, max_queries_per_frame)
+        # Simulation seconds per wall clock second, realtime until the first measurement
+        self._sim_to_wall_ratio = 1.0
+        # Simulation and wall clock times of the last captured frame (None until the first one)
+        self._last_simulation_time_s: float | None = None
+        self._last_wall_time_s: float | None = None
+        self._jitters_s: List[float] = []
+        self._num_queries = 0
+
+    @property
+    def sim_to_wall_ratio(self) -> float:
+        """Get the estimated simulation seconds per wall clock second."""
+        return self._sim_to_wall_ratio
+
+    def mark_frame(self, simulation_time_s: float, wall_time_s: float) -> None:
+        """
+        Record the simulation time of a captured frame, refining the sim-to-wall ratio.
+
+        The wall clock time (time.perf_counter) must be taken when the simulation time was read, not after
+        the frame was captured, so the time spent capturing the frame is not added to the next deadline.
+        """
+        if self._last_simulation_time_s is not None:
+            elapsed_wall_s = wall_time_s - self._last_wall_time_s
+            elapsed_simulation_s = simulation_time_s - self._last_simulation_time_s
+            if elapsed_wall_s > 0 and elapsed_simulation_s > 0:
+                ratio = elapsed_simulation_s / elapsed_wall_s
+                self._sim_to_wall_ratio += self._ratio_smoothing * (ratio - self._sim_to_wall_ratio)
+        self._last_simulation_time_s = simulation_time_s
+        self._last_wall_time_s = wall_time_s
+
+    def wait_for_next_frame(self, frame_num: int) -> float:
+        """
+        Wait until the frame after the given one is due, returning the simulation time reached.
+
+        Logs a warning if the next frame was already late when the wait started.
+        """
+        if self._last_simulation_time_s is None:
+            raise RuntimeError('Frame pacer used before marking any frame.')
+        due_simulation_time_s = self._last_simulation_time_s + self._capture_period_s
+        # Sleep until the predicted wall clock deadline before the first query
+        deadline_wall_s = self._last_wall_time_s + self._capture_period_s / self._sim_to_wall_ratio
+        sleep_s = deadline_wall_s - time.perf_counter()
+        if sleep_s > 0:
+            time.sleep(sleep_s)
+        num_queries = 0
+        while True:
+            simulation_time_s = self._query_simulation_time()
+            num_queries += 1
+            remaining_s = due_simulation_time_s - simulation_time_s
+            if remaining_s <= 0:
+                break
+            # Past the query budget, fall back to checking every minimum sleep
+            if num_queries >= self._max_queries_per_frame:
+                self._sleep(self._min_sleep_s)
+            else:
+                self._sleep(remaining_s / self._sim_to_wall_ratio)
+        jitter_s = simulation_time_s - due_simulation_time_s
+        if num_queries == 1 and jitter_s > self._capture_period_s:
+            logger.warning(f'Capture frequency too high for frame {frame_num}, next frame is {jitter_s:.3f} s late.')
+        self._jitters_s.append(jitter_s)
+        self._num_queries += num_queries
+        logging_mgr.log_frame_action(logger, f'Frame {frame_num} paced: {num_queries} time queries, jitter {jitter_s * 1000:.1f} ms, '
+                                     f'sim-to-wall ratio {self._sim_to_wall_ratio:.3f}.')
+        return simulation_time_s
+
+    def log_statistics(self) -> None:
+        """Log the jitter and time query statistics of the paced frames."""
+        if not self._jitters_s:
+            return
+        jitters_ms = sorted(jitter_s * 1000 for jitter_s in self._jitters_s)
+        num_frames = len(jitters_ms)
+        mean_ms = sum(jitters_ms) / num_frames
+        p95_ms = jitters_ms[min(num_frames - 1, math.ceil(0.95 * num_frames) - 1)]
+        logger.info(f'Frame pacing: {num_frames} frames, jitter mean {mean_ms:.1f} ms, p95 {p95_ms:.1f} ms, '
+                    f'max {jitters_ms[-1]:.1f} ms, {self._num_queries / num_frames:.1f} time queries per frame.')
+
+    def _sleep(self, duration_s: float) -> None:
+        """Sleep for the given time, but at least the minimum sleep time."""
+        time.sleep(max(duration_s, self._min_sleep_s))
+
+def create_frame_pacer(capture_period_s: float, query_simulation_time: Callable[[], float]) -> FramePacer:
+    """Create the frame pacer of a capture session from the settings."""
+    import settings
+    return FramePacer(capture_period_s,
+                      query_simulation_time,
+                      settings.frame_pacing_ratio_smoothing,
+                      settings.wait_for_frame_sleep_time_s,
+                      settings.frame_pacing_max_queries_per_frame)
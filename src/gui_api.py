@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from type_defs import Any, Callable, List, Int2, Optional
+from typing import Any, Callable, List, Optional
+from type_defs import Int2
 
 # --- Window Class ---
 class Window:
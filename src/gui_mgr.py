@@ -4,6 +4,8 @@ from camera_sensor_config import CameraSensorConfig
 from gui_api import GuiApi
 from vehicle_config import VehicleConfig
 
+logger = logging_mgr.get_logger(__name__)
+
 # The GUI API instance should be injected or set externally for true independence.
 _gui_api = None
 
@@ -380,14 +382,14 @@ def get_session_config():
                 show_error_message("Please select a valid session config file.")
                 return
             session = session_config.create_session_config_from_file(file_path)
-            logging_mgr.log_action(f"Loaded session config from file: {file_path}")
+            logger.info(f"Loaded session config from file: {file_path}")
         else:
             # Create new session config from GUI input
             try:
                 validate_session_fields()
             except (ValueError, TypeError) as err:
                 show_warning_message(str(err))
-                logging_mgr.log_warning(f"Validation failed: {err}")
+                logger.warning(f"Validation failed: {err}")
                 return
             # Validate camera names to ensure uniqueness
             camera_names = [name_widget.get().strip().lower() for (name_widget, *_) in camera_widgets]
@@ -448,22 +450,22 @@ def get_session_config():
                     num_ai_traffic_vehicles=num_ai_input.get(),
                     starting_waypoint=starting_waypoint_input.get()
                 )
-                logging_mgr.log_action("Created new session config from GUI input.")
+                logger.info("Created new session config from GUI input.")
             except ValueError as ve:
                 msg = f"Invalid input in session config: {ve}"
                 show_warning_message(msg)
-                logging_mgr.log_action(msg)
+                logger.info(msg)
                 return
             except Exception as ex:
                 # Only catch generic Exception as a last resort for unexpected errors.
                 show_error_message(f"Unexpected error: {ex}")
-                logging_mgr.log_error(f"Unexpected error in session config: {ex}")
+                logger.error(f"Unexpected error in session config: {ex}")
                 return
         _gui_api.close_window(window)
 
     def on_exit():
         _gui_api.close_window(window)
-        logging_mgr.log_action("User exited the session setup window.")
+        logger.info("User exited the session setup window.")
         exit(0)
 
     # Ensure we have enough rows for camera configs
@@ -575,7 +577,7 @@ def get_session_config():
                                 show_warning_message(f"Invalid camera config: {err}")
                                 return
                             camera_widgets[idx] = (name_w, pos_w, dir_w, upv_w, res_w, fov_w, nearfar_w, col_w, ann_w, dep_w)
-                            logging_mgr.log_action(f"Edited camera config '{name_w.get()}' in GUI.")
+                            logger.info(f"Edited camera config '{name_w.get()}' in GUI.")
                             _gui_api.close_subwindow(cam_win)
                             refresh_camera_list()
                         def on_cancel_edit():
@@ -588,7 +590,7 @@ def get_session_config():
                 def make_remove(idx=idx):
                     def remove_camera():
                         del camera_widgets[idx]
-                        logging_mgr.log_action(f"Removed camera config at index {idx} from GUI.")
+                        logger.info(f"Removed camera config at index {idx} from GUI.")
                         refresh_camera_list()
                     return remove_camera
                 edit_btn = _gui_api.add_button(grid, "Edit", make_edit(idx), side="left", padx=2, pady=2, row=start_row+idx, column=1, fill=True)
@@ -661,7 +663,7 @@ def get_session_config():
                 return  # Do not close the subwindow to allow user to correct input
 
             camera_widgets.append(widgets)
-            logging_mgr.log_action(f"Added camera config '{name_widget.get()}' to session config.")
+            logger.info(f"Added camera config '{name_widget.get()}' to session config.")
             _gui_api.close_subwindow(cam_win)
             refresh_camera_list()
 
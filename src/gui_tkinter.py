@@ -1,6 +1,7 @@
 from gui_api import (GuiApi, RadioButton, RadioGroup, FileInput, IntInput, FloatInput,
                      StrInput, Label, Button, Checkbox, Window, GridContainer, GuiWidget)
-from type_defs import Any, Int2, List
+from typing import Any, List
+from type_defs import Int2
 
 import tkinter as tk
 from tkinter import messagebox, filedialog
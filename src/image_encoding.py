@@ -0,0 +1,132 @@
+from abc import ABC, abstractmethod
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+from typing import Dict, List, Tuple
+from type_defs import StrDict
+
+# Camera image types, as named by the BeamNGpy camera sensor
+image_types: Tuple[str, ...] = ('colour', 'depth', 'annotation')
+
+# --- Image Format Interface ---
+class ImageFormat(ABC):
+    """Output file format used to encode camera image arrays."""
+    # Name used to select the format in the settings and camera configurations
+    name: str = ''
+    # Extension of the files written in this format
+    extension: str = ''
+    # Camera image types that can be encoded in this format
+    supported_image_types: Tuple[str, ...] = image_types
+    # Whether the encoder needs the camera near/far planes (passed as the "near_far_planes" option)
+    requires_near_far_planes: bool = False
+    # Whether the encoder needs the annotation class colours (passed as the "class_colours" option)
+    requires_annotation_classes: bool = False
+    # Whether images are copied into a preallocated array store instead of being encoded into files
+    is_array_store: bool = False
+
+    def is_available(self) -> bool:
+        """Return True if the format can be encoded in the current environment."""
+        return True
+
+    @abstractmethod
+    def encode(self, array: np.ndarray, options: StrDict) -> bytes:
+        """Encode the image array into bytes, using the provided encoder options."""
+        raise NotImplementedError()
+
+class PillowImageFormat(ImageFormat):
+    """Image format encoded through Pillow, passing the options to the Pillow writer."""
+    # Pillow format identifier
+    pillow_format: str = ''
+
+    def is_available(self) -> bool:
+        """Return True if the installed Pillow version can write this format."""
+        Image.init()
+        return self.pillow_format in Image.SAVE
+
+    def encode(self, array: np.ndarray, options: StrDict) -> bytes:
+        """Encode the image array with Pillow."""
+        buffer = BytesIO()
+        Image.fromarray(array).save(buffer, format=self.pillow_format, **options)
+        return buffer.getvalue()
+
+# --- Image Formats ---
+class PngFormat(PillowImageFormat):
+    """Lossless PNG, with a selectable zlib compression level ("compress_level", 0-9)."""
+    name = 'png'
+    extension = 'png'
+    pillow_format = 'PNG'
+
+class JpegFormat(PillowImageFormat):
+    """Lossy JPEG for colour images, with a selectable "quality" (1-95)."""
+    name = 'jpeg'
+    extension = 'jpg'
+    pillow_format = 'JPEG'
+    supported_image_types = ('colour',)
+
+class WebpFormat(PillowImageFormat):
+    """Lossy WebP for colour images, with a selectable "quality" (1-100) and encoder "method" (0-6)."""
+    name = 'webp'
+    extension = 'webp'
+    pillow_format = 'WEBP'
+    supported_image_types = ('colour',)
+
+class QoiFormat(PillowImageFormat):
+    """Fast lossless QOI for colour and annotation images (requires a Pillow version with QOI writing)."""
+    name = 'qoi'
+    extension = 'qoi'
+    pillow_format = 'QOI'
+    supported_image_types = ('colour', 'annotation')
+
+class NpyFormat(ImageFormat):
+    """Raw NumPy array (.npy), no compression and no encoding cost."""
+    name = 'npy'
+    extension = 'npy'
+
+    def encode(self, array: np.ndarray, options: StrDict) -> bytes:
+        """Serialize the image array in the NumPy .npy format."""
+        buffer = BytesIO()
+        np.save(buffer, array, allow_pickle=False)
+        return buffer.getvalue()
+
+# --- Format Registry ---
+_formats: Dict[str, ImageFormat] = {}
+_builtin_formats_registered: bool = False
+
+def register_format(image_format: ImageFormat) -> None:
+    """Register an image format, replacing any format previously registered with the same name."""
+    _formats[image_format.name] = image_format
+
+def register_builtin_formats() -> None:
+    """Register the metric depth, annotation class and array store formats, once."""
+    global _builtin_formats_registered
+    if _builtin_formats_registered:
+        return
+    _builtin_formats_registered = True
+    # Imported here, as these formats are defined on top of this module
+    from annotation_writer import ClassPngFormat, PalettePngFormat
+    from depth_writer import DepthNpy16Format, DepthPng16Format
+    from frame_array_store import ArrayStoreFormat
+    for image_format in (DepthPng16Format(), DepthNpy16Format(), ClassPngFormat(), PalettePngFormat(), ArrayStoreFormat()):
+        register_format(image_format)
+
+def get_format(name: str) -> ImageFormat:
+    """Return the registered image format with the given name."""
+    register_builtin_formats()
+    if name not in _formats:
+        raise ValueError(f'Unknown image format "{name}". Available formats: {list(_formats.keys())}.')
+    return _formats[name]
+
+def get_format_names(image_type: str = None) -> List[str]:
+    """Return the names of the available formats, optionally only those supporting the given image type."""
+    register_builtin_formats()
+    return [name for name, image_format in _formats.items()
+            if image_format.is_available()
+            and (image_type is None or image_type in image_format.supported_image_types)]
+
+def encode_image_array(array: np.ndarray, format_name: str, options: StrDict = None) -> bytes:
+    """Encode a camera image array in the given registered format."""
+    return get_format(format_name).encode(array, options or {})
+
+for _image_format in (PngFormat(), JpegFormat(), WebpFormat(), QoiFormat(), NpyFormat()):
+    register_format(_image_format)
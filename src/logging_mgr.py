@@ -1,24 +1,139 @@
-import os
-import beamngpy.logging as bng_logging
+import atexit, collections, logging, os, queue, shutil, threading
+from logging.handlers import QueueHandler, QueueListener
 
 log_file = ''
+# Name of the BeamNGpy logger, parent of the loggers of the program (BeamNGpy is only imported when configuring logging)
+bng_logger_id: str = 'beamngpy'
+
+# Listener writing the queued log records to the log handlers in a background thread (None until logging is configured)
+_log_listener: QueueListener | None = None
+# Handler writing the log of the current session of a batch into its own output directory (None outside batch sessions)
+_session_log_handler: logging.FileHandler | None = None
+# If enabled, per-frame messages are only counted per module instead of being logged
+_hot_path_quiet = False
+_frame_action_counts: collections.Counter = collections.Counter()
+_frame_action_counts_lock = threading.Lock()
 
 def configure_logging(output_dir: str) -> None:
-    """Set up the logging module to output the log messages into a file."""
-    global log_file
-    # Create a file to store the log messages
+    """
+    Set up the logging module to output the log messages into a file.
+
+    Log records are put in a queue by the calling thread and written to the console and the log file
+    by a background thread, so logging does not block the capture loop or the encoder threads.
+    The log level of each module can be set in "log_module_levels" in settings.py.
+    """
+    import beamngpy.logging as bng_logging
+    import settings
+    global log_file, _hot_path_quiet
+    # Flush and close the handlers of a previous configuration
+    close_logging()
+    # Create a file to store the log messages, keeping the previous one as "log.txt.1"
     log_file = os.path.join(output_dir, 'log.txt')
-    # Configure the logging module
-    bng_logging.set_up_simple_logging(log_file)
+    moved_log = _move_old_log_file(log_file)
+    formatter = logging.Formatter(bng_logging.LOG_FORMAT)
+    handlers = [logging.StreamHandler(), logging.FileHandler(log_file, 'w', 'utf-8')]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    _start_log_listener(handlers)
+    # Configure the logging module to send every record to the queue
+    bng_logging.config_logging([QueueHandler(_log_listener.queue)],
+                               level=logging.getLevelName(settings.log_level))
+    for module_name, level in settings.log_module_levels.items():
+        get_logger(module_name).setLevel(level)
+    _hot_path_quiet = settings.log_hot_path_quiet
+    if moved_log:
+        logger.info(f'Moved old log file to "{log_file}.1".')
+
+def close_logging() -> None:
+    """Log the counts of the quiet per-frame messages, write every queued log record and stop the background writer."""
+    global _log_listener, _session_log_handler
+    if _log_listener is None:
+        return
+    log_frame_action_counts()
+    _log_listener.stop()
+    for handler in _log_listener.handlers:
+        handler.close()
+    _log_listener = None
+    _session_log_handler = None
+
+def start_session_log(output_dir: str) -> None:
+    """
+    Also write the log messages into "log.txt" in the output directory of a batch session, until "stop_session_log".
+
+    The batch log keeps every message, including the ones of each session. The queued records are written
+    before the session log is opened, so it only holds the messages logged during the session.
+    """
+    global _session_log_handler
+    if _log_listener is None:
+        raise RuntimeError('Session log started before configuring logging.')
+    stop_session_log()
+    session_log_file = os.path.join(output_dir, 'log.txt')
+    moved_log = _move_old_log_file(session_log_file)
+    _session_log_handler = logging.FileHandler(session_log_file, 'w', 'utf-8')
+    _session_log_handler.setFormatter(_log_listener.handlers[0].formatter)
+    _restart_log_listener(_log_listener.handlers + (_session_log_handler,))
+    if moved_log:
+        logger.info(f'Moved old log file to "{session_log_file}.1".')
+
+def stop_session_log() -> None:
+    """Log the counts of the quiet per-frame messages of the session, write the queued records and close the session log."""
+    global _session_log_handler
+    if _session_log_handler is None:
+        return
+    log_frame_action_counts()
+    _restart_log_listener(tuple(handler for handler in _log_listener.handlers if handler is not _session_log_handler))
+    _session_log_handler.close()
+    _session_log_handler = None
+
+def get_logger(module_name: str) -> logging.Logger:
+    """
+    Return the logger of a module of the program, a child of the BeamNGpy logger (e.g. "beamngpy.capture_session").
+
+    Every module gets its logger once, with "logger = logging_mgr.get_logger(__name__)".
+    """
+    return logging.getLogger(f'{bng_logger_id}.{module_name}')
+
+def log_frame_action(module_logger: logging.Logger, message: str) -> None:
+    """
+    Write an action message repeated on every frame with the given module logger.
+
+    In hot-path quiet mode ("log_hot_path_quiet" in settings.py), the message is only counted
+    for its logger, and the counts are logged when the session ends.
+    """
+    if _hot_path_quiet:
+        with _frame_action_counts_lock:
+            _frame_action_counts[module_logger.name] += 1
+    else:
+        module_logger.info(message)
+
+def log_frame_action_counts() -> None:
+    """Log and reset the number of per-frame messages counted in hot-path quiet mode for each module."""
+    with _frame_action_counts_lock:
+        counts = dict(_frame_action_counts)
+        _frame_action_counts.clear()
+    for logger_name, count in sorted(counts.items()):
+        logging.getLogger(logger_name).info(f'{count} per-frame messages not logged (hot-path quiet mode).')
+
+def _start_log_listener(handlers: list) -> None:
+    """Start the background thread writing the queued log records to the given handlers."""
+    global _log_listener
+    _log_listener = QueueListener(queue.SimpleQueue(), *handlers, respect_handler_level=True)
+    _log_listener.start()
+
+def _restart_log_listener(handlers: tuple) -> None:
+    """Write the queued log records to the current handlers, then keep reading the same queue with the given handlers."""
+    _log_listener.stop()
+    _log_listener.handlers = handlers
+    _log_listener.start()
 
-def log_error(message: str) -> None:
-    """Write an error message in the log file."""
-    bng_logging.module_logger.error(message)
+def _move_old_log_file(log_path: str) -> bool:
+    """Move an existing log file to "<name>.1", returning whether there was one."""
+    if not os.path.exists(log_path):
+        return False
+    shutil.move(log_path, f'{log_path}.1')
+    return True
 
-def log_warning(message: str) -> None:
-    """Write a warning message in the log file."""
-    bng_logging.module_logger.warning(message)
+logger = get_logger(__name__)
 
-def log_action(message: str) -> None:
-    """Write an action message in the log file."""
-    bng_logging.module_logger.info(message)
+# Write any queued log record before the program exits
+atexit.register(close_logging)
@@ -0,0 +1,226 @@
+import json, os
+from abc import ABC, abstractmethod
+import numpy as np
+
+import logging_mgr, utils
+from typing import Dict, Iterator, List, Tuple
+from type_defs import StrDict
+
+logger = logging_mgr.get_logger(__name__)
+
+# Numeric columns of the columnar frame metadata: field name to (dtype, values per frame)
+frame_metadata_columns: Dict[str, Tuple[type, Tuple[int, ...]]] = {
+    'frame': (np.int32, ()),
+    'time': (np.float64, ()),
+    'position': (np.float64, (3,)),
+    'linear_velocity': (np.float32, (3,)),
+    'direction': (np.float32, (3,)),
+    'acceleration': (np.float32, (3,)),
+    'angular_acceleration': (np.float32, (3,)),
+    'angular_velocity': (np.float32, (3,))
+}
+# String columns of the columnar frame metadata
+frame_metadata_string_columns: Tuple[str, ...] = ('time_of_day',)
+
+# --- Frame Metadata Writer Interface ---
+class FrameMetadataWriter(ABC):
+    """Destination of the per-frame metadata of a capture session, written as each frame is captured."""
+    @abstractmethod
+    def write(self, frame_metadata: StrDict) -> None:
+        """Write the metadata of a captured frame."""
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        """Flush any pending metadata and close the writer."""
+
+# --- Frame Metadata Writers ---
+class JsonLinesMetadataWriter(FrameMetadataWriter):
+    """
+    Append the metadata of every frame as one line of "frames_metadata.jsonl".
+
+    Each line is flushed as soon as the frame is written, so a crash loses at most the frames
+    not yet handed to the OS, and memory use does not grow with the session length. The file
+    is synced to local storage every "fsync_interval" frames (0 = only when closing).
+
+    If a JSON file name is given, all the frame metadata is also gathered into that single
+    JSON list file when the writer is closed.
+    """
+    def __init__(self,
+                 output_dir: str,
+                 fsync_interval: int,
+                 file_name: str = 'frames_metadata.jsonl',
+                 json_file_name: str | None = None):
+        """Open the JSON Lines file in the output directory, appending to it if it already exists."""
+        self._output_dir = output_dir
+        self._file_name = file_name
+        self._json_file_name = json_file_name
+        self._fsync_interval = fsync_interval
+        self._frames_since_sync = 0
+        self._file = open(utils.join_paths(output_dir, file_name), 'a', encoding='utf-8')
+
+    @property
+    def file_name(self) -> str:
+        """Get the name of the JSON Lines file."""
+        return self._file_name
+
+    def write(self, frame_metadata: StrDict) -> None:
+        """Append the frame metadata as a single line and flush it."""
+        self._file.write(json.dumps(frame_metadata, separators=(',', ':')) + '\n')
+        self._file.flush()
+        self._frames_since_sync += 1
+        if self._fsync_interval > 0 and self._frames_since_sync >= self._fsync_interval:
+            self._sync()
+
+    def close(self) -> None:
+        """Sync the JSON Lines file to local storage and close it, saving the single JSON file if requested."""
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        self._file = None
+        logger.info(f'Frame metadata saved in "{self._file_name}".')
+        if self._json_file_name:
+            convert_json_lines_to_json(self._output_dir, self._file_name, self._json_file_name)
+
+    def _sync(self) -> None:
+        """Sync the written lines to local storage."""
+        os.fsync(self._file.fileno())
+        self._frames_since_sync = 0
+
+class ColumnarMetadataWriter(FrameMetadataWriter):
+    """
+    Keep the frame metadata in fixed-dtype columns and save them as a compressed "frames_metadata.npz".
+
+    Every field of "frame_metadata_columns" is stored as an array with one row per frame
+    (e.g. "position" has shape (frames, 3)), and the fields of "frame_metadata_string_columns"
+    as string arrays. The file is written when the writer is closed, and loads as
+    "np.load(path)['position']" without parsing, allowing vectorised filtering of the frames.
+    """
+    def __init__(self, output_dir: str, num_frames: int, file_name: str = 'frames_metadata.npz'):
+        """Preallocate the columns for the expected number of frames."""
+        self._output_dir = output_dir
+        self._file_name = file_name
+        self._num_rows = 0
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.zeros((max(1, num_frames), *shape), dtype=dtype)
+            for name, (dtype, shape) in frame_metadata_columns.items()
+            }
+        self._string_columns: Dict[str, List[str]] = {name: [] for name in frame_metadata_string_columns}
+        self._closed = False
+
+    def write(self, frame_metadata: StrDict) -> None:
+        """Store the frame metadata in the next row of every column, growing the columns if needed."""
+        if self._num_rows == len(self._columns['frame']):
+            for name, column in self._columns.items():
+                self._columns[name] = np.concatenate((column, np.zeros_like(column)))
+        for name, column in self._columns.items():
+            if name in frame_metadata:
+                column[self._num_rows] = frame_metadata[name]
+        for name, column in self._string_columns.items():
+            column.append(str(frame_metadata.get(name, '')))
+        self._num_rows += 1
+
+    def close(self) -> None:
+        """Save the written rows of every column in the compressed NPZ file."""
+        if self._closed:
+            return
+        self._closed = True
+        columns = {name: column[:self._num_rows] for name, column in self._columns.items()}
+        columns.update({name: np.array(column, dtype=np.str_) for name, column in self._string_columns.items()})
+        np.savez_compressed(utils.join_paths(self._output_dir, self._file_name), **columns)
+        logger.info(f'Frame metadata saved in "{self._file_name}".')
+
+class FrameMetadataWriterGroup(FrameMetadataWriter):
+    """Write the frame metadata to several writers at once."""
+    def __init__(self, writers: List[FrameMetadataWriter]):
+        """Initialize the group with the writers to forward the frame metadata to."""
+        self._writers = writers
+
+    def write(self, frame_metadata: StrDict) -> None:
+        """Write the frame metadata with every writer of the group."""
+        for writer in self._writers:
+            writer.write(frame_metadata)
+
+    def close(self) -> None:
+        """Close every writer of the group."""
+        for writer in self._writers:
+            writer.close()
+
+def create_frame_metadata_writer(output_dir: str, num_frames: int, resume_frame: int | None = None) -> FrameMetadataWriter:
+    """
+    Create the frame metadata writers of the formats selected in the settings ("jsonl" and/or "npz").
+
+    When resuming a session (resume frame given, 0 if no frame was committed), the metadata of the frames
+    before the resume frame is kept from "frames_metadata.jsonl" and the metadata of any later frame is discarded.
+    """
+    import settings
+    jsonl_file_name = 'frames_metadata.jsonl'
+    has_jsonl_file = os.path.isfile(utils.join_paths(output_dir, jsonl_file_name))
+    if resume_frame is not None and has_jsonl_file:
+        truncate_json_lines(output_dir, jsonl_file_name, resume_frame)
+    writers = []
+    for metadata_format in settings.frames_metadata_formats:
+        if metadata_format == 'jsonl':
+            json_file_name = 'frames_metadata.json' if settings.save_frames_metadata_json else None
+            writers.append(JsonLinesMetadataWriter(output_dir,
+                                                   settings.frames_metadata_fsync_interval,
+                                                   jsonl_file_name,
+                                                   json_file_name))
+        elif metadata_format == 'npz':
+            columnar_writer = ColumnarMetadataWriter(output_dir, num_frames)
+            # The columns are only saved when closing, refill them with the frames already captured
+            if resume_frame is not None:
+                if has_jsonl_file:
+                    for frame_metadata in read_json_lines(output_dir, jsonl_file_name):
+                        columnar_writer.write(frame_metadata)
+                else:
+                    logger.warning(f'No "{jsonl_file_name}" to resume from, "frames_metadata.npz" will only hold the resumed frames.')
+            writers.append(columnar_writer)
+        else:
+            logger.warning(f'Unknown frame metadata format "{metadata_format}", ignoring it.')
+    if not writers:
+        raise ValueError('No valid frame metadata format selected.')
+    return writers[0] if len(writers) == 1 else FrameMetadataWriterGroup(writers)
+
+def read_json_lines(output_dir: str, jsonl_file_name: str) -> Iterator[StrDict]:
+    """
+    Read the entries of a JSON Lines metadata file one at a time.
+
+    A truncated line (e.g. the last line after a crash) is skipped with a warning.
+    """
+    with open(utils.join_paths(output_dir, jsonl_file_name), 'r', encoding='utf-8') as jsonl_file:
+        for line_num, line in enumerate(jsonl_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f'Skipping invalid line {line_num} of "{jsonl_file_name}".')
+
+def truncate_json_lines(output_dir: str, jsonl_file_name: str, resume_frame: int) -> None:
+    """Atomically rewrite a JSON Lines metadata file, keeping only the frames before the resume frame."""
+    jsonl_path = utils.join_paths(output_dir, jsonl_file_name)
+    with open(jsonl_path + '.tmp', 'w', encoding='utf-8') as file:
+        for frame_metadata in read_json_lines(output_dir, jsonl_file_name):
+            if frame_metadata.get('frame', -1) < resume_frame:
+                file.write(json.dumps(frame_metadata, separators=(',', ':')) + '\n')
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(jsonl_path + '.tmp', jsonl_path)
+    logger.info(f'Frame metadata in "{jsonl_file_name}" kept up to frame {resume_frame - 1}.')
+
+def convert_json_lines_to_json(output_dir: str, jsonl_file_name: str, json_file_name: str) -> None:
+    """
+    Convert a JSON Lines metadata file into a single JSON list file.
+
+    Lines are streamed one at a time, so the conversion does not load the whole session in memory.
+    """
+    with open(utils.join_paths(output_dir, json_file_name), 'w', encoding='utf-8') as json_file:
+        json_file.write('[')
+        is_first = True
+        for entry in read_json_lines(output_dir, jsonl_file_name):
+            json_file.write('\n' if is_first else ',\n')
+            json_file.write('    ' + json.dumps(entry, indent=4).replace('\n', '\n    '))
+            is_first = False
+        json_file.write('\n]' if not is_first else ']')
+    logger.info(f'JSON file "{json_file_name}" saved in "{output_dir}".')
@@ -0,0 +1,203 @@
+import io, os, tarfile, time
+from abc import ABC, abstractmethod
+
+import data_capture_mgr, logging_mgr, utils
+from typing import Dict, List
+from type_defs import StrDict
+
+logger = logging_mgr.get_logger(__name__)
+
+# --- Output Sink Interface ---
+class OutputSink(ABC):
+    """Destination of the encoded camera images of a capture session."""
+    @abstractmethod
+    def write(self, frame_num: int, camera_name: str, image_type: str, extension: str, data: bytes) -> None:
+        """Write an encoded camera image of the given frame."""
+        raise NotImplementedError()
+
+    def commit_frame(self, frame_num: int) -> None:
+        """Mark all images of the given frame as written (frames are committed in order)."""
+
+    def resume(self, resume_frame: int) -> None:
+        """Prepare the sink to continue an interrupted session from the given frame, discarding any later output."""
+
+    def close(self) -> None:
+        """Flush any pending data and close the sink."""
+
+# --- Output Sinks ---
+class DirectorySink(OutputSink):
+    """Write every image as a separate file in the output directory ("frame_XXXXX_<camera>_<type>.<ext>")."""
+    def __init__(self, output_dir: str):
+        """Initialize the sink writing into the given output directory."""
+        self._output_dir = output_dir
+
+    def write(self, frame_num: int, camera_name: str, image_type: str, extension: str, data: bytes) -> None:
+        """Write the encoded image into its own file."""
+        file_name = data_capture_mgr.get_image_file_name(frame_num, camera_name, image_type, extension)
+        utils.save_bytes_file(data, self._output_dir, file_name)
+
+class TarShardSink(OutputSink):
+    """
+    Group the images of consecutive frames into size-bounded, uncompressed tar shards.
+
+    Shards follow the WebDataset layout: all images of a frame are stored next to each other
+    as "frame_XXXXX.<camera>_<type>.<ext>", so streaming loaders can read a shard sequentially
+    without unpacking it. A shard is closed once adding the next frame would exceed the maximum
+    shard size (a shard always holds at least one frame).
+
+    Every shard "shard_XXXXXX.tar" gets an index "shard_XXXXXX.index.json" with the data offset
+    and size of each member for random access, and "shards_index.json" lists all shards.
+    """
+    def __init__(self, output_dir: str, max_shard_bytes: int):
+        """Initialize the sink writing shards into the given output directory."""
+        self._output_dir = output_dir
+        self._max_shard_bytes = max_shard_bytes
+        self._mtime = int(time.time())
+        # Images of the frames not yet committed, keyed by frame number
+        self._pending_frames: Dict[int, List[tuple]] = {}
+        self._shard_num = -1
+        self._shard: tarfile.TarFile | None = None
+        self._shard_bytes = 0
+        self._shard_index: List[StrDict] = []
+        self._shards: List[StrDict] = []
+
+    def write(self, frame_num: int, camera_name: str, image_type: str, extension: str, data: bytes) -> None:
+        """Buffer the encoded image until its frame is committed."""
+        member_name = get_shard_member_name(frame_num, camera_name, image_type, extension)
+        self._pending_frames.setdefault(frame_num, []).append((member_name, data))
+
+    def commit_frame(self, frame_num: int) -> None:
+        """Append all buffered images of the frame to the current shard, opening a new shard if needed."""
+        members = sorted(self._pending_frames.pop(frame_num, []))
+        if not members:
+            return
+        frame_bytes = sum(_get_member_size(len(data)) for _, data in members)
+        if self._shard is None or (self._shard_bytes > 0 and self._shard_bytes + frame_bytes > self._max_shard_bytes):
+            self._open_next_shard()
+        frame_entry = {'frame': frame_num, 'members': []}
+        for member_name, data in members:
+            tar_info = tarfile.TarInfo(member_name)
+            tar_info.size = len(data)
+            tar_info.mtime = self._mtime
+            self._shard.addfile(tar_info, io.BytesIO(data))
+            # The member data ends at the current offset, padded to the tar block size
+            data_offset = self._shard.offset - _get_padded_size(len(data))
+            frame_entry['members'].append({'name': member_name, 'offset': data_offset, 'size': len(data)})
+        self._shard_index.append(frame_entry)
+        self._shard_bytes += frame_bytes
+
+    def resume(self, resume_frame: int) -> None:
+        """
+        Continue the shards of an interrupted session from the given frame.
+
+        Closed shards holding only earlier frames are kept as they are. Any other shard (e.g. the one
+        being written when the session was interrupted) is rewritten with only the members of the
+        earlier frames that can be read back, and new frames go into the following shards.
+        """
+        shard_num = 0
+        while os.path.isfile(utils.join_paths(self._output_dir, get_shard_file_name(shard_num))):
+            self._resume_shard(shard_num, resume_frame)
+            shard_num += 1
+        utils.save_json_file({'shards': self._shards}, self._output_dir, 'shards_index.json')
+        logger.info(f'Tar shards resumed from frame {resume_frame}, {len(self._shards)} shards kept.')
+
+    def close(self) -> None:
+        """Commit any frame still buffered and close the current shard."""
+        for frame_num in sorted(self._pending_frames.keys()):
+            self.commit_frame(frame_num)
+        self._close_shard()
+
+    def _open_next_shard(self) -> None:
+        """Close the current shard and open the next one."""
+        self._close_shard()
+        self._shard_num += 1
+        shard_name = get_shard_file_name(self._shard_num)
+        self._shard = tarfile.open(utils.join_paths(self._output_dir, shard_name), 'w', format=tarfile.GNU_FORMAT)
+        self._shard_bytes = 0
+        self._shard_index = []
+        logger.info(f'Tar shard "{shard_name}" opened.')
+
+    def _close_shard(self) -> None:
+        """Close the current shard and write its index, updating the shards index."""
+        if self._shard is None:
+            return
+        self._shard.close()
+        self._shard = None
+        shard_name = get_shard_file_name(self._shard_num)
+        index_name = shard_name.replace('.tar', '.index.json')
+        utils.save_json_file({'shard': shard_name, 'frames': self._shard_index}, self._output_dir, index_name)
+        self._shards.append(self._get_shard_entry(shard_name, index_name))
+        utils.save_json_file({'shards': self._shards}, self._output_dir, 'shards_index.json')
+
+    def _get_shard_entry(self, shard_name: str, index_name: str) -> StrDict:
+        """Return the shards index entry of the current shard."""
+        return {
+            'shard': shard_name,
+            'index': index_name,
+            'first_frame': self._shard_index[0]['frame'] if self._shard_index else None,
+            'last_frame': self._shard_index[-1]['frame'] if self._shard_index else None,
+            'num_frames': len(self._shard_index),
+            'size_bytes': os.path.getsize(utils.join_paths(self._output_dir, shard_name))
+        }
+
+    def _resume_shard(self, shard_num: int, resume_frame: int) -> None:
+        """Keep or rewrite an existing shard, so it only holds frames before the resume frame."""
+        shard_name = get_shard_file_name(shard_num)
+        index_name = shard_name.replace('.tar', '.index.json')
+        shard_path = utils.join_paths(self._output_dir, shard_name)
+        index_path = utils.join_paths(self._output_dir, index_name)
+        # Closed shards holding only earlier frames are kept as they are
+        if os.path.isfile(index_path):
+            frames = utils.load_json_file(index_path)['frames']
+            if frames and frames[-1]['frame'] < resume_frame:
+                self._shard_num = shard_num
+                self._shard_index = frames
+                self._shards.append(self._get_shard_entry(shard_name, index_name))
+                return
+        # Otherwise read back the members of earlier frames, the shard may be truncated
+        self._pending_frames = {}
+        try:
+            with tarfile.open(shard_path, 'r') as shard:
+                for tar_info in shard:
+                    frame_num = int(tar_info.name.split('.', 1)[0][len('frame_'):])
+                    if frame_num < resume_frame:
+                        data = shard.extractfile(tar_info).read()
+                        self._pending_frames.setdefault(frame_num, []).append((tar_info.name, data))
+        except (tarfile.TarError, EOFError, OSError) as e:
+            logger.warning(f'Tar shard "{shard_name}" could not be fully read, keeping the members read so far: {e}')
+        os.remove(shard_path)
+        if os.path.isfile(index_path):
+            os.remove(index_path)
+        if not self._pending_frames:
+            logger.info(f'Tar shard "{shard_name}" removed, it only held frames to be captured again.')
+            return
+        # Rewrite the shard with the kept frames
+        self._shard_num = shard_num - 1
+        for frame_num in sorted(self._pending_frames.keys()):
+            self.commit_frame(frame_num)
+        self._close_shard()
+
+def get_shard_file_name(shard_num: int) -> str:
+    """Return the file name of the tar shard with the given number."""
+    return f'shard_{shard_num:06d}.tar'
+
+def get_shard_member_name(frame_num: int, camera_name: str, image_type: str, extension: str) -> str:
+    """Return the tar member name of a camera image, using the frame as WebDataset sample key."""
+    return f'frame_{frame_num:05d}.{camera_name}_{data_capture_mgr.image_file_suffixes[image_type]}.{extension}'
+
+def _get_padded_size(size: int) -> int:
+    """Return the given size rounded up to the tar block size."""
+    return -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+def _get_member_size(size: int) -> int:
+    """Return the size used in a tar file by a member with the given data size (header included)."""
+    return tarfile.BLOCKSIZE + _get_padded_size(size)
+
+def create_output_sink(output_dir: str) -> OutputSink:
+    """Create the output sink selected in the settings ("directory" or "tar")."""
+    import settings
+    if settings.output_sink == 'tar':
+        return TarShardSink(output_dir, settings.tar_shard_max_bytes)
+    if settings.output_sink != 'directory':
+        logger.warning(f'Unknown output sink "{settings.output_sink}", using "directory".')
+    return DirectorySink(output_dir)
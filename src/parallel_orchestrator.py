@@ -0,0 +1,136 @@
+import multiprocessing, queue, types
+from beamngpy import BeamNGpy
+
+import batch_runner, logging_mgr, scenario_mgr, session_config, utils
+from session_config import SessionConfig
+from typing import Callable, List, Tuple
+from type_defs import StrDict
+
+logger = logging_mgr.get_logger(__name__)
+
+# Function launching (or attaching to) the simulator instance listening on the given port
+SimulatorLauncher = Callable[[int], BeamNGpy]
+# Function running a batch session on a simulator: (bng, session number, name, session, output directory, seed) -> result
+SessionRunner = Callable[[BeamNGpy, int, str, SessionConfig, str, int], StrDict]
+
+def get_instance_ports(num_instances: int, base_port: int, port_stride: int) -> List[int]:
+    """Return the port of every simulator instance, starting from the base port."""
+    return [base_port + instance_num * port_stride for instance_num in range(num_instances)]
+
+def run_parallel_batch(batch_sessions: List[Tuple[str, SessionConfig]],
+                       output_dir: str,
+                       ports: List[int],
+                       random_seed: int,
+                       launch_simulator: SimulatorLauncher | None = None,
+                       run_session: SessionRunner | None = None) -> List[StrDict]:
+    """
+    Run a batch of capture sessions across several simulator instances, one worker process per instance.
+
+    Workers take the sessions from a shared queue, so faster instances run more sessions. Workers are spawned,
+    so they are given a snapshot of the current settings, including runtime overrides (e.g. from the command line).
+    Each session is saved in its own "session_XXX_<name>" subdirectory, and the random seed of each session is
+    derived from the given random seed and its index in the batch, so it does not depend on the worker running it.
+    "batch_summary.json" records the result of every session as they finish, and the sessions that never ran
+    (e.g. if every worker stopped) as 'not_run'.
+
+    The simulator launcher and session runner can be replaced (e.g. by a local stand-in simulator),
+    they must be picklable module-level functions.
+    """
+    launch_simulator = launch_simulator or _launch_simulator
+    run_session = run_session or batch_runner.run_batch_session
+    context = multiprocessing.get_context('spawn')
+    session_queue = context.Queue()
+    result_queue = context.Queue()
+    session_seeds = batch_runner.get_session_seeds(random_seed, len(batch_sessions))
+    for session_num, (session_name, session) in enumerate(batch_sessions):
+        session_queue.put((session_num, session_name, session.to_dict(), session_seeds[session_num]))
+    # One stop marker per worker, queued after every session
+    for _ in ports:
+        session_queue.put(None)
+    settings_snapshot = get_settings_snapshot()
+    workers = [context.Process(target=_run_worker,
+                               args=(worker_num, port, session_queue, result_queue, output_dir,
+                                     launch_simulator, run_session, settings_snapshot),
+                               name=f'capture_worker_{worker_num}')
+               for worker_num, port in enumerate(ports)]
+    for worker in workers:
+        worker.start()
+    logger.info(f'Started {len(workers)} capture workers on ports {ports} for {len(batch_sessions)} sessions.')
+    results = []
+    # Gather the session results until every session is done or every worker has stopped
+    while len(results) < len(batch_sessions):
+        try:
+            result = result_queue.get(timeout=1)
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers):
+                break
+            continue
+        results.append(result)
+        results.sort(key=lambda result: result['session_num'])
+        utils.save_json_file({'sessions': results}, output_dir, 'batch_summary.json')
+    for worker in workers:
+        worker.join()
+    # Sessions left in the queue when every worker stopped (e.g. their simulators could not be launched)
+    if len(results) < len(batch_sessions):
+        results += batch_runner.get_not_run_results(batch_sessions, results, session_seeds)
+        results.sort(key=lambda result: result['session_num'])
+        utils.save_json_file({'sessions': results}, output_dir, 'batch_summary.json')
+    num_completed = sum(result['status'] == 'completed' for result in results)
+    logger.info(f'Parallel batch run finished: {num_completed} of {len(batch_sessions)} sessions completed.')
+    return results
+
+def get_settings_snapshot() -> StrDict:
+    """Return the current values of the settings, to apply them in a spawned process (which imports settings.py anew)."""
+    import settings
+    return {name: value for name, value in vars(settings).items()
+            if not name.startswith('_') and not isinstance(value, types.ModuleType) and not callable(value)}
+
+def apply_settings_snapshot(settings_snapshot: StrDict) -> None:
+    """Set the settings to the values of a snapshot."""
+    import settings
+    for name, value in settings_snapshot.items():
+        setattr(settings, name, value)
+
+def _launch_simulator(port: int) -> BeamNGpy:
+    """Launch (or attach to) the simulator instance on the given port, ready to run capture sessions."""
+    import settings, simulation_mgr
+    bng = simulation_mgr.launch_beamng(port)
+    simulation_mgr.set_deterministic_steps_per_second(bng, settings.simulation_steps_per_second)
+    simulation_mgr.pause_simulation(bng)
+    return bng
+
+def _run_worker(worker_num: int,
+                port: int,
+                session_queue: multiprocessing.Queue,
+                result_queue: multiprocessing.Queue,
+                output_dir: str,
+                launch_simulator: SimulatorLauncher,
+                run_session: SessionRunner,
+                settings_snapshot: StrDict) -> None:
+    """Worker process: run the queued sessions on its own simulator instance until a stop marker is found."""
+    # Use the settings of the main process, before anything reads them
+    apply_settings_snapshot(settings_snapshot)
+    logging_mgr.configure_logging(utils.create_dir(output_dir, f'worker_{worker_num}'))
+    logger.info(f'Capture worker {worker_num} started on port {port}.')
+    bng = launch_simulator(port)
+    # Spawned workers start with an empty module state, load the weather presets as the sequential run does
+    # (the batch weather presets are checked by the main process before starting the workers)
+    scenario_mgr.get_weather_presets()
+    try:
+        while True:
+            item = session_queue.get()
+            if item is None:
+                break
+            session_num, session_name, session_dict, session_seed = item
+            session = session_config.create_session_config_from_dict(session_dict)
+            try:
+                result = run_session(bng, session_num, session_name, session, output_dir, session_seed)
+            except Exception as e:
+                # Report the failed session and go on with the next one, as the sequential batch does
+                logger.error(f'Batch session "{session_name}" stopped by an error: {e}')
+                result = {'session_num': session_num, 'session': session_name, 'map': session.map,
+                          'random_seed': session_seed, 'status': 'failed', 'error': str(e)}
+            result_queue.put(dict(result, worker=worker_num, port=port))
+    finally:
+        bng.close()
+        logger.info(f'Capture worker {worker_num} stopped.')
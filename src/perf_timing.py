@@ -0,0 +1,152 @@
+import json, math, os, threading, time
+
+import logging_mgr, utils
+from typing import Dict, List, Tuple
+from type_defs import StrDict
+
+logger = logging_mgr.get_logger(__name__)
+
+# Name of the performance report file, stored in the session output directory
+perf_report_file_name: str = 'perf_report.json'
+# Name of the Chrome trace file (open in chrome://tracing or https://ui.perfetto.dev), stored in the session output directory
+perf_trace_file_name: str = 'perf_trace.json'
+# Upper bounds (ms) of the duration histogram buckets of each stage, the last bucket has no upper bound
+histogram_bucket_bounds_ms: Tuple[float, ...] = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+class PerfRecorder:
+    """
+    Recorder of the time spent in each stage of the capture sessions (state poll, camera poll, encode, write, etc.).
+
+    Stage durations are measured with the monotonic performance counter, in nanoseconds, and kept in memory
+    until the report is saved. Stages can be timed from any thread: appending to a list is atomic in CPython,
+    so no lock is taken while timing. If the trace is enabled, every timed stage is also kept as a complete
+    event of the Chrome trace format, with its start time and thread.
+    """
+    def __init__(self, is_trace_enabled: bool):
+        """Initialize the recorder, starting the session clock."""
+        self._is_trace_enabled = is_trace_enabled
+        self._start_ns = time.perf_counter_ns()
+        self._durations_ns: Dict[str, List[int]] = {}
+        # Trace events as (stage name, start time, duration, thread ID), times in nanoseconds since the session start
+        self._trace_events: List[Tuple[str, int, int, int]] = []
+        self._num_frames = 0
+
+    def record(self, stage_name: str, start_ns: int, end_ns: int) -> None:
+        """Record a stage timed between the given performance counter values."""
+        durations_ns = self._durations_ns.get(stage_name)
+        if durations_ns is None:
+            durations_ns = self._durations_ns.setdefault(stage_name, [])
+        durations_ns.append(end_ns - start_ns)
+        if self._is_trace_enabled:
+            self._trace_events.append((stage_name, start_ns - self._start_ns, end_ns - start_ns, threading.get_ident()))
+
+    def count_frame(self) -> None:
+        """Count a captured frame, used to compute the throughput."""
+        self._num_frames += 1
+
+    def get_report(self, target_freq_hz: float | None = None) -> StrDict:
+        """Return the throughput and the duration statistics and histogram of every stage (in milliseconds)."""
+        elapsed_s = (time.perf_counter_ns() - self._start_ns) / 1e9
+        report = {
+            'frames': self._num_frames,
+            'elapsed_s': elapsed_s,
+            'throughput_fps': self._num_frames / elapsed_s if elapsed_s > 0 else 0.0,
+            'target_freq_hz': target_freq_hz,
+            'histogram_bucket_bounds_ms': list(histogram_bucket_bounds_ms),
+            'stages': {}
+        }
+        for stage_name, durations_ns in sorted(self._durations_ns.items()):
+            durations_ms = sorted(duration_ns / 1e6 for duration_ns in durations_ns)
+            histogram = [0] * (len(histogram_bucket_bounds_ms) + 1)
+            bucket = 0
+            for duration_ms in durations_ms:
+                while bucket < len(histogram_bucket_bounds_ms) and duration_ms > histogram_bucket_bounds_ms[bucket]:
+                    bucket += 1
+                histogram[bucket] += 1
+            report['stages'][stage_name] = {
+                'count': len(durations_ms),
+                'total_ms': sum(durations_ms),
+                'mean_ms': sum(durations_ms) / len(durations_ms),
+                'p50_ms': _get_percentile(durations_ms, 50),
+                'p95_ms': _get_percentile(durations_ms, 95),
+                'p99_ms': _get_percentile(durations_ms, 99),
+                'max_ms': durations_ms[-1],
+                'histogram': histogram
+            }
+        return report
+
+    def save_report(self, output_dir: str, target_freq_hz: float | None = None) -> None:
+        """Save the performance report as "perf_report.json", and the trace as "perf_trace.json" if enabled."""
+        report = self.get_report(target_freq_hz)
+        utils.save_json_file(report, output_dir, perf_report_file_name)
+        logger.info(f'Performance report saved: {report["frames"]} frames in {report["elapsed_s"]:.1f} s '
+                    f'({report["throughput_fps"]:.2f} frames per second).')
+        if self._is_trace_enabled:
+            self._save_trace(output_dir)
+
+    def _save_trace(self, output_dir: str) -> None:
+        """Save the timed stages as complete events of the Chrome trace format (times in microseconds)."""
+        process_id = os.getpid()
+        trace = {
+            'traceEvents': [
+                {'name': stage_name, 'ph': 'X', 'ts': start_ns / 1000, 'dur': duration_ns / 1000, 'pid': process_id, 'tid': thread_id}
+                for stage_name, start_ns, duration_ns, thread_id in self._trace_events
+                ],
+            'displayTimeUnit': 'ms'
+        }
+        with open(utils.join_paths(output_dir, perf_trace_file_name), 'w', encoding='utf-8') as file:
+            json.dump(trace, file)
+        logger.info(f'Performance trace saved with {len(self._trace_events)} events.')
+
+class _StageTimer:
+    """Context manager timing a stage with the active recorder."""
+    __slots__ = ('_recorder', '_stage_name', '_start_ns')
+
+    def __init__(self, recorder: PerfRecorder, stage_name: str):
+        self._recorder = recorder
+        self._stage_name = stage_name
+
+    def __enter__(self) -> None:
+        self._start_ns = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info) -> None:
+        self._recorder.record(self._stage_name, self._start_ns, time.perf_counter_ns())
+
+class _NullStageTimer:
+    """Context manager doing nothing, used when no recorder is active."""
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+_null_stage_timer = _NullStageTimer()
+
+# Recorder of the running capture session (None if timing is disabled or no session is running)
+_active_recorder: PerfRecorder | None = None
+
+def start_recording() -> PerfRecorder | None:
+    """Start timing the stages of a capture session, if enabled in the settings. Returns the active recorder."""
+    import settings
+    global _active_recorder
+    _active_recorder = PerfRecorder(settings.perf_trace_enabled) if settings.perf_report_enabled else None
+    return _active_recorder
+
+def stop_recording() -> None:
+    """Stop timing the stages of the capture session."""
+    global _active_recorder
+    _active_recorder = None
+
+def stage(stage_name: str) -> _StageTimer | _NullStageTimer:
+    """Return a context manager timing the given stage with the active recorder (no-op if there is none)."""
+    recorder = _active_recorder
+    if recorder is None:
+        return _null_stage_timer
+    return _StageTimer(recorder, stage_name)
+
+def _get_percentile(sorted_values: List[float], percentile: float) -> float:
+    """Return the given percentile of the sorted values (nearest rank)."""
+    rank = max(1, math.ceil(len(sorted_values) * percentile / 100))
+    return sorted_values[rank - 1]
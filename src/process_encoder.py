@@ -0,0 +1,103 @@
+import os, threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+import image_encoding
+from typing import Dict, List, Tuple
+from type_defs import StrDict
+
+class ProcessPoolEncoder:
+    """
+    Image encoder backend running in a pool of worker processes.
+
+    Pixel buffers are handed over to the workers through shared memory instead of
+    being pickled, so only the (much smaller) encoded bytes travel back through the pipe.
+    Each calling thread owns a reusable shared memory block, grown whenever a larger image arrives.
+    """
+    def __init__(self, num_processes: int):
+        """Initialize the encoder and start its pool of worker processes."""
+        self._num_processes = num_processes
+        self._executor = ProcessPoolExecutor(max_workers=num_processes)
+        self._local = threading.local()
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self._blocks_lock = threading.Lock()
+
+    @property
+    def num_processes(self) -> int:
+        """Get the number of worker processes used by the encoder."""
+        return self._num_processes
+
+    def encode(self, array: np.ndarray, format_name: str, format_options: StrDict) -> bytes:
+        """Copy the image array into shared memory and encode it in the given format in a worker process."""
+        block = self._get_thread_block(array.nbytes)
+        shared_array = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        shared_array[...] = array
+        # Release the view before the block can be resized by this thread
+        del shared_array
+        future = self._executor.submit(_encode_shared_image_array,
+                                       threading.get_ident(),
+                                       block.name,
+                                       array.shape,
+                                       array.dtype.str,
+                                       format_name,
+                                       format_options)
+        return future.result()
+
+    def close(self) -> None:
+        """Stop the worker processes and release all shared memory blocks."""
+        self._executor.shutdown(wait=True)
+        with self._blocks_lock:
+            for block in self._blocks:
+                _release_block(block)
+            self._blocks.clear()
+
+    def _get_thread_block(self, size: int) -> shared_memory.SharedMemory:
+        """Return the calling thread's shared memory block, with at least the given size."""
+        block = getattr(self._local, 'block', None)
+        if block is None or block.size < size:
+            new_block = shared_memory.SharedMemory(create=True, size=max(1, size))
+            with self._blocks_lock:
+                if block is not None:
+                    self._blocks.remove(block)
+                    _release_block(block)
+                self._blocks.append(new_block)
+            self._local.block = new_block
+            block = new_block
+        return block
+
+def get_num_encode_processes() -> int:
+    """Return the number of encoder worker processes set in the settings, or the CPU cores left by the reserved ones."""
+    import settings
+    return settings.capture_num_encode_processes or max(1, (os.cpu_count() or 2) - settings.capture_reserved_cores)
+
+def _release_block(block: shared_memory.SharedMemory) -> None:
+    """Close and unlink a shared memory block owned by this process."""
+    block.close()
+    block.unlink()
+
+# Shared memory block attached by a worker process for each owner thread of the parent, kept open between tasks
+_attached_blocks: Dict[int, shared_memory.SharedMemory] = {}
+
+def _encode_shared_image_array(owner_id: int,
+                               block_name: str,
+                               shape: Tuple[int, ...],
+                               dtype: str,
+                               format_name: str,
+                               format_options: StrDict) -> bytes:
+    """
+    Encode an image array stored in the named shared memory block of an owner thread (runs in a worker process).
+
+    When the owner has grown its block (a new block name), the attachment to its previous block is closed.
+    """
+    block = _attached_blocks.get(owner_id)
+    if block is None or block.name != block_name:
+        if block is not None:
+            block.close()
+        block = shared_memory.SharedMemory(name=block_name)
+        _attached_blocks[owner_id] = block
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    try:
+        return image_encoding.encode_image_array(array, format_name, format_options)
+    finally:
+        del array
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Euler angle sequence of the vehicle rotations (roll, pitch, yaw), extrinsic rotations about x, y and z
+default_euler_sequence: str = 'xyz'
+# Cosine of the pitch below which the rotation is in gimbal lock (roll and yaw are then not independent)
+_gimbal_lock_cos_threshold: float = 1e-7
+
+def euler_to_quaternions(angles: np.ndarray, degrees: bool = True, seq: str = default_euler_sequence) -> np.ndarray:
+    """
+    Convert Euler angles to quaternions (qx, qy, qz, qw).
+
+    Angles can be a single (roll, pitch, yaw) triple or an array of them, of shape (..., 3), which are converted
+    at once. Only the "xyz" sequence is computed here, any other sequence is converted by SciPy (imported then).
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    if seq != default_euler_sequence:
+        from scipy.spatial.transform import Rotation
+        return Rotation.from_euler(seq, angles.reshape(-1, 3), degrees=degrees).as_quat().reshape(angles.shape[:-1] + (4,))
+    if degrees:
+        angles = np.radians(angles)
+    half_angles = angles * 0.5
+    cos_roll, cos_pitch, cos_yaw = np.moveaxis(np.cos(half_angles), -1, 0)
+    sin_roll, sin_pitch, sin_yaw = np.moveaxis(np.sin(half_angles), -1, 0)
+    # Product of the rotations about z, y and x (q = q_yaw * q_pitch * q_roll)
+    return np.stack([sin_roll * cos_pitch * cos_yaw - cos_roll * sin_pitch * sin_yaw,
+                     cos_roll * sin_pitch * cos_yaw + sin_roll * cos_pitch * sin_yaw,
+                     cos_roll * cos_pitch * sin_yaw - sin_roll * sin_pitch * cos_yaw,
+                     cos_roll * cos_pitch * cos_yaw + sin_roll * sin_pitch * sin_yaw], axis=-1)
+
+def quaternions_to_euler(quats: np.ndarray, degrees: bool = True, seq: str = default_euler_sequence) -> np.ndarray:
+    """
+    Convert quaternions (qx, qy, qz, qw) to Euler angles (roll, pitch, yaw).
+
+    Quaternions can be a single one or an array of them, of shape (..., 4), and do not need to be normalized.
+    Angles follow the SciPy conventions: roll and yaw in [-180, 180] and pitch in [-90, 90] degrees, and in
+    gimbal lock (pitch of +-90 degrees) the yaw is set to 0. Only the "xyz" sequence is computed here,
+    any other sequence is converted by SciPy (imported then).
+    """
+    quats = np.asarray(quats, dtype=np.float64)
+    if seq != default_euler_sequence:
+        from scipy.spatial.transform import Rotation
+        return Rotation.from_quat(quats.reshape(-1, 4)).as_euler(seq, degrees=degrees).reshape(quats.shape[:-1] + (3,))
+    quats = quats / np.linalg.norm(quats, axis=-1, keepdims=True)
+    qx, qy, qz, qw = np.moveaxis(quats, -1, 0)
+    # Elements of the rotation matrix used to recover the angles (R = R_yaw @ R_pitch @ R_roll)
+    r00 = 1 - 2 * (qy * qy + qz * qz)
+    r01 = 2 * (qx * qy - qz * qw)
+    r10 = 2 * (qx * qy + qz * qw)
+    r11 = 1 - 2 * (qx * qx + qz * qz)
+    r20 = 2 * (qx * qz - qy * qw)
+    r21 = 2 * (qy * qz + qx * qw)
+    r22 = 1 - 2 * (qx * qx + qy * qy)
+    cos_pitch = np.hypot(r00, r10)
+    pitch = np.arctan2(-r20, cos_pitch)
+    # In gimbal lock, only the sum (or difference) of roll and yaw is known: it is all set as roll
+    is_gimbal_lock = cos_pitch < _gimbal_lock_cos_threshold
+    roll = np.where(is_gimbal_lock, np.arctan2(np.where(r20 < 0, r01, -r01), r11), np.arctan2(r21, r22))
+    yaw = np.where(is_gimbal_lock, 0.0, np.arctan2(r10, r00))
+    angles = np.stack([roll, pitch, yaw], axis=-1)
+    return np.degrees(angles) if degrees else angles
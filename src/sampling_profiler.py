@@ -0,0 +1,132 @@
+import atexit, collections, os, sys, threading, time
+
+import logging_mgr, utils
+from typing import List, Tuple
+
+logger = logging_mgr.get_logger(__name__)
+
+# Names of the profile files, stored in the session output directory
+profile_stacks_file_name: str = 'profile_stacks.txt'
+profile_summary_file_name: str = 'profile_summary.txt'
+
+class SamplingProfiler:
+    """
+    Sampling profiler of the program threads, run by a background thread.
+
+    Every sampling interval, the current stack of each profiled thread (the main thread and the capture
+    pipeline threads by default, see "profile_thread_names") is recorded. Stacks are saved in the collapsed
+    stack format ("thread;outer function;...;inner function count", one stack per line), which can be turned
+    into a flame graph by flamegraph.pl or opened in speedscope, along with a summary of the functions with
+    the most samples. Being a sampling profiler, the profiled code runs at full speed between samples.
+    """
+    def __init__(self, interval_s: float, thread_name_prefixes: List[str]):
+        """Initialize the profiler, sampling the threads whose name starts with any of the given prefixes."""
+        if interval_s <= 0:
+            raise ValueError('Profiler sampling interval must be a positive number.')
+        self._interval_s = interval_s
+        self._thread_name_prefixes = tuple(thread_name_prefixes)
+        # Number of samples of each stack, as (thread name, frames from outermost to innermost)
+        self._stack_counts: collections.Counter = collections.Counter()
+        self._num_samples = 0
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_time_s = 0.0
+        self._elapsed_s = 0.0
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        self._start_time_s = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_worker, name='sampling_profiler', daemon=True)
+        self._thread.start()
+        logger.info(f'Sampling profiler started, sampling every {self._interval_s * 1000:.1f} ms.')
+
+    def stop(self) -> None:
+        """Stop sampling, waiting for the background thread to finish."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._elapsed_s = time.perf_counter() - self._start_time_s
+        logger.info(f'Sampling profiler stopped after {self._num_samples} samples.')
+
+    def save(self, output_dir: str, top_n: int) -> None:
+        """Save the collapsed stacks and the summary of the top N functions in the output directory."""
+        with open(utils.join_paths(output_dir, profile_stacks_file_name), 'w', encoding='utf-8') as file:
+            for (thread_name, frames), count in self._stack_counts.most_common():
+                file.write(f'{";".join((thread_name,) + frames)} {count}\n')
+        with open(utils.join_paths(output_dir, profile_summary_file_name), 'w', encoding='utf-8') as file:
+            file.write(self.get_summary(top_n))
+        logger.info(f'Profile saved in "{profile_stacks_file_name}" and "{profile_summary_file_name}".')
+
+    def save_at_exit(self, output_dir: str, top_n: int) -> None:
+        """Stop the profiler and save the profile when the program exits."""
+        def stop_and_save() -> None:
+            self.stop()
+            self.save(output_dir, top_n)
+        atexit.register(stop_and_save)
+
+    def get_summary(self, top_n: int) -> str:
+        """
+        Return the top N functions by samples where they were running (self) and by samples
+        where they were on the stack (total), and the number of samples of each thread.
+        """
+        self_counts: collections.Counter = collections.Counter()
+        total_counts: collections.Counter = collections.Counter()
+        thread_counts: collections.Counter = collections.Counter()
+        for (thread_name, frames), count in self._stack_counts.items():
+            thread_counts[thread_name] += count
+            if frames:
+                self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        num_stacks = sum(thread_counts.values()) or 1
+        lines = [f'{self._num_samples} samples every {self._interval_s * 1000:.1f} ms over {self._elapsed_s:.1f} s, '
+                 f'{num_stacks} thread stacks.', '']
+        for title, counts in (('Samples per thread', thread_counts),
+                              (f'Top {top_n} functions by self samples', self_counts),
+                              (f'Top {top_n} functions by total samples', total_counts)):
+            lines.append(title)
+            for name, count in counts.most_common(None if counts is thread_counts else top_n):
+                lines.append(f'{count:>10} {100 * count / num_stacks:>6.1f}%  {name}')
+            lines.append('')
+        return '\n'.join(lines)
+
+    def _sample_worker(self) -> None:
+        """Sample the profiled threads until stopped."""
+        own_thread_id = threading.get_ident()
+        while not self._stop_event.wait(self._interval_s):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                thread_name = thread_names.get(thread_id, '')
+                if thread_id == own_thread_id or not thread_name.startswith(self._thread_name_prefixes):
+                    continue
+                self._stack_counts[(thread_name, _get_stack(frame))] += 1
+            self._num_samples += 1
+
+def _get_stack(frame) -> Tuple[str, ...]:
+    """Return the functions of the stack ending in the given frame, from outermost to innermost."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+def start_profiling(scope: str) -> SamplingProfiler | None:
+    """
+    Start a sampling profiler if profiling is enabled for the given scope in the settings.
+
+    Scopes are 'session' (the whole program, including the GUI and the simulator launch) and
+    'capture_loop' (only the capture loop of each session). Returns the started profiler, or None.
+    """
+    import settings
+    if settings.profile_mode not in ('', 'session', 'capture_loop'):
+        logger.warning(f'Unknown profile mode "{settings.profile_mode}", profiling disabled.')
+        return None
+    if settings.profile_mode != scope:
+        return None
+    profiler = SamplingProfiler(settings.profile_interval_s, settings.profile_thread_names)
+    profiler.start()
+    return profiler
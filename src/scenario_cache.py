@@ -0,0 +1,88 @@
+import hashlib, json, os
+from datetime import datetime
+
+import logging_mgr
+from session_config import SessionConfig
+from typing import Dict
+from type_defs import StrDict
+
+logger = logging_mgr.get_logger(__name__)
+
+# Name of the scenario cache file, stored in the "BeamNG-Data-Capture" folder of the output root path by default
+scenario_cache_file_name: str = 'scenario_cache.json'
+
+def get_scenario_fingerprint(session: SessionConfig) -> str:
+    """
+    Return the fingerprint of the scenario files made for a session.
+
+    Only the fields written in the scenario files are included (map, scenario name and "ego" vehicle), along with
+    the BeamNGpy version that generates them. Weather, time of day, traffic and cameras are set after loading.
+    """
+    import beamngpy
+    scenario_fields = {
+        'beamngpy': beamngpy.__version__,
+        'map': session.map,
+        'scenario': session.scenario,
+        'vehicle': session.vehicle.to_dict()
+    }
+    return hashlib.sha256(json.dumps(scenario_fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+def get_scenario_cache_path() -> str:
+    """Return the path of the scenario cache file set in the settings, or its default path."""
+    import settings
+    return settings.scenario_cache_path or os.path.join(settings.output_root_path, 'BeamNG-Data-Capture', scenario_cache_file_name)
+
+def get_scenario_key(user_path: str | None, map_name: str, scenario_name: str) -> str:
+    """Return the cache key of the scenario files of a map and scenario name, in a simulator user folder."""
+    return f'{user_path or ""}|{map_name}/{scenario_name}'
+
+def load_scenario_cache() -> Dict[str, StrDict]:
+    """Load the scenario cache entries, keyed by scenario key (empty if there is no cache file or it is unreadable)."""
+    cache_path = get_scenario_cache_path()
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, encoding='utf-8') as file:
+            return json.load(file)['scenarios']
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f'Scenario cache "{cache_path}" could not be read, ignoring it: {e}')
+        return {}
+
+def find_cached_scenario_path(scenario_key: str, fingerprint: str) -> str | None:
+    """
+    Return the path of the scenario info file made with the given fingerprint, or None if it must be made again.
+
+    Scenario files are named after their map and scenario name, so each key holds the files of the last
+    scenario made with it: they are only reused if that scenario had the same fingerprint.
+    """
+    entry = load_scenario_cache().get(scenario_key)
+    if entry is None or entry['fingerprint'] != fingerprint:
+        return None
+    return entry['path']
+
+def store_scenario_path(scenario_key: str, fingerprint: str, scenario_path: str) -> None:
+    """
+    Record the fingerprint and info file path of the scenario files just made.
+
+    The cache file is read again before writing, to keep the entries stored by other processes
+    (e.g. the workers of a parallel batch), and replaced atomically.
+    """
+    scenarios = load_scenario_cache()
+    scenarios[scenario_key] = {'fingerprint': fingerprint, 'path': scenario_path, 'made': datetime.now().isoformat(timespec='seconds')}
+    _save_scenario_cache(scenarios)
+
+def remove_scenario_path(scenario_key: str) -> None:
+    """Forget the scenario files of a key (e.g. if they could not be loaded anymore)."""
+    scenarios = load_scenario_cache()
+    if scenarios.pop(scenario_key, None) is not None:
+        _save_scenario_cache(scenarios)
+
+def _save_scenario_cache(scenarios: Dict[str, StrDict]) -> None:
+    """Atomically replace the scenario cache file with the given entries."""
+    cache_path = get_scenario_cache_path()
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Temporary file of this process, so processes writing at the same time do not mix their files
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump({'scenarios': scenarios}, file, indent=4)
+    os.replace(temp_path, cache_path)
@@ -1,16 +1,25 @@
-from type_defs import List, Tuple
+import os
+from typing import List, Tuple
 from beamngpy import BeamNGpy, Scenario, Vehicle
+from beamngpy.logging import BNGError
 from beamngpy.scenario.scenario_object import ScenarioObject
 
-import logging_mgr, simulation_mgr, vehicle_mgr, utils
+import logging_mgr, scenario_cache, simulation_mgr, vehicle_mgr, utils
 from session_config import SessionConfig
 
+logger = logging_mgr.get_logger(__name__)
+
 # Global variable to store the available weather presets
 weather_presets: List[str] = []
 
 # Global variable to store the available waypoints in the scenario
 scenario_waypoints: List[ScenarioObject] = []
 
+# Global variables to store the scenario loaded in the simulator and its "ego" vehicle,
+# reused by consecutive capture sessions on the same map
+loaded_scenario: Scenario | None = None
+loaded_ego_vehicle: Vehicle | None = None
+
 def teleport_vehicle_to_waypoint(bng: BeamNGpy,
                                  scenario: Scenario,
                                  vehicle: Vehicle,
@@ -23,11 +32,11 @@ def teleport_vehicle_to_waypoint(bng: BeamNGpy,
     """
     # Scenario must be loaded in the simulator to find waypoints (get_current() doesn't match the scenario)
     if bng.scenario.get_current(False).name != scenario.name:
-        logging_mgr.log_error(f'Scenario {scenario} must be loaded in the simulator to use waypoints.')
+        logger.error(f'Scenario {scenario} must be loaded in the simulator to use waypoints.')
     else:
         # Check if waypoints have been found in the scenario
         if not scenario_waypoints:
-            logging_mgr.log_warning('No waypoints found in the scenario. Cannot teleport vehicle to waypoint.')
+            logger.warning('No waypoints found in the scenario. Cannot teleport vehicle to waypoint.')
         else:
             # Find the waypoint with the provided name
             target_waypoint = next((waypoint_obj for waypoint_obj in scenario_waypoints if waypoint_obj.name == waypoint), None)
@@ -36,9 +45,9 @@ def teleport_vehicle_to_waypoint(bng: BeamNGpy,
                 vehicle_mgr.teleport_vehicle(vehicle,
                                              target_waypoint.pos,
                                              target_waypoint.rot)
-                logging_mgr.log_action(f'Vehicle {vehicle.vid} teleported to waypoint "{waypoint}".')
+                logger.info(f'Vehicle {vehicle.vid} teleported to waypoint "{waypoint}".')
             else:
-                logging_mgr.log_warning(f'Waypoint "{waypoint}" not found in the scenario. Vehicle not teleported.')
+                logger.warning(f'Waypoint "{waypoint}" not found in the scenario. Vehicle not teleported.')
 
 def teleport_vehicle_to_random_waypoint(bng: BeamNGpy,
                                         scenario: Scenario,
@@ -48,7 +57,7 @@ def teleport_vehicle_to_random_waypoint(bng: BeamNGpy,
     waypoints_list = find_waypoints(scenario)
     # If no waypoints are found, log a warning and skip teleporting the vehicle
     if not waypoints_list:
-        logging_mgr.log_warning('No waypoints found in the scenario. Skipping vehicle teleportation.')
+        logger.warning('No waypoints found in the scenario. Skipping vehicle teleportation.')
     else:
         # Select a random waypoint from the list
         waypoint = utils.select_random_item(waypoints_list)
@@ -64,24 +73,40 @@ def find_waypoints(scenario: Scenario) -> List[str]:
     # Use global list to store the waypoints
     global scenario_waypoints
     scenario_waypoints = scenario.find_waypoints()
-    logging_mgr.log_action(f'Found {len(scenario_waypoints)} waypoints in the scenario.')
+    logger.info(f'Found {len(scenario_waypoints)} waypoints in the scenario.')
     # Return the names of the waypoints found
     return [waypoint.name for waypoint in scenario_waypoints]
 
 def create_scenario(bng: BeamNGpy, session: SessionConfig) -> Tuple[Scenario, Vehicle]:
-    """Create a scenario based on the provided session configuration."""
+    """
+    Create a scenario based on the provided session configuration.
+
+    If the scenario cache is enabled and the scenario files were last made for the same scenario fingerprint
+    (map, scenario name and "ego" vehicle), they are reused instead of being generated again.
+    """
+    import settings
     # Create a scenario in the given map
     scenario = Scenario(session.map, session.scenario)
-    logging_mgr.log_action(f'Scenario "{session.scenario}" created in map "{session.map}".')
+    logger.info(f'Scenario "{session.scenario}" created in map "{session.map}".')
     # Create an "ego vehicle" to capture data from
     ego = vehicle_mgr.add_vehicle(scenario,
                                   session.vehicle.name,
                                   session.vehicle.model,
                                   session.vehicle.initial_position,
                                   session.vehicle.initial_rotation)
-    # Place files defining the scenario for the simulator to read
-    scenario.make(bng)
-    logging_mgr.log_action(f'Scenario "{session.scenario}" files created.')
+    # Reuse the scenario files if they were last made for the same scenario
+    scenario_key = scenario_cache.get_scenario_key(bng.user, session.map, session.scenario)
+    fingerprint = scenario_cache.get_scenario_fingerprint(session)
+    cached_path = scenario_cache.find_cached_scenario_path(scenario_key, fingerprint) if settings.scenario_cache_enabled else None
+    if cached_path is not None:
+        scenario.path = cached_path
+        logger.info(f'Scenario "{session.scenario}" files unchanged, reusing "{cached_path}".')
+    else:
+        # Place files defining the scenario for the simulator to read
+        scenario.make(bng)
+        logger.info(f'Scenario "{session.scenario}" files created.')
+        if settings.scenario_cache_enabled:
+            scenario_cache.store_scenario_path(scenario_key, fingerprint, scenario.path)
     # Return the created scenario and the "ego" vehicle
     return scenario, ego
 
@@ -96,6 +121,67 @@ def initialize_scenario(bng: BeamNGpy,
     # Load and start the scenario in the simulator
     simulation_mgr.load_scenario(bng, scenario)
     simulation_mgr.start_scenario(bng)
+    configure_session_environment(bng, ego_vehicle, session_config)
+
+def set_up_session_scenario(bng: BeamNGpy, session: SessionConfig) -> Tuple[Scenario, Vehicle]:
+    """
+    Set up the scenario of a capture session in the simulator and return it with its "ego" vehicle.
+
+    If the scenario loaded by a previous session is on the same map, the map is kept loaded and only
+    the "ego" vehicle, AI traffic and weather are replaced. The "ego" vehicle itself is kept (reset to its
+    initial position) if the previous one has the same name and model. Otherwise, the scenario is created
+    and loaded, reusing the cached scenario files if unchanged (see "create_scenario").
+    """
+    import settings
+    global loaded_scenario, loaded_ego_vehicle
+    if loaded_scenario is not None and loaded_scenario.level == session.map:
+        logger.info(f'Map "{session.map}" already loaded, reusing it for scenario "{session.scenario}".')
+        if (loaded_ego_vehicle is not None
+                and loaded_ego_vehicle.vid == session.vehicle.name
+                and loaded_ego_vehicle.model == session.vehicle.model):
+            # Same vehicle as the previous session, reset it instead of spawning it again
+            ego = loaded_ego_vehicle
+            vehicle_mgr.teleport_vehicle(ego, session.vehicle.initial_position, session.vehicle.initial_rotation)
+            vehicle_mgr.set_headlights(ego, 0)
+        else:
+            # Replace the previous "ego" vehicle with the one of the session
+            if loaded_ego_vehicle is not None:
+                vehicle_mgr.despawn_vehicle(bng, loaded_ego_vehicle)
+                loaded_ego_vehicle = None
+            ego = vehicle_mgr.spawn_vehicle(bng,
+                                            session.vehicle.name,
+                                            session.vehicle.model,
+                                            session.vehicle.initial_position,
+                                            session.vehicle.initial_rotation)
+        configure_session_environment(bng, ego, session)
+    else:
+        # Create and load the session scenario, replacing any loaded one
+        loaded_scenario = None
+        scenario, ego = create_scenario(bng, session)
+        try:
+            initialize_scenario(bng, scenario, ego, session)
+        except BNGError as e:
+            if not settings.scenario_cache_enabled:
+                raise
+            # The cached scenario files may have been removed from the simulator user folder, make them again
+            logger.warning(f'Scenario "{session.scenario}" could not be loaded ({e}), creating its files again.')
+            scenario_cache.remove_scenario_path(scenario_cache.get_scenario_key(bng.user, session.map, session.scenario))
+            scenario, ego = create_scenario(bng, session)
+            initialize_scenario(bng, scenario, ego, session)
+        loaded_scenario = scenario
+    loaded_ego_vehicle = ego
+    return loaded_scenario, ego
+
+def clear_loaded_scenario() -> None:
+    """Forget the loaded scenario, so the next capture session loads its own (e.g. after a failed session)."""
+    global loaded_scenario, loaded_ego_vehicle
+    loaded_scenario = None
+    loaded_ego_vehicle = None
+
+def configure_session_environment(bng: BeamNGpy,
+                                  ego_vehicle: Vehicle,
+                                  session_config: SessionConfig) -> None:
+    """Set the "ego" vehicle AI mode and colour, the AI traffic and the weather of a capture session."""
     # Set the vehicle AI mode to realistic traffic simulation
     vehicle_mgr.set_vehicle_ai_mode(ego_vehicle,
                                     'traffic',
@@ -107,17 +193,33 @@ def initialize_scenario(bng: BeamNGpy,
     # Set weather preset for the scenario
     set_weather_preset(bng, session_config.weather)
 
+def get_weather_presets_path() -> str:
+    """Return the path of the weather presets file set in the settings, or its default path in the simulator folder."""
+    import settings
+    return settings.weather_presets_path or os.path.join(settings.beamng_home_path, 'gameengine.zip/art/weather/defaults.json')
+
 def get_weather_presets() -> None:
     """Load the available weather presets from the settings file into the global variable "weather_presets"."""
     global weather_presets
-    import settings
     # Load the weather presets from the path specified in the settings
-    weather_presets = utils.load_json_file(settings.weather_presets_path).keys()
+    weather_presets = utils.load_json_file(get_weather_presets_path()).keys()
     # Log a warning if no weather presets are found
     if weather_presets:
-        logging_mgr.log_action(f'Weather presets loaded: {list(weather_presets)}.')
+        logger.info(f'Weather presets loaded: {list(weather_presets)}.')
     else:
-        logging_mgr.log_warning('No weather presets file found. Weather presets will not be available.')
+        logger.warning('No weather presets file found. Weather presets will not be available.')
+
+def check_batch_weather_presets(batch_sessions: List[Tuple[str, SessionConfig]]) -> None:
+    """
+    Check that the weather preset of every session of a batch is available (the weather presets must be loaded).
+
+    Raises ValueError listing the sessions with an unknown weather preset, so a batch is not captured with the wrong weather.
+    """
+    unknown_presets = [f'{session_name} ("{session.weather}")' for session_name, session in batch_sessions
+                       if session.weather and session.weather not in weather_presets]
+    if unknown_presets:
+        raise ValueError(f'Weather preset not available for sessions {", ".join(unknown_presets)} '
+                         f'(available presets: {list(weather_presets)}).')
 
 def set_weather_preset(bng: BeamNGpy, weather_preset: str, transition_time: float = 1) -> None:
     """
@@ -127,11 +229,11 @@ def set_weather_preset(bng: BeamNGpy, weather_preset: str, transition_time: floa
     """
     # If no weather preset is provided, skip
     if not weather_preset:
-        logging_mgr.log_action('No weather preset provided. Skipping weather preset configuration.')
+        logger.info('No weather preset provided. Skipping weather preset configuration.')
     # If the weather preset is not available, log a warning
     elif weather_preset not in weather_presets:
-        logging_mgr.log_warning(f'Weather preset "{weather_preset}" not available.')
+        logger.warning(f'Weather preset "{weather_preset}" not available.')
     # Otherwise, proceed with setting the weather preset
     else:
         bng.set_weather_preset(weather_preset, transition_time)
-        logging_mgr.log_action(f'Set weather preset to {weather_preset}.')
\ No newline at end of file
+        logger.info(f'Set weather preset to {weather_preset}.')
\ No newline at end of file
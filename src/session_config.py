@@ -1,9 +1,11 @@
-from type_defs import TypedDict, List
+from typing import List, TypedDict
 
 import logging_mgr, utils
 from vehicle_config import VehicleConfig
 from camera_sensor_config import CameraSensorConfig
 
+logger = logging_mgr.get_logger(__name__)
+
 class SessionConfigDict(TypedDict):
     scenario: str
     duration_s: float
@@ -253,19 +255,19 @@ class SessionConfig:
 def create_session_config() -> SessionConfig:
     """Create a default session configuration."""
     session_config = SessionConfig()
-    logging_mgr.log_action('Created default session configuration.')
+    logger.info('Created default session configuration.')
     return session_config
 
 def create_session_config_from_dict(config_dict: SessionConfigDict) -> SessionConfig:
     """Create a session configuration from a dictionary."""
     session_config = SessionConfig()
     session_config.from_dict(config_dict)
-    logging_mgr.log_action('Created session configuration from dictionary.')
+    logger.info('Created session configuration from dictionary.')
     return session_config
 
 def create_session_config_from_file(file_path: str) -> SessionConfig:
     """Create a session configuration from a file."""
     config_dict = utils.load_json_file(file_path)
     session_config = create_session_config_from_dict(config_dict)
-    logging_mgr.log_action(f'Created session configuration from file "{file_path}".')
+    logger.info(f'Created session configuration from file "{file_path}".')
     return session_config
@@ -0,0 +1,94 @@
+import json, os
+from datetime import datetime
+
+import logging_mgr, utils
+from session_config import SessionConfig
+from type_defs import StrDict
+
+logger = logging_mgr.get_logger(__name__)
+
+# Name of the journal file, stored in the session output directory
+journal_file_name: str = 'session_journal.json'
+
+class SessionJournal:
+    """
+    Crash-safe journal of a capture session, stored as "session_journal.json" in the output directory.
+
+    The journal records everything needed to resume an interrupted session: the session
+    configuration, the random seed, the number of frames and the last committed frame
+    (the last frame whose images and metadata are all written). It is replaced atomically
+    on every save, so it is always either the previous or the new version, never a partial one.
+    """
+    def __init__(self, output_dir: str, journal: StrDict):
+        """Initialize the journal of the session stored in the given output directory."""
+        self._output_dir = output_dir
+        self._journal = journal
+
+    @property
+    def output_dir(self) -> str:
+        """Get the output directory of the session."""
+        return self._output_dir
+
+    @property
+    def session_config(self) -> StrDict:
+        """Get the session configuration, as a dictionary."""
+        return self._journal['session_config']
+
+    @property
+    def random_seed(self) -> int:
+        """Get the random seed used by the session."""
+        return self._journal['random_seed']
+
+    @property
+    def num_frames(self) -> int:
+        """Get the total number of frames of the session."""
+        return self._journal['num_frames']
+
+    @property
+    def last_committed_frame(self) -> int:
+        """Get the number of the last frame fully written (-1 if none)."""
+        return self._journal['last_committed_frame']
+
+    @property
+    def is_completed(self) -> bool:
+        """Get whether every frame of the session has been captured."""
+        return self._journal['completed']
+
+    def update_progress(self, last_committed_frame: int, completed: bool = False) -> None:
+        """Record the last committed frame (and whether the session is completed) and save the journal."""
+        self._journal['last_committed_frame'] = last_committed_frame
+        self._journal['completed'] = completed
+        self.save()
+
+    def save(self) -> None:
+        """Atomically replace the journal file with the current journal."""
+        self._journal['updated'] = datetime.now().isoformat(timespec='seconds')
+        journal_path = utils.join_paths(self._output_dir, journal_file_name)
+        temp_path = journal_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self._journal, file, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, journal_path)
+
+def create_session_journal(output_dir: str, session: SessionConfig, random_seed: int, num_frames: int) -> SessionJournal:
+    """Create and save the journal of a new capture session."""
+    journal = SessionJournal(output_dir, {
+        'session_config': session.to_dict(),
+        'random_seed': random_seed,
+        'num_frames': num_frames,
+        'last_committed_frame': -1,
+        'completed': False
+    })
+    journal.save()
+    logger.info(f'Session journal created in "{output_dir}".')
+    return journal
+
+def load_session_journal(output_dir: str) -> SessionJournal:
+    """Load the journal of the capture session stored in the given output directory."""
+    journal_path = utils.join_paths(output_dir, journal_file_name)
+    if not os.path.isfile(journal_path):
+        raise ValueError(f'No session journal found in "{output_dir}", the session cannot be resumed.')
+    journal = SessionJournal(output_dir, utils.load_json_file(journal_path))
+    logger.info(f'Session journal loaded, last committed frame {journal.last_committed_frame} of {journal.num_frames}.')
+    return journal
@@ -0,0 +1,243 @@
+import copy, itertools, json, math, random
+
+import logging_mgr, utils
+from camera_sensor_config import CameraSensorConfig
+from session_config import SessionConfig
+from typing import Any, Callable, Dict, List, Tuple
+from type_defs import StrDict
+
+logger = logging_mgr.get_logger(__name__)
+
+# Name of the expanded sweep plan file, stored in the batch output directory
+sweep_plan_file_name: str = 'sweep_plan.json'
+
+def _set_map(config_dict: StrDict, map_name: str) -> None:
+    config_dict['map'] = map_name
+
+def _set_weather(config_dict: StrDict, weather: str) -> None:
+    config_dict['weather'] = weather
+
+def _set_time(config_dict: StrDict, time: str) -> None:
+    config_dict['time'] = time
+
+def _set_num_ai_traffic_vehicles(config_dict: StrDict, num: int) -> None:
+    config_dict['num_ai_traffic_vehicles'] = num
+
+def _set_vehicle_model(config_dict: StrDict, model: str) -> None:
+    config_dict['vehicle']['model'] = model
+
+def _set_starting_waypoint(config_dict: StrDict, waypoint: str) -> None:
+    config_dict['starting_waypoint'] = waypoint
+
+def _set_camera_rig(config_dict: StrDict, camera_rig: List[StrDict]) -> None:
+    # Camera fields missing from the rig take their default values
+    default_camera_dict = CameraSensorConfig().to_dict()
+    config_dict['cameras'] = [dict(default_camera_dict, **camera_dict) for camera_dict in camera_rig]
+
+# Parameters that can be swept, with the function setting each value in a session configuration dictionary
+sweep_parameters: Dict[str, Callable[[StrDict, Any], None]] = {
+    'map': _set_map,
+    'weather': _set_weather,
+    'time': _set_time,
+    'num_ai_traffic_vehicles': _set_num_ai_traffic_vehicles,
+    'vehicle_model': _set_vehicle_model,
+    'starting_waypoint': _set_starting_waypoint,
+    'camera_rig': _set_camera_rig
+}
+
+class SessionSweep:
+    """
+    Parameter sweep of capture sessions, expanded into concrete session configurations.
+
+    Every session starts from the base session configuration (missing fields take their default values),
+    and each swept parameter ("sweep_parameters") takes one of its values. The expansion is either
+    'cartesian' (every combination of values) or 'sampled' (a number of distinct combinations drawn at random).
+    """
+    def __init__(self,
+                 name: str,
+                 base_config: StrDict,
+                 parameter_values: Dict[str, List[Any]],
+                 expansion: str = 'cartesian',
+                 num_samples: int = 0,
+                 random_seed: int = 0):
+        """Initialize a sweep, raising ValueError if a parameter, its values or the expansion are invalid."""
+        for parameter, values in parameter_values.items():
+            if parameter not in sweep_parameters:
+                raise ValueError(f'Unknown sweep parameter "{parameter}", expected one of {list(sweep_parameters)}.')
+            if not values:
+                raise ValueError(f'Sweep parameter "{parameter}" has no values.')
+        if expansion not in ('cartesian', 'sampled'):
+            raise ValueError(f'Unknown sweep expansion "{expansion}", expected "cartesian" or "sampled".')
+        if expansion == 'sampled' and num_samples <= 0:
+            raise ValueError('Sampled sweeps need a positive number of samples.')
+        self.name = name
+        self.base_config = base_config
+        self.parameter_values = parameter_values
+        self.expansion = expansion
+        self.num_samples = num_samples
+        self.random_seed = random_seed
+
+    @property
+    def num_combinations(self) -> int:
+        """Get the number of combinations of the parameter values."""
+        return math.prod(len(values) for values in self.parameter_values.values())
+
+    def get_combinations(self) -> List[StrDict]:
+        """Return the combinations of parameter values of the sweep, as dictionaries of parameter values."""
+        parameters = list(self.parameter_values)
+        if self.expansion == 'cartesian':
+            return [dict(zip(parameters, values)) for values in itertools.product(*self.parameter_values.values())]
+        # Draw distinct combination indices, without building every combination
+        rng = random.Random(self.random_seed)
+        indices = rng.sample(range(self.num_combinations), min(self.num_samples, self.num_combinations))
+        return [self._get_combination(index) for index in indices]
+
+    def expand(self) -> List[Tuple[str, SessionConfig]]:
+        """
+        Expand the sweep into validated session configurations, as (name, session configuration) pairs.
+
+        Combinations leading to the same configuration are kept once. Sessions are ordered so that the
+        ones sharing a map and vehicle model run one after another, keeping the map loaded between them
+        (see "order_sessions"). Every configuration is validated, and a ValueError lists all invalid ones.
+        """
+        combinations = self.get_combinations()
+        sessions = []
+        seen_configs = set()
+        errors = []
+        for combination in combinations:
+            config_dict = copy.deepcopy(self.base_config)
+            for parameter, value in combination.items():
+                sweep_parameters[parameter](config_dict, value)
+            try:
+                session = SessionConfig()
+                session.from_dict(config_dict)
+                session.validate()
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append(f'{_describe_combination(combination)}: {e}')
+                continue
+            # Compare the configurations as loaded (e.g. vectors as tuples), to find duplicates written differently
+            config_key = json.dumps(session.to_dict(), sort_keys=True)
+            if config_key not in seen_configs:
+                seen_configs.add(config_key)
+                sessions.append(session)
+        if errors:
+            raise ValueError(f'Sweep "{self.name}" has {len(errors)} invalid session configurations:\n' + '\n'.join(errors))
+        logger.info(f'Sweep "{self.name}" expanded into {len(sessions)} sessions ({self.expansion} expansion of '
+                    f'{self.num_combinations} combinations, {len(combinations) - len(sessions)} duplicates removed).')
+        sessions = order_sessions(sessions)
+        return [(f'{self.name}_{session_num:04d}', session) for session_num, session in enumerate(sessions)]
+
+    def _get_combination(self, index: int) -> StrDict:
+        """Return the combination of parameter values with the given index in the cartesian product order."""
+        combination = {}
+        for parameter, values in reversed(self.parameter_values.items()):
+            index, value_index = divmod(index, len(values))
+            combination[parameter] = values[value_index]
+        return {parameter: combination[parameter] for parameter in self.parameter_values}
+
+def _describe_combination(combination: StrDict) -> str:
+    """Return a short description of a combination of parameter values, for error messages."""
+    return ', '.join(f'{parameter}={value if parameter != "camera_rig" else f"<{len(value)} cameras>"}'
+                     for parameter, value in combination.items())
+
+def order_sessions(sessions: List[SessionConfig]) -> List[SessionConfig]:
+    """
+    Order the sessions so that the ones sharing a map and vehicle model run one after another.
+
+    Groups keep the order in which their first session appears, and so do the sessions of each group.
+    Consecutive sessions on the same map keep it loaded (see "scenario_mgr.set_up_session_scenario").
+    """
+    groups: Dict[Tuple[str, str], List[SessionConfig]] = {}
+    for session in sessions:
+        groups.setdefault((session.map, session.vehicle.model), []).append(session)
+    # Groups of the same map are also kept together, in the order of their first session
+    map_order = {}
+    for session_map, _ in groups:
+        map_order.setdefault(session_map, len(map_order))
+    ordered_groups = sorted(groups.items(), key=lambda group: map_order[group[0][0]])
+    return [session for _, group in ordered_groups for session in group]
+
+def expand_parameter_values(parameter: str, values: Any) -> List[Any]:
+    """
+    Return the list of distinct values of a sweep parameter.
+
+    Values can be a list, a single value, or a range given as a dictionary with "start", "stop" (included)
+    and "step" (in seconds for times of day, e.g. {"start": "06:00:00", "stop": "18:00:00", "step": 3600}).
+    Camera rigs are lists of camera configurations, so their values must always be a list of rigs.
+    """
+    if isinstance(values, dict):
+        try:
+            start, stop, step = values['start'], values['stop'], values['step']
+        except KeyError as e:
+            raise ValueError(f'Sweep parameter "{parameter}" range is missing {e}.')
+        if step <= 0:
+            raise ValueError(f'Sweep parameter "{parameter}" range step must be a positive number.')
+        if parameter == 'time':
+            start_s, stop_s = (_hhmmss_to_seconds(time) for time in (start, stop))
+            return [_seconds_to_hhmmss(seconds) for seconds in range(start_s, stop_s + 1, int(step))]
+        if not all(isinstance(value, int) for value in (start, stop, step)):
+            raise ValueError(f'Sweep parameter "{parameter}" range must be given in integers.')
+        return list(range(start, stop + 1, step))
+    if parameter == 'camera_rig':
+        if not isinstance(values, list) or not all(isinstance(rig, list) for rig in values):
+            raise ValueError('Sweep parameter "camera_rig" must be a list of camera rigs (lists of camera configurations).')
+    elif not isinstance(values, list):
+        return [values]
+    # Repeated values would only lead to duplicate sessions
+    distinct_values = {}
+    for value in values:
+        distinct_values.setdefault(json.dumps(value, sort_keys=True), value)
+    return list(distinct_values.values())
+
+def _hhmmss_to_seconds(time: str) -> int:
+    """Convert a HH:mm:ss time of day to seconds since midnight."""
+    if not utils.is_hhmmss_time_string(time):
+        raise ValueError(f'Invalid time of day "{time}", must be in HH:mm:ss format.')
+    hours, minutes, seconds = map(int, time.split(':'))
+    return hours * 3600 + minutes * 60 + seconds
+
+def _seconds_to_hhmmss(seconds: int) -> str:
+    """Convert seconds since midnight to a HH:mm:ss time of day."""
+    seconds %= 86400
+    return f'{seconds // 3600:02}:{seconds % 3600 // 60:02}:{seconds % 60:02}'
+
+def create_session_sweep_from_dict(sweep_dict: StrDict, random_seed: int) -> SessionSweep:
+    """
+    Create a session sweep from a dictionary, raising ValueError if it is invalid.
+
+    The dictionary has a "name", a "base" session configuration (missing fields take their default values),
+    the swept "parameters" and their values, the "expansion" ('cartesian' or 'sampled'), and for sampled
+    sweeps the "num_samples" and an optional "seed" (the given random seed otherwise).
+    """
+    if not isinstance(sweep_dict.get('parameters'), dict):
+        raise ValueError('Sweep "parameters" must be a dictionary of parameter values.')
+    base_config = SessionConfig().to_dict()
+    base_dict = sweep_dict.get('base', {})
+    # Vehicle fields missing from the base configuration also take their default values
+    base_config.update({key: value for key, value in base_dict.items() if key != 'vehicle'})
+    base_config['vehicle'].update(base_dict.get('vehicle', {}))
+    parameter_values = {parameter: expand_parameter_values(parameter, values) for parameter, values in sweep_dict['parameters'].items()}
+    return SessionSweep(name=sweep_dict.get('name', 'sweep'),
+                        base_config=base_config,
+                        parameter_values=parameter_values,
+                        expansion=sweep_dict.get('expansion', 'cartesian'),
+                        num_samples=sweep_dict.get('num_samples', 0),
+                        random_seed=sweep_dict.get('seed', random_seed))
+
+def load_sweep_sessions(file_path: str, random_seed: int) -> List[Tuple[str, SessionConfig]]:
+    """
+    Load a sweep file and expand it into ordered, validated session configurations, as (name, session configuration) pairs.
+
+    Raises ValueError if the sweep or any of its session configurations is invalid.
+    """
+    try:
+        sweep_dict = utils.load_json_file(file_path)
+        sweep = create_session_sweep_from_dict(sweep_dict, random_seed)
+        return sweep.expand()
+    except (OSError, ValueError) as e:
+        raise ValueError(f'Session sweep file "{file_path}" error: {e}')
+
+def save_sweep_plan(batch_sessions: List[Tuple[str, SessionConfig]], output_dir: str) -> None:
+    """Save the expanded sessions of a sweep in the output directory, in the order they are run."""
+    plan = [{'session': session_name, 'config': session.to_dict()} for session_name, session in batch_sessions]
+    utils.save_json_file({'sessions': plan}, output_dir, sweep_plan_file_name)
@@ -1,6 +1,7 @@
 import os
 import utils
-from type_defs import Dict, Float3, Quat, List
+from typing import Dict, List
+from type_defs import Float3, Quat
 
 # General variables
 # - Here are defined the general variables used by the application
@@ -10,12 +11,65 @@ random_seed: int = utils.get_time() # Can be set to a specific value for reprodu
 simulation_steps_per_second: int = 60
 force_capture_freq_hz: bool = True
 min_non_force_capture_freq_hz: float = 2
-wait_for_frame_sleep_time_s: float = 0.01
+wait_for_frame_sleep_time_s: float = 0.01 # Minimum sleep between simulation time queries when the capture frequency is not forced
+frame_pacing_ratio_smoothing: float = 0.2 # Weight of each frame in the estimated sim-to-wall clock ratio used to pace non-forced captures
+frame_pacing_max_queries_per_frame: int = 4 # Time queries per frame sleeping for the predicted remaining time, then every minimum sleep
+frame_message_interval_frames: int = 10 # Frames between "Frame N captured" messages in the simulator UI (each message is a round trip)
+
+# Logging
+# - Here are defined the settings of the log file, written by a background thread
+log_level: str = 'INFO'
+log_module_levels: Dict[str, str] = {} # Log level of specific modules, e.g. {'data_capture_mgr': 'WARNING'}
+log_hot_path_quiet: bool = False # Only count the messages repeated on every frame, logging their counts when the session ends
+
+# Performance report
+# - Here are defined the settings of the time measurements of each stage of the capture loop
+perf_report_enabled: bool = True # Save the time spent in each stage of the capture loop in "perf_report.json"
+perf_trace_enabled: bool = False # Also save every timed stage in "perf_trace.json" (Chrome trace format)
+
+# Profiling
+# - Here are defined the settings of the sampling profiler, saving "profile_stacks.txt" and "profile_summary.txt"
+profile_mode: str = '' # '' (disabled), 'session' (whole program, including the GUI and simulator launch) or 'capture_loop' (capture loop of each session)
+profile_interval_s: float = 0.005 # Time between stack samples
+profile_thread_names: List[str] = ['MainThread', 'camera_'] # Prefixes of the names of the sampled threads (main thread and capture pipeline threads)
+profile_top_n: int = 30 # Functions listed in the profile summary
+
+# Capture pipeline
+# - Here are defined the settings of the poll, encode and write stages used to save camera data
+capture_queue_size: int = 32
+capture_num_encode_workers: int = max(1, (os.cpu_count() or 2) - 1)
+capture_encoder_backend: str = 'thread' # 'thread' (encode in worker threads) or 'process' (encode in worker processes)
+capture_reserved_cores: int = 2 # Cores left free for the simulator and the capture loop when encoding in processes
+capture_num_encode_processes: int = 0 # Encoder worker processes (0 = CPU cores minus "capture_reserved_cores", at least 1)
+output_sink: str = 'directory' # 'directory' (one file per image) or 'tar' (WebDataset-style tar shards)
+tar_shard_max_bytes: int = 1024 ** 3
+camera_poll_mode: str = 'sync' # 'sync' (poll every camera's latest images) or 'ad_hoc' (request a render from every camera, then collect them as they are ready)
+camera_ad_hoc_timeout_s: float = 10.0 # Maximum time to wait for the render requests of a frame in 'ad_hoc' mode
+camera_ad_hoc_check_interval_s: float = 0.001 # Time between checks of pending render requests in 'ad_hoc' mode
+
+# Frame metadata
+# - Here are defined the settings used to save the per-frame metadata
+frames_metadata_formats: List[str] = ['jsonl'] # 'jsonl' (JSON Lines, streamed) and/or 'npz' (compressed numeric columns)
+frames_metadata_fsync_interval: int = 50 # Frames between syncs of "frames_metadata.jsonl" to local storage (0 = only when closing)
+save_frames_metadata_json: bool = True # With 'jsonl', also save all frame metadata in a single "frames_metadata.json" when the session ends
+
+# Session journal
+# - Here are defined the settings used to checkpoint and resume interrupted capture sessions
+session_journal_interval_frames: int = 10 # Frames between saves of the session journal
+resume_output_dir: str = '' # Output directory of an interrupted session to resume (empty = start a new session)
+
+# Batch runs
+# - Here are defined the settings used to run capture sessions from configuration files, several of them on the same simulator
+session_config_path: str = '' # Session configuration file to run without GUI (empty = configure the session in the GUI)
+batch_session_config_paths: List[str] = [] # Session configuration files or directories to run in order (empty = single session from the GUI)
+session_sweep_path: str = '' # Parameter sweep file expanded into a batch of sessions, run after "batch_session_config_paths" (empty = no sweep)
+parallel_num_instances: int = 1 # Simulator instances running the batch in parallel, one worker process each (1 = sequential)
+parallel_port_stride: int = 1 # Port increment between instances, starting from "beamng_port"
 
 # Paths
 # - Here are defined the paths used by the application
 beamng_home_path: str = os.getenv('BNG_HOME')
-weather_presets_path: str = os.path.join(beamng_home_path, 'gameengine.zip/art/weather/defaults.json')
+weather_presets_path: str = '' # Weather presets file (empty = "gameengine.zip/art/weather/defaults.json" in "beamng_home_path")
 output_root_path: str = utils.return_documents_path()
 
 # Sessions
@@ -28,6 +82,11 @@ default_capture_freq_hz: float = 5
 default_weather: str = 'clear'
 default_num_ai_traffic_vehicles: int = 20
 
+# Scenario cache
+# - Here are defined the settings used to reuse the scenario files made by previous sessions
+scenario_cache_enabled: bool = True # Skip making the scenario files when the map, scenario name and "ego" vehicle are unchanged
+scenario_cache_path: str = '' # Scenario cache file (empty = "scenario_cache.json" in the "BeamNG-Data-Capture" folder of the output root path)
+
 # Time
 # - Here are defined the time settings used by the application
 night_time_start: str = '17:30:00'
@@ -36,6 +95,7 @@ play_time: bool = True
 day_scale: float = 1.0
 night_scale: float = 1.0
 day_length_s: float = 600
+time_of_day_resync_interval_s: float = 30 # Simulation seconds between time of day queries to the simulator, predicted locally in between (0 = query every frame)
 time_of_day_start: str = '12:00:00'
 
 # Vehicles
@@ -87,6 +147,19 @@ default_camera_direction: Float3 = (0, -1, 0)
 default_camera_up_vector: Float3 = (0, 0, 1)
 default_camera_fov_y: int = 70
 default_camera_near_far_planes: tuple = (0.1, 1000.0)
+default_camera_use_shared_memory: bool = False # Receive camera images through shared memory (simulator on the same machine only)
+# Output format used for each image type, see "image_encoding.py" for the available formats
+default_camera_output_formats: Dict[str, str] = {
+    'colour': 'png',
+    'annotation': 'png',
+    'depth': 'png'
+    }
+# Default encoder options for each output format (can be overridden per camera)
+default_output_format_options: Dict[str, dict] = {
+    'png': {'compress_level': 6},
+    'jpeg': {'quality': 90},
+    'webp': {'quality': 90, 'method': 0}
+    }
 
 # IMU
 # - Here are defined the IMU settings used by the application
@@ -1,18 +1,22 @@
 from beamngpy import BeamNGpy
 from beamngpy.scenario import Scenario
-from type_defs import StrDict, Time
+from typing import Dict
+from type_defs import Int3, StrDict, Time
 
 import logging_mgr, settings
 
+logger = logging_mgr.get_logger(__name__)
+
 # Global variable to store the simulation steps per second
 simulation_steps_per_second: int = 0
 
-def launch_beamng() -> BeamNGpy:
+def launch_beamng(port: int | None = None) -> BeamNGpy:
     """
     Instantiate and launch BeamNGpy instance.
-    Uses the host, port and home path defined in settings.py.
+    Uses the host, port and home path defined in settings.py, unless another port is given.
+    Connects to an instance already running on the port if there is one.
     """
-    bng = BeamNGpy(settings.beamng_host, settings.beamng_port, settings.beamng_home_path)
+    bng = BeamNGpy(settings.beamng_host, port if port is not None else settings.beamng_port, settings.beamng_home_path)
     bng.open()
     return bng
 
@@ -33,13 +37,13 @@ def step_simulation_steps(bng: BeamNGpy, steps: int) -> None:
     if (steps > 0):
         bng.step(steps)
     else:
-        logging_mgr.log_warning(f'Requested steps ignored, value must be higher than zero. Value requested: {steps}.')
+        logger.warning(f'Requested steps ignored, value must be higher than zero. Value requested: {steps}.')
 
 def step_simulation_seconds(bng: BeamNGpy, seconds: int) -> None:
     """Advance the simulation the corresponding number of steps for the given number of seconds."""
     steps = int(seconds * simulation_steps_per_second)
     step_simulation_steps(bng, steps)
-    logging_mgr.log_action(f'Simulation advanced by {seconds} seconds.')
+    logging_mgr.log_frame_action(logger, f'Simulation advanced by {seconds} seconds.')
 
 def set_deterministic_steps_per_second(bng: BeamNGpy, steps_per_second: int) -> None:
     """Set deterministic mode and simulation steps per second."""
@@ -59,12 +63,12 @@ def start_scenario(bng: BeamNGpy) -> None:
 def enable_traffic(bng: BeamNGpy, max_traffic_amount: int) -> None:
     """Enable or disable AI traffic in the scenario."""
     bng.traffic.spawn(max_amount=max_traffic_amount)
-    logging_mgr.log_action(f'Enabling AI traffic with a maximum of {max_traffic_amount} vehicles.')
+    logger.info(f'Enabling AI traffic with a maximum of {max_traffic_amount} vehicles.')
 
 def get_time_of_day(bng: BeamNGpy) -> StrDict:
     """Get the current time of day in the simulator."""
     tod = bng.env.get_tod()
-    logging_mgr.log_action(f'Simulation time of day retrieved: {tod["time"]}')
+    logging_mgr.log_frame_action(logger, f'Simulation time of day retrieved: {tod["time"]}')
     return tod
 
 def set_time_of_day(bng: BeamNGpy,
@@ -81,17 +85,23 @@ def set_time_of_day(bng: BeamNGpy,
                     day_length=day_length)
     # Log any changes made (values that are not None)
     if time_of_day:
-        logging_mgr.log_action(f'Set simulation time of day to {time_of_day}.')
+        logger.info(f'Set simulation time of day to {time_of_day}.')
     if type(play) == bool:
-        logging_mgr.log_action(f'Set time of day "play" to {play}.')
+        logger.info(f'Set time of day "play" to {play}.')
     if day_scale:
-        logging_mgr.log_action(f'Set time of day "day scale" to {day_scale}.')
+        logger.info(f'Set time of day "day scale" to {day_scale}.')
     if night_scale:
-        logging_mgr.log_action(f'Set time of day "night scale" to {night_scale}.')
+        logger.info(f'Set time of day "night scale" to {night_scale}.')
     if day_length:
-        logging_mgr.log_action(f'Set time of day "day length" to {day_length} seconds.')
+        logger.info(f'Set time of day "day length" to {day_length} seconds.')
+
+def get_annotation_colours(bng: BeamNGpy) -> Dict[str, Int3]:
+    """Get the annotation configuration of the simulator (class name to RGB colour)."""
+    annotations = bng.camera.get_annotations()
+    logger.info(f'Simulation annotation configuration retrieved: {len(annotations)} classes.')
+    return annotations
 
 def display_message(bng: BeamNGpy, message: str) -> None:
     """Display a message on the simulator's UI."""
     bng.ui.display_message(message)
-    logging_mgr.log_action(message)
+    logger.info(message)
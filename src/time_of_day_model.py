@@ -0,0 +1,120 @@
+import logging_mgr, utils
+from typing import List
+
+logger = logging_mgr.get_logger(__name__)
+
+# Times of day (0.0 is 12:00:00) between which the simulator advances time by the night scale (18:00:00 to 06:00:00),
+# fixed by the simulator and independent of the night time used to switch headlights
+simulator_night_start: float = 0.25
+simulator_night_end: float = 0.75
+
+class TimeOfDayModel:
+    """
+    Local model of the simulator time of day, predicted from the simulation time.
+
+    The simulator advances the time of day (0.0 to 1.0, where 0.0 is 12:00:00) by the elapsed simulation
+    time divided by the day length, scaled by the day scale during the day and by the night scale during
+    its fixed night ("simulator_night_start" to "simulator_night_end"). The model is anchored to the time
+    of day queried from the simulator ("resync") and predicts it from there, so the simulator only needs
+    to be queried every few simulation seconds.
+    Night time, used to switch headlights, is the range between the night start and end times.
+    """
+    def __init__(self,
+                 night_time_start: float,
+                 night_time_end: float,
+                 play: bool,
+                 day_scale: float,
+                 night_scale: float,
+                 day_length_s: float,
+                 resync_interval_s: float):
+        """Initialize the time of day model, which must be resynced before predicting any time."""
+        if day_length_s <= 0:
+            raise ValueError('Day length must be a positive number.')
+        self._night_time_start = night_time_start
+        self._night_time_end = night_time_end
+        self._play = play
+        self._day_scale = day_scale
+        self._night_scale = night_scale
+        self._day_length_s = day_length_s
+        self._resync_interval_s = resync_interval_s
+        # Time of day and simulation time of the last resync (None until the first one)
+        self._anchor_time_of_day: float | None = None
+        self._anchor_simulation_time_s: float | None = None
+
+    def is_night_time(self, time_of_day: float) -> bool:
+        """Check if the given time of day is night time."""
+        if self._night_time_start <= self._night_time_end:
+            return self._night_time_start <= time_of_day < self._night_time_end
+        # Night range wrapping around 12:00:00
+        return time_of_day >= self._night_time_start or time_of_day < self._night_time_end
+
+    def needs_resync(self, simulation_time_s: float) -> bool:
+        """Check if the time of day must be queried from the simulator at the given simulation time."""
+        if self._anchor_simulation_time_s is None:
+            return True
+        return simulation_time_s - self._anchor_simulation_time_s >= self._resync_interval_s
+
+    def resync(self, time_of_day: float, simulation_time_s: float) -> None:
+        """Anchor the model to the time of day queried from the simulator at the given simulation time."""
+        if self._anchor_simulation_time_s is not None:
+            # Signed difference between the simulator and the prediction, on the [0,1) circle
+            drift = (time_of_day - self.predict(simulation_time_s) + 0.5) % 1.0 - 0.5
+            logger.info(f'Time of day model resynced at {simulation_time_s:.3f} s, drift {drift * 86400:.1f} in-game seconds.')
+        self._anchor_time_of_day = time_of_day
+        self._anchor_simulation_time_s = simulation_time_s
+
+    def predict(self, simulation_time_s: float) -> float:
+        """Predict the time of day at the given simulation time."""
+        if self._anchor_simulation_time_s is None:
+            raise RuntimeError('Time of day model used before being resynced with the simulator.')
+        return self._advance(self._anchor_time_of_day, simulation_time_s - self._anchor_simulation_time_s)
+
+    def predict_headlight_toggle_frames(self,
+                                        first_frame_simulation_time_s: float,
+                                        frame_period_s: float,
+                                        start_frame: int,
+                                        num_frames: int) -> List[int]:
+        """
+        Predict the frames where the headlights must be switched, for frames captured at a fixed period.
+
+        The first frame is included if it is night time, as headlights start switched off.
+        """
+        toggle_frames = []
+        headlights_on = False
+        for frame_num in range(start_frame, num_frames):
+            simulation_time_s = first_frame_simulation_time_s + (frame_num - start_frame) * frame_period_s
+            if self.is_night_time(self.predict(simulation_time_s)) != headlights_on:
+                headlights_on = not headlights_on
+                toggle_frames.append(frame_num)
+        return toggle_frames
+
+    def _advance(self, time_of_day: float, elapsed_s: float) -> float:
+        """Return the time of day reached after the given simulation time, crossing day and night as needed."""
+        if not self._play:
+            return time_of_day
+        while elapsed_s > 0:
+            # The scale follows the fixed night of the simulator, not the headlight night time
+            is_night_time = simulator_night_start <= time_of_day < simulator_night_end
+            rate = (self._night_scale if is_night_time else self._day_scale) / self._day_length_s
+            # Time stops in a period with a zero scale
+            if rate <= 0:
+                return time_of_day
+            # Time of day left until the next switch between day and night
+            boundary = simulator_night_end if is_night_time else simulator_night_start
+            time_to_boundary = (boundary - time_of_day) % 1.0 or 1.0
+            if time_to_boundary / rate > elapsed_s:
+                return (time_of_day + elapsed_s * rate) % 1.0
+            elapsed_s -= time_to_boundary / rate
+            time_of_day = boundary
+        return time_of_day
+
+def create_time_of_day_model() -> TimeOfDayModel:
+    """Create the time of day model of a capture session from the settings."""
+    import settings
+    return TimeOfDayModel(utils.hhmmss_to_beamng_time(settings.night_time_start),
+                          utils.hhmmss_to_beamng_time(settings.night_time_end),
+                          settings.play_time,
+                          settings.day_scale,
+                          settings.night_scale,
+                          settings.day_length_s,
+                          settings.time_of_day_resync_interval_s)
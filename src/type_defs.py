@@ -1,2 +1,10 @@
-from typing import Any, Callable, Dict, List, Optional, Tuple, TypedDict
-from beamngpy.types import Float3, Quat, Int2, StrDict, Time
+from typing import Any, Dict, Tuple, Union
+
+# Same types as "beamngpy.types", defined here as importing it loads the whole BeamNGpy package
+StrDict = Dict[str, Any]
+Float2 = Tuple[float, float]
+Float3 = Tuple[float, float, float]
+Quat = Tuple[float, float, float, float]
+Int2 = Tuple[int, int]
+Int3 = Tuple[int, int, int]
+Time = Union[float, str]
@@ -1,9 +1,11 @@
-import json, math, os, random, re, zipfile
+import json, math, os, random, re, sys, zipfile
 from datetime import datetime
-from scipy.spatial.transform import Rotation as R
 
-import logging_mgr
-from type_defs import Float3, List, Quat
+import logging_mgr, rotation
+from typing import Callable, List
+from type_defs import Float3, Quat
+
+logger = logging_mgr.get_logger(__name__)
 
 # --- Time/Date Utilities ---
 def get_time() -> int:
@@ -21,8 +23,8 @@ def beamng_time_to_hhmmss(time: float) -> str:
     Convert BeamNG time [0,1] to HH:mm:ss format.
     Note: Both 0 and 1 in BeamNG time are 12:00:00.
     """
-    # Convert BeamNG time to seconds (1 day = 86400 seconds)
-    seconds = time * 86400
+    # Convert BeamNG time to whole seconds (1 day = 86400 seconds)
+    seconds = round(time * 86400)
     # Adjust the time to start at 00:00:00
     seconds += 43200
     # If the time is greater than 24 hours, subtract 24 hours
@@ -41,7 +43,7 @@ def hhmmss_to_beamng_time(time: str) -> float:
     """
     return_time = 0.0
     if not is_hhmmss_time_string(time):
-        logging_mgr.log_error('Invalid time format. Must be in HH:mm:ss format.')
+        logger.error('Invalid time format. Must be in HH:mm:ss format.')
         raise ValueError('Invalid time format. Must be in HH:mm:ss format.')
     else:
         hours, minutes, seconds = map(int, time.split(':'))
@@ -68,7 +70,7 @@ def create_dir(path: str, name: str) -> str:
     """
     dir_path = os.path.join(path, name)
     os.makedirs(dir_path, exist_ok=True)
-    logging_mgr.log_action(f'Directory created at "{dir_path}".')
+    logger.info(f'Directory created at "{dir_path}".')
     return dir_path
 
 def create_output_dir(root_dir: str) -> str:
@@ -86,14 +88,12 @@ def create_frame_output_dir(output_dir: str, i: int) -> str:
 # --- Math Utilities ---
 def euler_to_quaternion(rpy: Float3, degrees: bool = True) -> Quat:
     """Convert Euler angles to a quaternion (qx, qy, qz, qw). Assumes input is in degrees unless degrees=False."""
-    r = R.from_euler('xyz', rpy, degrees=degrees)
-    qx, qy, qz, qw = r.as_quat()
+    qx, qy, qz, qw = rotation.euler_to_quaternions(rpy, degrees=degrees).tolist()
     return (qx, qy, qz, qw)
 
 def quaternion_to_euler(quat: Quat, degrees: bool = True) -> Float3:
     """Convert a quaternion (qx, qy, qz, qw) to Euler angles (roll, pitch, yaw). Returns angles in degrees unless degrees=False."""
-    r = R.from_quat(quat)
-    roll, pitch, yaw = r.as_euler('xyz', degrees=degrees)
+    roll, pitch, yaw = rotation.quaternions_to_euler(quat, degrees=degrees).tolist()
     return (roll, pitch, yaw)
 
 def is_finite(x: float | int) -> bool:
@@ -110,7 +110,7 @@ def are_finite(values: list[float] | tuple[float, ...]) -> bool:
 def set_random_seed(seed: int) -> None:
     """Set the random seed for reproducibility."""
     random.seed(seed)
-    logging_mgr.log_action(f'Random seed set to {seed}.')
+    logger.info(f'Random seed set to {seed}.')
 
 def get_random_float(min_value: float, max_value: float) -> float:
     """Generate a random float between the specified minimum and maximum values."""
@@ -126,9 +126,9 @@ def accept_string_args(*args) -> List[str]:
     accepted_args: List[str] = []
     for arg in args:
         if not isinstance(arg, str):
-            logging_mgr.log_warning(f'Argument is not a string: "{arg}".')
+            logger.warning(f'Argument is not a string: "{arg}".')
         elif not arg:
-            logging_mgr.log_warning(f'Empty string argument detected.')
+            logger.warning('Empty string argument detected.')
         else:
             accepted_args.append(arg)
     return accepted_args
@@ -138,18 +138,18 @@ def combine_dict(metadata_array: List[dict]) -> dict:
     combined_metadata = {}
     for metadata in metadata_array:
         combined_metadata.update(metadata)
-    logging_mgr.log_action(f'Dictionary array combined with keys: {list(combined_metadata.keys())}.')
+    logger.info(f'Dictionary array combined with keys: {list(combined_metadata.keys())}.')
     return combined_metadata
 
 def create_parent_dict(keys: List[str], values: List[dict]) -> dict:
     """Create a dictionary with the provided strings as keys and dictionaries as values."""
     output_dict = dict()
     if len(keys) != len(values):
-        logging_mgr.log_error('Could not create parent dictionary: keys and values lists must have the same length.')
+        logger.error('Could not create parent dictionary: keys and values lists must have the same length.')
         raise ValueError('Could not create parent dictionary: keys and values lists must have the same length.')
     else:
         output_dict = dict(zip(keys, values))
-        logging_mgr.log_action(f'Dictionary created with keys: {list(output_dict.keys())}.')
+        logger.info(f'Dictionary created with keys: {list(output_dict.keys())}.')
     return output_dict
 
 def create_child_dict(parent_dict:dict, key: str) -> dict:
@@ -157,9 +157,9 @@ def create_child_dict(parent_dict:dict, key: str) -> dict:
     child_dict = parent_dict.get(key, dict())
     # If the key does not exist, log a warning
     if not child_dict:
-        logging_mgr.log_warning(f'Child dictionary not found with key "{key}".')
+        logger.warning(f'Child dictionary not found with key "{key}".')
     else:
-        logging_mgr.log_action(f'Child dictionary created with key "{key}".')
+        logger.info(f'Child dictionary created with key "{key}".')
     return child_dict
 
 def str_to_tuple(s: str, type_cast, expected_len: int, sep: str = ",") -> tuple:
@@ -173,12 +173,17 @@ def tuple_to_str(t: tuple, fmt: str = "{:.1f}", sep: str = ", ") -> str:
     """Format a tuple as a comma-separated string with the given format for each element."""
     return sep.join(fmt.format(x) for x in t)
 
-# --- JSON/ZIP Utilities ---
+# --- JSON/ZIP/Binary File Utilities ---
 def save_json_file(data: dict, output_dir: str, filename: str) -> None:
     """Save the provided data as a JSON file in the output directory."""
     with open(os.path.join(output_dir, filename), 'w') as file:
         json.dump(data, file, indent=4)
-    logging_mgr.log_action(f'JSON file "{filename}" saved in "{output_dir}".')
+    logger.info(f'JSON file "{filename}" saved in "{output_dir}".')
+
+def save_bytes_file(data: bytes, output_dir: str, filename: str) -> None:
+    """Save the provided binary data as a file in the output directory."""
+    with open(os.path.join(output_dir, filename), 'wb') as file:
+        file.write(data)
 
 def is_path_inside_zip(path: str) -> bool:
     """Check if the provided path is contained within a ZIP file."""
@@ -204,20 +209,20 @@ def load_json_file(file_path: str) -> dict:
         # Load a JSON file from the provided path into an output dictionary
         with open(file_path, 'r') as file:
             data = json.load(file)
-            logging_mgr.log_action(f'JSON file "{file_path}" loaded.')
+            logger.info(f'JSON file "{file_path}" loaded.')
     return data
 
 def open_zip_file(file_path: str) -> zipfile.ZipFile:
     """Open the provided ZIP file and return the ZipFile object."""
     zip_file = zipfile.ZipFile(file_path, 'r')
-    logging_mgr.log_action(f'ZIP file "{file_path}" opened.')
+    logger.info(f'ZIP file "{file_path}" opened.')
     return zip_file
 
 def read_file_inside_zip(zip_file: zipfile.ZipFile, file_path: str) -> str:
     """Read the provided file inside the ZIP file and return its contents as bytes."""
     with zip_file.open(file_path) as file:
         data = file.read()
-    logging_mgr.log_action(f'File "{file_path}" read inside ZIP file.')
+    logger.info(f'File "{file_path}" read inside ZIP file.')
     return data
 
 def read_json_file_inside_zip(zip_file: zipfile.ZipFile, file_path: str) -> dict:
@@ -225,15 +230,30 @@ def read_json_file_inside_zip(zip_file: zipfile.ZipFile, file_path: str) -> dict
     data = read_file_inside_zip(zip_file, file_path)
     # Decode the data into a dictionary
     dictionary = json.loads(data.decode('utf-8'))
-    logging_mgr.log_action(f'JSON file "{file_path}" read inside ZIP file.')
+    logger.info(f'JSON file "{file_path}" read inside ZIP file.')
     return dictionary
 
 # --- Logging/GUI Helpers ---
+# Function showing error messages to the user, set when the GUI is used (None = write them to stderr)
+_show_error_message: Callable[[str], None] | None = None
+
+def set_error_message_display(show_error_message: Callable[[str], None] | None) -> None:
+    """Set the function showing error messages to the user (None to write them to stderr)."""
+    global _show_error_message
+    _show_error_message = show_error_message
+
 def log_and_show_error(message: str) -> None:
-    """Log an error and show it to the user via GUI."""
-    import gui_mgr
-    logging_mgr.log_error(message)
-    gui_mgr.show_error_message(message)
+    """
+    Log an error and show it to the user via GUI.
+
+    Without GUI, the error is only written to stderr: by the console log handler once logging is set up,
+    or directly otherwise.
+    """
+    logger.error(message)
+    if _show_error_message is not None:
+        _show_error_message(message)
+    elif not logging_mgr.log_file:
+        print(f'Error: {message}', file=sys.stderr)
 
 # --- Settings Utilities ---
 def get_supported_vehicle_models() -> List[str]:
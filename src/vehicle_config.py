@@ -1,5 +1,8 @@
 import logging_mgr, utils
-from type_defs import Float3, Quat, TypedDict
+from typing import TypedDict
+from type_defs import Float3, Quat
+
+logger = logging_mgr.get_logger(__name__)
 
 class VehicleConfigDict(TypedDict):
     name: str
@@ -59,7 +62,7 @@ class VehicleConfig:
 
         if not model or model not in settings.supported_models:
             if settings.default_vehicle_model in settings.supported_models:
-                logging_mgr.log_warning(f'Vehicle model "{model}" is not supported. Using default vehicle model "{settings.default_vehicle_model}".')
+                logger.warning(f'Vehicle model "{model}" is not supported. Using default vehicle model "{settings.default_vehicle_model}".')
                 model = settings.default_vehicle_model
             else:
                 raise ValueError(f'Default vehicle model "{settings.default_vehicle_model}" is not supported.')
@@ -98,8 +101,9 @@ class VehicleConfig:
         """Load a vehicle configuration from a dictionary."""
         self._name = config_dict['name']
         self._model = config_dict['model']
-        self._initial_position = config_dict['initial_position']
-        self._initial_rotation = config_dict['initial_rotation']
+        # JSON files store vectors as lists, convert them back to tuples
+        self._initial_position = tuple(config_dict['initial_position'])
+        self._initial_rotation = tuple(config_dict['initial_rotation'])
 
     def validate(self):
         """
@@ -1,8 +1,10 @@
-from beamngpy import Scenario, Vehicle
+from beamngpy import BeamNGpy, Scenario, Vehicle
 from type_defs import Float3, Quat
 
 import logging_mgr, utils
 
+logger = logging_mgr.get_logger(__name__)
+
 def randomize_vehicle_color(vehicle: Vehicle) -> None:
     """Sets the color of the vehicle to a random RGBA color."""
     vehicle.set_color((utils.get_random_float(0, 1),
@@ -18,21 +20,42 @@ def add_vehicle(scenario: Scenario,
     """Add a vehicle to the scenario with the provided name, model, position and rotation."""
     # Create a vehicle with the provided name and model
     vehicle = Vehicle(vehicle_name, model=model)
-    logging_mgr.log_action(f'Vehicle created: "{vehicle_name}" (model "{model}").')
+    logger.info(f'Vehicle created: "{vehicle_name}" (model "{model}").')
     # Add the vehicle to the scenario, with the specified position and rotation
     scenario.add_vehicle(vehicle,
                          pos,
                          rot_quat)
-    logging_mgr.log_action(f'Vehicle {vehicle_name} added to the scenario in position {pos} with rotation {rot_quat}.')
+    logger.info(f'Vehicle {vehicle_name} added to the scenario in position {pos} with rotation {rot_quat}.')
     # Return the created vehicle
     return vehicle
 
+def spawn_vehicle(bng: BeamNGpy,
+                  vehicle_name: str,
+                  model: str,
+                  pos: Float3,
+                  rot_quat: Quat) -> Vehicle:
+    """Spawn a vehicle in the running scenario with the provided name, model, position and rotation."""
+    # Create a vehicle with the provided name and model
+    vehicle = Vehicle(vehicle_name, model=model)
+    logger.info(f'Vehicle created: "{vehicle_name}" (model "{model}").')
+    # Spawn the vehicle in the simulator and connect to it
+    bng.vehicles.spawn(vehicle,
+                       pos,
+                       rot_quat)
+    logger.info(f'Vehicle {vehicle_name} spawned in position {pos} with rotation {rot_quat}.')
+    return vehicle
+
+def despawn_vehicle(bng: BeamNGpy, vehicle: Vehicle) -> None:
+    """Remove the vehicle from the running scenario."""
+    bng.vehicles.despawn(vehicle)
+    logger.info(f'Vehicle {vehicle.vid} despawned.')
+
 def teleport_vehicle(vehicle: Vehicle,
                      pos: Float3,
                      rot_quat: Quat) -> None:
     """Teleport the vehicle to the provided position and rotation."""
     vehicle.teleport(pos, rot_quat)
-    logging_mgr.log_action(f'Vehicle {vehicle.vid} teleported to position {pos} with rotation {rot_quat}.')
+    logger.info(f'Vehicle {vehicle.vid} teleported to position {pos} with rotation {rot_quat}.')
 
 
 def set_vehicle_ai_mode(vehicle: Vehicle,
@@ -41,7 +64,7 @@ def set_vehicle_ai_mode(vehicle: Vehicle,
     """Set the vehicle's AI mode and lane driving behavior to the provided values."""
     vehicle.ai.set_mode(mode)
     vehicle.ai.drive_in_lane(in_lane)
-    logging_mgr.log_action(f'Set AI mode to {mode} and in-lane driving to {in_lane}.')
+    logger.info(f'Set AI mode to {mode} and in-lane driving to {in_lane}.')
 
 def set_headlights(vehicle: Vehicle, intensity: int) -> None:
     """
@@ -50,7 +73,7 @@ def set_headlights(vehicle: Vehicle, intensity: int) -> None:
     For intensity: 0 is off, 1 is low, 2 is high, any other value is ignored.
     """
     if intensity not in [0, 1, 2]:
-        logging_mgr.log_warning(f'Invalid intensity value {intensity} for vehicle headlights.')
+        logger.warning(f'Invalid intensity value {intensity} for vehicle headlights.')
     else:
         vehicle.set_lights(headlights=intensity)
-        logging_mgr.log_action(f'Set vehicle headlights intensity to {intensity}.')
\ No newline at end of file
+        logger.info(f'Set vehicle headlights intensity to {intensity}.')
\ No newline at end of file
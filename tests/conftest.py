@@ -0,0 +1,4 @@
+import os, sys
+
+# The modules are flat in "src" and import each other by name, as when running "src/main.py"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
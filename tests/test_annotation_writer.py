@@ -0,0 +1,45 @@
+from io import BytesIO
+import numpy as np
+import pytest
+from PIL import Image
+
+import annotation_writer, image_encoding
+from annotation_writer import AnnotationClassTable
+
+class_colours = [(0, 0, 0), (255, 0, 0), (0, 128, 255)]
+
+def test_colours_to_class_ids():
+    annotation = np.array([[[255, 0, 0], [0, 0, 0]],
+                           [[0, 128, 255], [1, 2, 3]]], dtype=np.uint8)
+    class_ids = annotation_writer.colours_to_class_ids(annotation, class_colours)
+    assert class_ids.dtype == np.uint8
+    np.testing.assert_array_equal(class_ids, [[1, 0], [2, annotation_writer.unknown_class_id]])
+
+def test_colours_to_class_ids_ignores_alpha():
+    annotation = np.zeros((2, 3, 4), dtype=np.uint8)
+    annotation[..., :3] = (0, 128, 255)
+    annotation[0, 0, 3] = 255
+    np.testing.assert_array_equal(annotation_writer.colours_to_class_ids(annotation, class_colours), np.full((2, 3), 2))
+
+def test_colours_to_class_ids_unsorted_colours():
+    annotation = np.array([[[255, 255, 255], [0, 0, 1], [0, 1, 0]]], dtype=np.uint8)
+    class_ids = annotation_writer.colours_to_class_ids(annotation, [(0, 1, 0), (0, 0, 1)])
+    np.testing.assert_array_equal(class_ids, [[annotation_writer.unknown_class_id, 1, 0]])
+
+def test_colours_to_class_ids_without_classes():
+    annotation = np.zeros((2, 2, 3), dtype=np.uint8)
+    np.testing.assert_array_equal(annotation_writer.colours_to_class_ids(annotation, []), np.full((2, 2), annotation_writer.unknown_class_id))
+
+def test_class_table_ids_follow_class_names():
+    table = AnnotationClassTable({'ROAD': (10, 20, 30), 'CAR': (1, 2, 3)})
+    assert table.class_colours == [(1, 2, 3), (10, 20, 30)]
+    with pytest.raises(ValueError):
+        AnnotationClassTable({f'class_{i}': (i, 0, 0) for i in range(annotation_writer.unknown_class_id)})
+
+def test_palette_png_uses_class_colours():
+    annotation = np.array([[[0, 128, 255], [255, 0, 0]]], dtype=np.uint8)
+    data = image_encoding.encode_image_array(annotation, 'palette_png', {'class_colours': class_colours})
+    image = Image.open(BytesIO(data))
+    assert image.mode == 'P'
+    np.testing.assert_array_equal(np.asarray(image), [[2, 1]])
+    np.testing.assert_array_equal(np.asarray(image.convert('RGB')), annotation)
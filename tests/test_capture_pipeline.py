@@ -0,0 +1,110 @@
+import threading, time
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+import data_capture_mgr, image_encoding, output_sinks, settings
+from capture_pipeline import CapturePipeline
+
+num_frames = 6
+
+class RecordingSink(output_sinks.OutputSink):
+    """Output sink recording the written images and committed frames, in order."""
+    def __init__(self):
+        self.events = []
+        self.resume_frame = None
+        self._lock = threading.Lock()
+
+    def write(self, frame_num, camera_name, image_type, extension, data):
+        with self._lock:
+            self.events.append(('write', frame_num))
+
+    def commit_frame(self, frame_num):
+        with self._lock:
+            self.events.append(('commit', frame_num))
+
+    def resume(self, resume_frame):
+        self.resume_frame = resume_frame
+
+    @property
+    def committed_frames(self):
+        return [frame_num for event, frame_num in self.events if event == 'commit']
+
+class CameraConfig(SimpleNamespace):
+    """Camera configuration rendering colour images only, encoded as NumPy arrays."""
+    def __init__(self, name):
+        super().__init__(name=name, resolution=(2, 2), is_render_colours=True, is_render_annotations=False, is_render_depth=False)
+
+    def get_output_format(self, image_type):
+        return 'npy', {}
+
+class FakeCameras:
+    """
+    Cameras whose images hold the number of the frame being captured.
+
+    Earlier frames are encoded slower, so the images of later frames are written first,
+    and the images of the failing frames cannot be encoded.
+    """
+    def __init__(self, monkeypatch):
+        self.cameras = [SimpleNamespace(name='front'), SimpleNamespace(name='rear')]
+        self.failing_frames = set()
+        self._frame_num = 0
+        self._encode_image_array = image_encoding.encode_image_array
+        monkeypatch.setattr(data_capture_mgr, 'poll_camera_images', self._poll_camera_images)
+        monkeypatch.setattr(image_encoding, 'encode_image_array', self._encode_slowly)
+
+    def run_pipeline(self, output_dir, resume_frame=None):
+        pipeline = CapturePipeline(self.cameras, [CameraConfig(camera.name) for camera in self.cameras], output_dir, num_frames,
+                                   num_encode_workers=4, resume_frame=resume_frame)
+        for frame_num in range(resume_frame or 0, num_frames):
+            self._frame_num = frame_num
+            pipeline.capture_frame(frame_num)
+        pipeline.close()
+        return pipeline
+
+    def _poll_camera_images(self, camera):
+        return {'colour': np.full((2, 2, 3), self._frame_num, dtype=np.uint8)}
+
+    def _encode_slowly(self, array, format_name, options=None):
+        frame_num = int(array[0, 0, 0])
+        time.sleep(0.01 * (num_frames - frame_num))
+        if frame_num in self.failing_frames:
+            raise ValueError(f'Encoding error in frame {frame_num}.')
+        return self._encode_image_array(array, format_name, options)
+
+@pytest.fixture
+def sink(monkeypatch):
+    recording_sink = RecordingSink()
+    monkeypatch.setattr(output_sinks, 'create_output_sink', lambda output_dir: recording_sink)
+    monkeypatch.setattr(settings, 'capture_encoder_backend', 'thread')
+    monkeypatch.setattr(settings, 'camera_poll_mode', 'sync')
+    return recording_sink
+
+@pytest.fixture
+def cameras(monkeypatch):
+    return FakeCameras(monkeypatch)
+
+def test_frames_are_committed_in_order_after_their_images(tmp_path, sink, cameras):
+    pipeline = cameras.run_pipeline(str(tmp_path))
+    assert sink.committed_frames == list(range(num_frames))
+    # Every frame is committed once both of its images are written
+    for commit_index, (event, frame_num) in enumerate(sink.events):
+        if event == 'commit':
+            assert sink.events[:commit_index].count(('write', frame_num)) == 2
+    assert pipeline.last_committed_frame == num_frames - 1
+    assert pipeline.first_incomplete_frame is None
+
+def test_progress_stops_before_first_incomplete_frame(tmp_path, sink, cameras):
+    cameras.failing_frames.update({2, 4})
+    pipeline = cameras.run_pipeline(str(tmp_path))
+    # Incomplete frames are still committed, but the session progress does not move past the first one
+    assert sink.committed_frames == list(range(num_frames))
+    assert ('write', 2) not in sink.events
+    assert pipeline.last_committed_frame == 1
+    assert pipeline.first_incomplete_frame == 2
+
+def test_resumed_pipeline_commits_from_resume_frame(tmp_path, sink, cameras):
+    pipeline = cameras.run_pipeline(str(tmp_path), resume_frame=3)
+    assert sink.resume_frame == 3
+    assert sink.committed_frames == [3, 4, 5]
+    assert pipeline.last_committed_frame == num_frames - 1
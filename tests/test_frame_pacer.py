@@ -0,0 +1,91 @@
+import pytest
+
+import frame_pacer
+from frame_pacer import FramePacer
+
+class FakeClock:
+    """Wall clock advanced only by the pacer sleeps, with the simulation running at a fixed sim-to-wall ratio."""
+    def __init__(self, sim_to_wall_ratio: float):
+        self.wall_time_s = 0.0
+        self.sim_to_wall_ratio = sim_to_wall_ratio
+        self.sleeps_s = []
+        self.num_queries = 0
+
+    def perf_counter(self) -> float:
+        return self.wall_time_s
+
+    def sleep(self, duration_s: float) -> None:
+        self.sleeps_s.append(duration_s)
+        self.wall_time_s += duration_s
+
+    def query_simulation_time(self) -> float:
+        self.num_queries += 1
+        return self.wall_time_s * self.sim_to_wall_ratio
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock(sim_to_wall_ratio=0.5)
+    monkeypatch.setattr(frame_pacer.time, 'perf_counter', fake_clock.perf_counter)
+    monkeypatch.setattr(frame_pacer.time, 'sleep', fake_clock.sleep)
+    return fake_clock
+
+def create_pacer(query_simulation_time, ratio_smoothing: float = 0.5, max_queries_per_frame: int = 4) -> FramePacer:
+    return FramePacer(0.1, query_simulation_time, ratio_smoothing, min_sleep_s=0.001, max_queries_per_frame=max_queries_per_frame)
+
+def test_invalid_arguments_raise():
+    with pytest.raises(ValueError):
+        FramePacer(0.0, lambda: 0.0, 0.5, 0.001, 4)
+    with pytest.raises(ValueError):
+        FramePacer(0.1, lambda: 0.0, 0.0, 0.001, 4)
+
+def test_mark_frame_smooths_sim_to_wall_ratio():
+    pacer = create_pacer(lambda: 0.0, ratio_smoothing=0.5)
+    assert pacer.sim_to_wall_ratio == 1.0
+    pacer.mark_frame(0.0, 0.0)
+    # Measured ratio 0.5: the estimate moves halfway from 1.0
+    pacer.mark_frame(1.0, 2.0)
+    assert pacer.sim_to_wall_ratio == pytest.approx(0.75)
+    pacer.mark_frame(2.0, 4.0)
+    assert pacer.sim_to_wall_ratio == pytest.approx(0.625)
+
+def test_mark_frame_ignores_non_increasing_times():
+    pacer = create_pacer(lambda: 0.0)
+    pacer.mark_frame(1.0, 1.0)
+    pacer.mark_frame(1.0, 2.0)
+    pacer.mark_frame(2.0, 2.0)
+    assert pacer.sim_to_wall_ratio == 1.0
+
+def test_wait_before_mark_frame_raises():
+    with pytest.raises(RuntimeError):
+        create_pacer(lambda: 0.0).wait_for_next_frame(0)
+
+def test_wait_sleeps_until_predicted_deadline(clock):
+    pacer = create_pacer(clock.query_simulation_time, ratio_smoothing=1.0)
+    pacer.mark_frame(0.0, 0.0)
+    pacer.mark_frame(0.5, 1.0)
+    assert pacer.sim_to_wall_ratio == pytest.approx(0.5)
+    clock.wall_time_s = 1.0
+    simulation_time_s = pacer.wait_for_next_frame(1)
+    # With the ratio known, a single sleep reaches the frame due 0.1 simulation seconds later (0.2 wall seconds)
+    assert clock.sleeps_s == [pytest.approx(0.2)]
+    assert clock.num_queries == 1
+    assert simulation_time_s == pytest.approx(0.6)
+
+def test_wait_deadline_starts_from_marked_wall_time(clock):
+    pacer = create_pacer(clock.query_simulation_time, ratio_smoothing=1.0)
+    pacer.mark_frame(0.0, 0.0)
+    pacer.mark_frame(0.5, 1.0)
+    # Time spent capturing the frame after its simulation time was read is not added to the deadline
+    clock.wall_time_s = 1.15
+    pacer.wait_for_next_frame(1)
+    assert clock.sleeps_s == [pytest.approx(0.05)]
+
+def test_wait_sleeps_again_for_remaining_time(clock):
+    # Realtime estimate while the simulation runs at half speed: the first sleep is too short
+    pacer = create_pacer(clock.query_simulation_time)
+    pacer.mark_frame(0.0, 0.0)
+    simulation_time_s = pacer.wait_for_next_frame(0)
+    assert simulation_time_s >= 0.1 - 1e-9
+    # Each query sleeps for the remaining time at the estimated ratio, then every minimum sleep past the query budget
+    assert clock.sleeps_s[:4] == [pytest.approx(0.1), pytest.approx(0.05), pytest.approx(0.025), pytest.approx(0.0125)]
+    assert clock.sleeps_s[4:] == [0.001] * (clock.num_queries - 4)
@@ -0,0 +1,31 @@
+import json, os
+
+import metadata_writer
+
+def write_lines(output_dir: str, lines) -> None:
+    with open(os.path.join(output_dir, 'frames_metadata.jsonl'), 'w', encoding='utf-8') as file:
+        file.write(''.join(lines))
+
+def read_frames(output_dir: str):
+    return [entry['frame'] for entry in metadata_writer.read_json_lines(output_dir, 'frames_metadata.jsonl')]
+
+def test_truncate_json_lines_keeps_frames_before_resume_frame(tmp_path):
+    write_lines(str(tmp_path), [json.dumps({'frame': frame_num, 'speed': frame_num * 2.5}) + '\n' for frame_num in range(6)])
+    metadata_writer.truncate_json_lines(str(tmp_path), 'frames_metadata.jsonl', 3)
+    assert read_frames(str(tmp_path)) == [0, 1, 2]
+    entries = list(metadata_writer.read_json_lines(str(tmp_path), 'frames_metadata.jsonl'))
+    assert entries[2] == {'frame': 2, 'speed': 5.0}
+    assert not os.path.exists(os.path.join(str(tmp_path), 'frames_metadata.jsonl.tmp'))
+
+def test_truncate_json_lines_drops_partial_last_line(tmp_path):
+    # Interrupted while writing frame 2, whose line was cut
+    write_lines(str(tmp_path), ['{"frame": 0}\n', '\n', '{"frame": 1}\n', '{"frame": 2, "spe'])
+    metadata_writer.truncate_json_lines(str(tmp_path), 'frames_metadata.jsonl', 5)
+    assert read_frames(str(tmp_path)) == [0, 1]
+    with open(os.path.join(str(tmp_path), 'frames_metadata.jsonl'), encoding='utf-8') as file:
+        assert file.read().endswith('\n')
+
+def test_truncate_json_lines_from_first_frame(tmp_path):
+    write_lines(str(tmp_path), ['{"frame": 0}\n', '{"frame": 1}\n'])
+    metadata_writer.truncate_json_lines(str(tmp_path), 'frames_metadata.jsonl', 0)
+    assert read_frames(str(tmp_path)) == []
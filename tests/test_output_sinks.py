@@ -0,0 +1,81 @@
+import json, os, tarfile
+
+import output_sinks
+from output_sinks import TarShardSink
+
+# Each frame takes 3584 bytes in a shard (header and padded data), so a shard holds two frames
+image_size = 3000
+max_shard_bytes = 8000
+
+def get_image_data(frame_num: int) -> bytes:
+    return bytes([frame_num]) * image_size
+
+def write_frames(sink: TarShardSink, frame_nums) -> None:
+    for frame_num in frame_nums:
+        sink.write(frame_num, 'front', 'colour', 'png', get_image_data(frame_num))
+        sink.commit_frame(frame_num)
+
+def read_shards(output_dir: str):
+    """Return the frames of every shard listed in the shards index, checking the member offsets of their indexes."""
+    with open(os.path.join(output_dir, 'shards_index.json')) as file:
+        shards = json.load(file)['shards']
+    shard_frames = []
+    for shard in shards:
+        with open(os.path.join(output_dir, shard['index'])) as file:
+            frames = json.load(file)['frames']
+        with open(os.path.join(output_dir, shard['shard']), 'rb') as file:
+            shard_data = file.read()
+        for frame in frames:
+            for member in frame['members']:
+                assert shard_data[member['offset']:member['offset'] + member['size']] == get_image_data(frame['frame'])
+        with tarfile.open(os.path.join(output_dir, shard['shard'])) as tar:
+            assert tar.getnames() == [member['name'] for frame in frames for member in frame['members']]
+        assert shard['num_frames'] == len(frames)
+        shard_frames.append([frame['frame'] for frame in frames])
+    return shard_frames
+
+def test_frames_are_grouped_into_bounded_shards(tmp_path):
+    sink = TarShardSink(str(tmp_path), max_shard_bytes)
+    write_frames(sink, range(5))
+    sink.close()
+    assert read_shards(str(tmp_path)) == [[0, 1], [2, 3], [4]]
+    with tarfile.open(os.path.join(str(tmp_path), output_sinks.get_shard_file_name(0))) as tar:
+        assert tar.getnames() == ['frame_00000.front_color.png', 'frame_00001.front_color.png']
+
+def test_resume_keeps_earlier_shards_and_rewrites_later_ones(tmp_path):
+    sink = TarShardSink(str(tmp_path), max_shard_bytes)
+    write_frames(sink, range(6))
+    sink.close()
+    resumed_sink = TarShardSink(str(tmp_path), max_shard_bytes)
+    resumed_sink.resume(3)
+    # The first shard only holds earlier frames, the second is rewritten with frame 2 and the third is removed
+    assert read_shards(str(tmp_path)) == [[0, 1], [2]]
+    assert not os.path.exists(os.path.join(str(tmp_path), output_sinks.get_shard_file_name(2)))
+    write_frames(resumed_sink, range(3, 6))
+    resumed_sink.close()
+    assert read_shards(str(tmp_path)) == [[0, 1], [2], [3, 4], [5]]
+
+def test_resume_reads_back_truncated_shard(tmp_path):
+    sink = TarShardSink(str(tmp_path), max_shard_bytes * 10)
+    write_frames(sink, range(4))
+    sink.close()
+    # Interrupted while writing the shard: no index, and the data is cut in the middle of frame 2
+    shard_path = os.path.join(str(tmp_path), output_sinks.get_shard_file_name(0))
+    os.remove(shard_path.replace('.tar', '.index.json'))
+    with open(shard_path, 'r+b') as file:
+        file.truncate(2 * 3584 + 1000)
+    resumed_sink = TarShardSink(str(tmp_path), max_shard_bytes * 10)
+    resumed_sink.resume(4)
+    assert read_shards(str(tmp_path)) == [[0, 1]]
+    write_frames(resumed_sink, range(2, 4))
+    resumed_sink.close()
+    assert read_shards(str(tmp_path)) == [[0, 1], [2, 3]]
+
+def test_resume_from_first_frame_removes_every_shard(tmp_path):
+    sink = TarShardSink(str(tmp_path), max_shard_bytes)
+    write_frames(sink, range(3))
+    sink.close()
+    resumed_sink = TarShardSink(str(tmp_path), max_shard_bytes)
+    resumed_sink.resume(0)
+    assert read_shards(str(tmp_path)) == []
+    assert not any(name.endswith('.tar') for name in os.listdir(str(tmp_path)))
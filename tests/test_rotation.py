@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import rotation
+
+Rotation = pytest.importorskip('scipy.spatial.transform').Rotation
+
+def random_angles(num: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return np.stack([rng.uniform(-180, 180, num), rng.uniform(-90, 90, num), rng.uniform(-180, 180, num)], axis=-1)
+
+def assert_same_rotation(quats: np.ndarray, expected_quats: np.ndarray) -> None:
+    # q and -q are the same rotation
+    dots = np.abs(np.sum(quats * expected_quats, axis=-1))
+    np.testing.assert_allclose(dots, 1.0, atol=1e-9)
+
+def test_euler_to_quaternions_matches_scipy():
+    angles = random_angles(1000)
+    assert_same_rotation(rotation.euler_to_quaternions(angles), Rotation.from_euler('xyz', angles, degrees=True).as_quat())
+
+def test_euler_to_quaternions_single_triple_in_radians():
+    angles = np.radians([10.0, -20.0, 30.0])
+    quat = rotation.euler_to_quaternions(angles, degrees=False)
+    assert quat.shape == (4,)
+    assert_same_rotation(quat, Rotation.from_euler('xyz', angles).as_quat())
+
+def test_quaternions_to_euler_matches_scipy():
+    quats = Rotation.from_euler('xyz', random_angles(1000), degrees=True).as_quat()
+    np.testing.assert_allclose(rotation.quaternions_to_euler(quats), Rotation.from_quat(quats).as_euler('xyz', degrees=True), atol=1e-6)
+
+def test_quaternions_to_euler_unnormalized():
+    quat = Rotation.from_euler('xyz', [30.0, 40.0, 50.0], degrees=True).as_quat()
+    np.testing.assert_allclose(rotation.quaternions_to_euler(quat * 3.0), [30.0, 40.0, 50.0], atol=1e-9)
+
+@pytest.mark.parametrize('pitch', [90.0, -90.0])
+def test_quaternions_to_euler_gimbal_lock(pitch):
+    quat = Rotation.from_euler('xyz', [25.0, pitch, 0.0], degrees=True).as_quat()
+    angles = rotation.quaternions_to_euler(quat)
+    # In gimbal lock the yaw is set to 0, the angles must still describe the same rotation
+    assert angles[2] == 0.0
+    assert angles[1] == pytest.approx(pitch)
+    assert_same_rotation(rotation.euler_to_quaternions(angles), quat)
+
+def test_other_sequences_use_scipy():
+    angles = random_angles(10)
+    assert_same_rotation(rotation.euler_to_quaternions(angles, seq='zyx'), Rotation.from_euler('zyx', angles, degrees=True).as_quat())
@@ -0,0 +1,40 @@
+import json, os
+import pytest
+
+import session_journal
+from session_config import SessionConfig
+
+def test_journal_round_trip(tmp_path):
+    session = SessionConfig(duration_s=4, capture_freq_hz=5)
+    journal = session_journal.create_session_journal(str(tmp_path), session, random_seed=42, num_frames=20)
+    journal.update_progress(7)
+    loaded_journal = session_journal.load_session_journal(str(tmp_path))
+    assert loaded_journal.output_dir == str(tmp_path)
+    assert loaded_journal.random_seed == 42
+    assert loaded_journal.num_frames == 20
+    assert loaded_journal.last_committed_frame == 7
+    assert not loaded_journal.is_completed
+    # Vectors are saved as JSON lists, the loaded configuration must describe the same session
+    loaded_session = SessionConfig()
+    loaded_session.from_dict(loaded_journal.session_config)
+    assert json.dumps(loaded_session.to_dict(), sort_keys=True) == json.dumps(session.to_dict(), sort_keys=True)
+
+def test_new_journal_has_no_committed_frame(tmp_path):
+    session_journal.create_session_journal(str(tmp_path), SessionConfig(), random_seed=1, num_frames=10)
+    journal = session_journal.load_session_journal(str(tmp_path))
+    assert journal.last_committed_frame == -1
+    assert not journal.is_completed
+
+def test_completed_journal(tmp_path):
+    journal = session_journal.create_session_journal(str(tmp_path), SessionConfig(), random_seed=1, num_frames=10)
+    journal.update_progress(9, completed=True)
+    assert session_journal.load_session_journal(str(tmp_path)).is_completed
+
+def test_save_replaces_journal_atomically(tmp_path):
+    journal = session_journal.create_session_journal(str(tmp_path), SessionConfig(), random_seed=1, num_frames=10)
+    journal.update_progress(3)
+    assert os.listdir(str(tmp_path)) == [session_journal.journal_file_name]
+
+def test_load_without_journal_raises(tmp_path):
+    with pytest.raises(ValueError):
+        session_journal.load_session_journal(str(tmp_path))
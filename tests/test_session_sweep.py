@@ -0,0 +1,63 @@
+import pytest
+
+import session_sweep
+
+def create_sweep(parameters, **sweep_fields):
+    return session_sweep.create_session_sweep_from_dict(dict(name='test', parameters=parameters, **sweep_fields), random_seed=0)
+
+def test_expand_parameter_values_ranges():
+    assert session_sweep.expand_parameter_values('num_ai_traffic_vehicles', {'start': 0, 'stop': 10, 'step': 5}) == [0, 5, 10]
+    assert session_sweep.expand_parameter_values('time', {'start': '06:00:00', 'stop': '08:00:00', 'step': 3600}) == ['06:00:00', '07:00:00', '08:00:00']
+    assert session_sweep.expand_parameter_values('weather', 'sunny') == ['sunny']
+
+def test_expand_parameter_values_removes_repeated_values():
+    assert session_sweep.expand_parameter_values('weather', ['sunny', 'rainy', 'sunny']) == ['sunny', 'rainy']
+
+def test_expand_parameter_values_invalid_ranges_raise():
+    with pytest.raises(ValueError):
+        session_sweep.expand_parameter_values('num_ai_traffic_vehicles', {'start': 0, 'stop': 10})
+    with pytest.raises(ValueError):
+        session_sweep.expand_parameter_values('num_ai_traffic_vehicles', {'start': 0, 'stop': 10, 'step': 0})
+    with pytest.raises(ValueError):
+        session_sweep.expand_parameter_values('camera_rig', [{'name': 'front'}])
+
+def test_unknown_parameter_or_expansion_raise():
+    with pytest.raises(ValueError):
+        create_sweep({'unknown': [1]})
+    with pytest.raises(ValueError):
+        create_sweep({'weather': ['sunny']}, expansion='grid')
+    with pytest.raises(ValueError):
+        create_sweep({'weather': ['sunny']}, expansion='sampled')
+
+def test_cartesian_expansion_names_every_combination():
+    sessions = create_sweep({'weather': ['sunny', 'rainy'], 'num_ai_traffic_vehicles': [0, 5, 10]}).expand()
+    assert [session_name for session_name, _ in sessions] == [f'test_{session_num:04d}' for session_num in range(6)]
+    assert [(session.weather, session.num_ai_traffic_vehicles) for _, session in sessions] == [
+        ('sunny', 0), ('sunny', 5), ('sunny', 10), ('rainy', 0), ('rainy', 5), ('rainy', 10)]
+
+def test_expansion_removes_duplicate_configurations():
+    # A rig giving only default values, with a list position instead of a tuple, is the default rig written differently
+    camera_rigs = [[{}], [{'name': 'sensor_camera', 'position': [0, -0.5, 1.5]}], [{'name': 'front'}]]
+    sessions = create_sweep({'camera_rig': camera_rigs, 'weather': ['sunny']}).expand()
+    assert [session.cameras[0].name for _, session in sessions] == ['sensor_camera', 'front']
+
+def test_expansion_orders_sessions_by_map_and_vehicle_model():
+    sessions = create_sweep({'vehicle_model': ['etk800', 'pickup'], 'map': ['italy', 'west_coast_usa']}).expand()
+    assert [(session.map, session.vehicle.model) for _, session in sessions] == [
+        ('italy', 'etk800'), ('italy', 'pickup'), ('west_coast_usa', 'etk800'), ('west_coast_usa', 'pickup')]
+
+def test_sampled_expansion_is_distinct_and_seeded():
+    parameters = {'num_ai_traffic_vehicles': {'start': 0, 'stop': 9, 'step': 1}, 'weather': ['sunny', 'rainy']}
+    sessions = create_sweep(parameters, expansion='sampled', num_samples=5, seed=3).expand()
+    combinations = [(session.num_ai_traffic_vehicles, session.weather) for _, session in sessions]
+    assert len(set(combinations)) == 5
+    same_seed_sessions = create_sweep(parameters, expansion='sampled', num_samples=5, seed=3).expand()
+    assert [session.to_dict() for _, session in same_seed_sessions] == [session.to_dict() for _, session in sessions]
+
+def test_sampled_expansion_is_capped_at_the_combinations():
+    sessions = create_sweep({'weather': ['sunny', 'rainy']}, expansion='sampled', num_samples=10).expand()
+    assert len(sessions) == 2
+
+def test_invalid_configurations_are_listed():
+    with pytest.raises(ValueError, match='2 invalid session configurations'):
+        create_sweep({'time': ['25:00:00', '12:00:00', '99:99:99']}).expand()
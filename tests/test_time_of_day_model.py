@@ -0,0 +1,61 @@
+import pytest
+
+from time_of_day_model import TimeOfDayModel
+
+def create_model(night_time_start: float = 0.25, night_time_end: float = 0.75, day_scale: float = 1.0,
+                 night_scale: float = 1.0, day_length_s: float = 100.0, play: bool = True) -> TimeOfDayModel:
+    return TimeOfDayModel(night_time_start, night_time_end, play, day_scale, night_scale, day_length_s, resync_interval_s=30)
+
+def test_predict_before_resync_raises():
+    with pytest.raises(RuntimeError):
+        create_model().predict(0.0)
+
+def test_predict_advances_by_day_length():
+    model = create_model()
+    model.resync(0.0, 10.0)
+    assert model.predict(10.0) == pytest.approx(0.0)
+    assert model.predict(20.0) == pytest.approx(0.1)
+    # Wraps around at 1.0 (12:00:00)
+    assert model.predict(110.0) == pytest.approx(0.0)
+
+def test_predict_uses_night_scale_between_simulator_boundaries():
+    model = create_model(day_scale=1.0, night_scale=2.0)
+    model.resync(0.2, 0.0)
+    # 5 s of day reach the night start (0.25), then the night advances twice as fast
+    assert model.predict(5.0) == pytest.approx(0.25)
+    assert model.predict(10.0) == pytest.approx(0.35)
+    # The remaining 0.4 of night takes 20 s, then the last 15 s advance by the day scale again
+    assert model.predict(45.0) == pytest.approx(0.9)
+
+def test_predict_scale_ignores_headlight_night_time():
+    # Headlight night time does not change where the simulator switches between the day and night scales
+    model = create_model(night_time_start=0.1, night_time_end=0.9, night_scale=2.0)
+    model.resync(0.1, 0.0)
+    assert model.predict(10.0) == pytest.approx(0.2)
+
+def test_predict_stops_with_zero_scale_or_paused_time():
+    model = create_model(night_scale=0.0)
+    model.resync(0.2, 0.0)
+    assert model.predict(100.0) == pytest.approx(0.25)
+    paused_model = create_model(play=False)
+    paused_model.resync(0.4, 0.0)
+    assert paused_model.predict(100.0) == pytest.approx(0.4)
+
+def test_needs_resync_after_interval():
+    model = create_model()
+    assert model.needs_resync(0.0)
+    model.resync(0.0, 0.0)
+    assert not model.needs_resync(29.0)
+    assert model.needs_resync(30.0)
+
+def test_predict_headlight_toggle_frames():
+    model = create_model(night_time_start=0.25, night_time_end=0.75)
+    model.resync(0.2, 0.0)
+    # Frames every second advance the time of day by 0.01: night from frame 5, day again from frame 55
+    assert model.predict_headlight_toggle_frames(0.0, 1.0, 0, 100) == [5, 55]
+
+def test_predict_headlight_toggle_frames_starting_at_night():
+    model = create_model(night_time_start=0.75, night_time_end=0.25)
+    model.resync(0.9, 3.0)
+    # Headlights start switched off, so a session starting at night switches them on at its first frame
+    assert model.predict_headlight_toggle_frames(3.0, 1.0, 3, 50) == [3, 38]